@@ -10,7 +10,12 @@ from pydantic import BaseModel, Field
 import json
 import asyncio
 
-from app.core.security import get_current_user
+from app.core.security import get_current_tenant, get_current_user
+from app.services.llm.embeddings import embed_query
+from app.services.rag.partitions import get_partition
+from app.services.rag.retriever import retrieve_context
+from app.services.rag.result_cache import current_generation
+from app.services.rag.semantic_cache import get_semantic_cache, scope_for
 
 router = APIRouter()
 
@@ -26,6 +31,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=4000)
     session_id: Optional[str] = None
     use_rag: bool = Field(default=True, description="Use RAG for context")
+    rerank: bool = Field(default=False, description="Rerank RAG context with the cross-encoder")
     model: str = Field(default="gpt-4-turbo-preview", description="LLM model to use")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0)
     max_tokens: int = Field(default=2000, ge=1, le=4000)
@@ -44,7 +50,8 @@ class ChatResponse(BaseModel):
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ) -> ChatResponse:
     """
     Send a chat message and get a response.
@@ -52,23 +59,47 @@ async def chat(
     Args:
         request: Chat request parameters
         current_user: Current authenticated user
+        tenant_id: Tenant whose documents ground the answer
 
     Returns:
-        Chat response with assistant message
+        Chat response with assistant message. A new conversation whose
+        message is a near-duplicate of a recent one with the same model
+        parameters is answered from the semantic cache without calling the LLM.
     """
+    # Follow-ups depend on conversation history, so only new conversations are cached
+    semantic = get_semantic_cache()
+    scope = None
+    generation = None
+    if semantic is not None and request.session_id is None:
+        generation = await current_generation(tenant_id)
+        scope = await scope_for(
+            tenant_id, request.model_dump(exclude={"message", "session_id"}), generation
+        )
+    if scope is not None:
+        vector = await embed_query(request.message)
+        cached = semantic.get(scope, vector, endpoint="chat")
+        if cached is not None:
+            return ChatResponse(session_id="new-session", **cached)
+
     # TODO: Retrieve conversation history
-    # TODO: If use_rag, retrieve relevant context
+    context = []
+    if request.use_rag:
+        partition = await get_partition(tenant_id, generation)
+        context = await retrieve_context(partition, request.message, use_rerank=request.rerank)
     # TODO: Generate LLM response
     # TODO: Store message in database
 
-    return ChatResponse(
+    response = ChatResponse(
         session_id=request.session_id or "new-session",
         message="This is a mock response. LLM integration coming soon!",
         role="assistant",
         model=request.model,
         usage={"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
-        context_used=request.use_rag,
+        context_used=bool(context),
     )
+    if scope is not None:
+        semantic.set(scope, vector, response.model_dump(exclude={"session_id"}))
+    return response
 
 
 async def generate_streaming_response(
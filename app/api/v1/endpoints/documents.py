@@ -5,10 +5,22 @@ Handles document upload, processing, and retrieval.
 
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
 from typing import List, Dict, Any
+import asyncio
 import uuid
 from datetime import datetime
 
-from app.core.security import get_current_user
+from app.core.config import settings
+from app.core.security import get_current_tenant, get_current_user
+from app.services.document.jobs import IngestionJob, get_job_queue
+from app.services.document.storage import (
+    ALLOWED_TYPES,
+    UploadRejected,
+    document_key,
+    s3_client,
+    stream_to_s3,
+)
+from app.services.rag.indexer import publish_indexes, remove_document
+from app.services.rag.result_cache import invalidate_results
 
 router = APIRouter()
 
@@ -16,7 +28,8 @@ router = APIRouter()
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ) -> Dict[str, Any]:
     """
     Upload a document for processing.
@@ -24,13 +37,13 @@ async def upload_document(
     Args:
         file: Uploaded file
         current_user: Current authenticated user
+        tenant_id: Tenant that owns the document
 
     Returns:
         Document metadata and processing status
     """
     # Validate file type
-    allowed_types = ["application/pdf", "text/plain", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
-    if file.content_type not in allowed_types:
+    if file.content_type not in ALLOWED_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type {file.content_type} not supported"
@@ -39,15 +52,43 @@ async def upload_document(
     # Generate document ID
     document_id = str(uuid.uuid4())
 
-    # TODO: Upload to S3
-    # TODO: Trigger processing pipeline
-    # TODO: Store metadata in database
+    # Stream to S3 one part at a time; the sniffed type overrides the declared one
+    try:
+        async with s3_client() as client:
+            stored = await stream_to_s3(
+                client,
+                file,
+                bucket=settings.S3_BUCKET_NAME,
+                key=document_key(tenant_id, document_id),
+                declared_type=file.content_type,
+            )
+    except UploadRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Content of {file.filename} does not match a supported file type"
+        ) from e
+
+    # Parsing, embedding and indexing happen in the background ingestion workers,
+    # which invalidate the tenant's cached results once the chunks are searchable
+    job = IngestionJob(
+        document_id=document_id,
+        tenant_id=tenant_id,
+        bucket=stored.bucket,
+        key=stored.key,
+        content_type=stored.content_type,
+        filename=file.filename,
+        uploaded_by=current_user.get("sub"),
+    )
+    await get_job_queue().enqueue(job)
 
     return {
         "document_id": document_id,
         "filename": file.filename,
-        "content_type": file.content_type,
-        "status": "processing",
+        "content_type": stored.content_type,
+        "size": stored.size,
+        "sha256": stored.sha256,
+        "s3_key": stored.key,
+        "status": job.status,
         "uploaded_at": datetime.utcnow().isoformat(),
         "uploaded_by": current_user.get("sub"),
     }
@@ -56,26 +97,37 @@ async def upload_document(
 @router.get("/{document_id}")
 async def get_document(
     document_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ) -> Dict[str, Any]:
     """
-    Get document metadata and status.
+    Get document metadata and ingestion progress.
 
     Args:
         document_id: Document ID
         current_user: Current authenticated user
+        tenant_id: Tenant that owns the document
 
     Returns:
         Document metadata
     """
-    # TODO: Retrieve from database
+    job = await get_job_queue().get(document_id)
+    if job is None or job.tenant_id != tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document {document_id} not found"
+        )
 
     return {
-        "document_id": document_id,
-        "filename": "example.pdf",
-        "status": "completed",
-        "chunks_count": 42,
-        "uploaded_at": datetime.utcnow().isoformat(),
+        "document_id": job.document_id,
+        "filename": job.filename,
+        "content_type": job.content_type,
+        "status": job.status,
+        "progress": round(job.progress, 3),
+        "chunks_count": job.chunks_count,
+        "error": job.error,
+        "uploaded_at": datetime.utcfromtimestamp(job.created_at).isoformat(),
+        "updated_at": datetime.utcfromtimestamp(job.updated_at).isoformat(),
     }
 
 
@@ -109,7 +161,8 @@ async def list_documents(
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
     document_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ):
     """
     Delete a document and its embeddings.
@@ -117,10 +170,21 @@ async def delete_document(
     Args:
         document_id: Document ID
         current_user: Current authenticated user
+        tenant_id: Tenant that owns the document
     """
     # TODO: Delete from S3
-    # TODO: Delete from vector store
     # TODO: Delete from database
 
+    # Stop an ingestion still running for the document from re-adding its chunks
+    queue = get_job_queue()
+    job = await queue.get(document_id)
+    if job is not None and job.tenant_id == tenant_id:
+        await queue.cancel(job)
+
+    # Chunks are tombstoned now and purged by background compaction
+    if await asyncio.to_thread(remove_document, tenant_id, document_id):
+        await asyncio.to_thread(publish_indexes, tenant_id)
+    await invalidate_results(tenant_id)
+
     return None
 
@@ -3,11 +3,27 @@ RAG Retrieval Endpoints
 Handles document retrieval and context generation.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel, Field
+import asyncio
+import time
 
-from app.core.security import get_current_user
+from app.core.config import settings
+from app.core.security import get_current_tenant, get_current_user
+from app.services.llm.embeddings import embed_query
+from app.services.rag.partitions import Partition, get_partition
+from app.services.rag.diversity import merge_adjacent
+from app.services.rag.result_cache import current_generation, get_result_cache
+from app.services.rag.reranker import rerank
+from app.services.rag.semantic_cache import get_semantic_cache, scope_for
+from app.services.rag.retriever import (
+    diversify,
+    hybrid_retrieve,
+    retrieve,
+    retrieve_batch,
+)
+from app.services.vector import SearchHit
 
 router = APIRouter()
 
@@ -18,6 +34,19 @@ class RetrievalQuery(BaseModel):
     top_k: int = Field(default=5, ge=1, le=20, description="Number of results to return")
     filters: Optional[Dict[str, Any]] = Field(default=None, description="Optional metadata filters")
     similarity_threshold: float = Field(default=0.7, ge=0.0, le=1.0, description="Minimum similarity score")
+    rerank: bool = Field(default=False, description="Rerank candidates with the cross-encoder")
+    mmr: bool = Field(default=False, description="Diversify results with maximal marginal relevance")
+    mmr_lambda: float = Field(default=0.5, ge=0.0, le=1.0, description="MMR relevance/diversity trade-off")
+    merge_adjacent: bool = Field(default=False, description="Merge adjacent chunks of the same document")
+
+    @property
+    def candidate_pool(self) -> int:
+        """Number of vector search candidates the requested stages choose from."""
+        if self.mmr:
+            return max(self.top_k, settings.MMR_CANDIDATES)
+        if self.rerank:
+            return max(self.top_k, settings.RERANK_CANDIDATES)
+        return self.top_k
 
 
 class RetrievedChunk(BaseModel):
@@ -26,6 +55,7 @@ class RetrievedChunk(BaseModel):
     document_id: str
     content: str
     score: float
+    rerank_score: Optional[float] = None
     metadata: Dict[str, Any]
 
 
@@ -35,12 +65,70 @@ class RetrievalResponse(BaseModel):
     results: List[RetrievedChunk]
     total_results: int
     processing_time: float
+    cache_hit: bool = False
+
+
+class BatchRetrievalQuery(BaseModel):
+    """Request model for a batch of retrieval queries."""
+    queries: List[RetrievalQuery] = Field(
+        ..., min_length=1, max_length=settings.RETRIEVAL_MAX_BATCH_SIZE
+    )
+
+
+class BatchRetrievalResponse(BaseModel):
+    """Response model for a batch of retrieval queries."""
+    responses: List[RetrievalResponse]
+    total_queries: int
+    processing_time: float
+
+
+def to_retrieved_chunk(hit: SearchHit) -> RetrievedChunk:
+    """Convert a vector store hit into the API response model."""
+    return RetrievedChunk(
+        chunk_id=hit.record.chunk_id,
+        document_id=hit.record.document_id,
+        content=hit.record.content,
+        score=hit.score,
+        rerank_score=hit.rerank_score,
+        metadata=hit.record.metadata,
+    )
+
+
+async def select_hits(
+    partition: Partition, query: RetrievalQuery, hits: List[SearchHit]
+) -> Tuple[List[SearchHit], bool]:
+    """
+    Apply a query's post-retrieval stages to its candidate pool.
+
+    MMR picks ``top_k`` diverse candidates, the cross-encoder orders them,
+    and adjacent chunks of the same document are merged last so that each
+    stage still sees individual chunks.
+
+    Args:
+        partition: Partition the candidates came from
+        query: Retrieval query parameters
+        hits: Candidate pool, best first
+
+    Returns:
+        Final hits and whether reranking (if requested) finished before its deadline
+    """
+    complete = True
+    if query.mmr:
+        hits = await diversify(partition, query.query, hits, query.top_k, query.mmr_lambda)
+    if query.rerank:
+        hits, complete = await rerank(query.query, hits, query.top_k)
+    else:
+        hits = hits[: query.top_k]
+    if query.merge_adjacent:
+        hits = merge_adjacent(hits, settings.CHUNK_OVERLAP)
+    return hits, complete
 
 
 @router.post("/query", response_model=RetrievalResponse)
 async def retrieve_documents(
     query: RetrievalQuery,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ) -> RetrievalResponse:
     """
     Retrieve relevant documents for a query.
@@ -48,21 +136,123 @@ async def retrieve_documents(
     Args:
         query: Retrieval query parameters
         current_user: Current authenticated user
+        tenant_id: Tenant whose partition is searched
 
     Returns:
-        Retrieved document chunks with similarity scores
+        Retrieved document chunks with similarity scores, served from the
+        result cache when an identical query has already been answered, or
+        from the semantic cache when a near-duplicate with the same filters
+        and parameters has. With ``mmr``, near-duplicate chunks give way to
+        distinct ones; with ``rerank``, chunks are ordered by cross-encoder
+        score (results that missed the rerank deadline are not cached); with
+        ``merge_adjacent``, neighbouring chunks of a document come back as
+        one passage.
     """
-    # TODO: Generate query embedding
-    # TODO: Search vector store
-    # TODO: Apply filters
-    # TODO: Rank results
+    start_time = time.perf_counter()
+
+    cache = get_result_cache()
+    generation = await current_generation(tenant_id)
+    cache_key = None
+    cached = None
+    if cache is not None and generation is not None:
+        cache_key = await cache.key_for(
+            tenant_id, current_user.get("sub", ""), query.model_dump(), generation
+        )
+        cached = await cache.get(cache_key)
+
+    semantic = get_semantic_cache()
+    scope = None
+    if cached is None and semantic is not None and generation is not None:
+        scope = await scope_for(tenant_id, query.model_dump(exclude={"query"}), generation)
+        if scope is not None:
+            vector = await embed_query(query.query)
+            cached = semantic.get(scope, vector, endpoint="retrieval")
+
+    if cached is not None:
+        results = [RetrievedChunk(**chunk) for chunk in cached]
+    else:
+        # Results are stored under ``generation``, so search a snapshot at least that new
+        partition = await get_partition(tenant_id, generation)
+        hits = await retrieve(
+            partition,
+            query.query,
+            top_k=query.candidate_pool,
+            similarity_threshold=query.similarity_threshold,
+            filters=query.filters,
+        )
+        hits, complete = await select_hits(partition, query, hits)
+        results = [to_retrieved_chunk(hit) for hit in hits]
+        if complete:
+            dumped = [chunk.model_dump() for chunk in results]
+            if cache is not None and cache_key is not None:
+                await cache.set(cache_key, dumped)
+            if semantic is not None and scope is not None:
+                semantic.set(scope, vector, dumped)
 
-    # Mock response
     return RetrievalResponse(
         query=query.query,
-        results=[],
-        total_results=0,
-        processing_time=0.123,
+        results=results,
+        total_results=len(results),
+        processing_time=time.perf_counter() - start_time,
+        cache_hit=cached is not None,
+    )
+
+
+@router.post("/query:batch", response_model=BatchRetrievalResponse)
+async def retrieve_documents_batch(
+    batch: BatchRetrievalQuery,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
+) -> BatchRetrievalResponse:
+    """
+    Retrieve relevant documents for many queries in one request.
+
+    Args:
+        batch: Retrieval queries
+        current_user: Current authenticated user
+        tenant_id: Tenant whose partition is searched
+
+    Returns:
+        One retrieval response per query, in request order
+    """
+    start_time = time.perf_counter()
+
+    partition = await get_partition(tenant_id)
+    results = await retrieve_batch(
+        partition,
+        [q.query for q in batch.queries],
+        top_ks=[q.candidate_pool for q in batch.queries],
+        similarity_thresholds=[q.similarity_threshold for q in batch.queries],
+        filters=[q.filters for q in batch.queries],
+    )
+
+    staged = [
+        i for i, q in enumerate(batch.queries) if q.mmr or q.rerank or q.merge_adjacent
+    ]
+    if staged:
+        outputs = await asyncio.gather(
+            *(select_hits(partition, batch.queries[i], results[i]) for i in staged)
+        )
+        for i, (hits, _) in zip(staged, outputs, strict=True):
+            results[i] = hits
+    processing_time = time.perf_counter() - start_time
+
+    responses = []
+    for query, hits in zip(batch.queries, results, strict=True):
+        chunks = [to_retrieved_chunk(hit) for hit in hits]
+        responses.append(
+            RetrievalResponse(
+                query=query.query,
+                results=chunks,
+                total_results=len(chunks),
+                processing_time=processing_time,
+            )
+        )
+
+    return BatchRetrievalResponse(
+        responses=responses,
+        total_queries=len(responses),
+        processing_time=processing_time,
     )
 
 
@@ -72,7 +262,8 @@ async def hybrid_search(
     top_k: int = 5,
     use_semantic: bool = True,
     use_keyword: bool = True,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ) -> Dict[str, Any]:
     """
     Hybrid search combining semantic and keyword search.
@@ -83,48 +274,71 @@ async def hybrid_search(
         use_semantic: Use semantic vector search
         use_keyword: Use keyword search
         current_user: Current authenticated user
+        tenant_id: Tenant whose partition is searched
 
     Returns:
-        Combined search results
+        Combined search results ranked by reciprocal-rank fusion
     """
-    # TODO: Implement hybrid search
-    # - Semantic search using embeddings
-    # - Keyword search using PostgreSQL full-text search
-    # - Combine and rank results
+    start_time = time.perf_counter()
+
+    hits = await hybrid_retrieve(
+        await get_partition(tenant_id),
+        query,
+        top_k=top_k,
+        use_semantic=use_semantic,
+        use_keyword=use_keyword,
+    )
+    results = [to_retrieved_chunk(hit) for hit in hits]
 
     return {
         "query": query,
-        "results": [],
+        "results": results,
+        "total_results": len(results),
         "search_types": {
             "semantic": use_semantic,
             "keyword": use_keyword,
         },
+        "processing_time": time.perf_counter() - start_time,
     }
 
 
 @router.get("/similar/{document_id}")
 async def find_similar_documents(
     document_id: str,
-    top_k: int = 5,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    top_k: int = Query(default=5, ge=1, le=100),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    tenant_id: str = Depends(get_current_tenant),
 ) -> Dict[str, Any]:
     """
     Find documents similar to a given document.
 
+    Neighbours come from the precomputed document graph, so this is a lookup
+    rather than a vector search. The graph keeps ``DOCUMENT_GRAPH_K``
+    neighbours per document; larger ``top_k`` values are answered with an
+    exact scan over document vectors instead of being truncated.
+
     Args:
         document_id: Source document ID
         top_k: Number of similar documents to return
         current_user: Current authenticated user
+        tenant_id: Tenant whose documents are compared
 
     Returns:
-        Similar documents
+        Similar documents with cosine similarity between document vectors
     """
-    # TODO: Get document embeddings
-    # TODO: Search for similar embeddings
+    partition = await get_partition(tenant_id)
+    neighbors = partition.documents.similar(document_id, top_k)
+    if neighbors is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document {document_id} is not indexed",
+        )
 
     return {
         "document_id": document_id,
-        "similar_documents": [],
+        "similar_documents": [
+            {"document_id": neighbor, "score": score} for neighbor, score in neighbors
+        ],
         "top_k": top_k,
     }
 
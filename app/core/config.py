@@ -55,6 +55,17 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
 
+    # Caching
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_TTL_SECONDS: int = 86400
+    RESULT_CACHE_MAX_ENTRIES: int = 5000
+    RESULT_CACHE_TTL_SECONDS: int = 300
+    CHUNK_EMBEDDING_STORE_PATH: str = "data/chunk_embeddings.sqlite3"
+    CHUNK_EMBEDDING_REDIS_TTL_SECONDS: int = 2592000
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_MAX_DISTANCE: float = 0.05
+
     @property
     def REDIS_URL(self) -> str:
         """Generate Redis URL."""
@@ -74,6 +85,15 @@ class Settings(BaseSettings):
     OPENAI_MAX_TOKENS: int = 2000
     OPENAI_TEMPERATURE: float = 0.7
 
+    # Embeddings
+    EMBEDDING_PROVIDER: str = Field(default="openai", pattern="^(openai|sentence_transformers)$")
+    LOCAL_EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 256
+    EMBEDDING_MAX_BATCH_SIZE: Optional[int] = None  # Unset: 64 for sentence_transformers, off for openai
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_BATCH_WORKERS: Optional[int] = None  # Unset: 1 for sentence_transformers, 4 for openai
+    EMBEDDING_BATCH_INGESTION: bool = False  # Also route document chunk embeddings through the batcher
+
     # Anthropic Claude
     ANTHROPIC_API_KEY: Optional[str] = None
     ANTHROPIC_MODEL: str = "claude-3-opus-20240229"
@@ -83,6 +103,31 @@ class Settings(BaseSettings):
     PINECONE_ENVIRONMENT: Optional[str] = None
     PINECONE_INDEX_NAME: str = "llm-retrieval"
 
+    # Vector Store - local FAISS engine
+    VECTOR_STORE_PATH: str = "data/vector_store"
+    VECTOR_INDEX_TYPE: str = Field(default="hnsw", pattern="^(hnsw|ivf_flat)$")
+    EMBEDDING_DIMENSION: int = 1536
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    HNSW_EF_SEARCH_MAX: int = 2048
+    IVF_NLIST: int = 4096
+    IVF_NPROBE: int = 16
+    VECTOR_QUANTIZATION: str = Field(default="none", pattern="^(none|sq8|pq)$")
+    PQ_M: int = 64
+    RERANK_FACTOR: int = 4
+    FILTER_BRUTE_FORCE_MAX: int = 20000
+    DOCUMENT_GRAPH_K: int = 20
+    VECTOR_STORE_RELOAD_SECONDS: float = 5.0
+    VECTOR_STORE_KEEP_VERSIONS: int = 3
+    VECTOR_MEMTABLE_SIZE: int = 4096  # Vectors buffered in the exact memtable before it is sealed
+    VECTOR_MAX_SEGMENTS: int = 8  # Sealed segments per partition before the smallest are merged
+    VECTOR_COMPACTION_DEAD_RATIO: float = 0.2  # Deleted fraction at which a segment is rewritten
+    VECTOR_COMPACTION_INTERVAL_SECONDS: float = 30.0  # 0 disables background compaction
+    TENANT_CLAIM: str = "org_id"
+    TENANT_ANN_MIN_VECTORS: int = 20000
+    TENANT_PARTITIONS_MAX_LOADED: int = 256
+
     # AWS Configuration
     AWS_REGION: str = "us-east-1"
     AWS_ACCESS_KEY_ID: Optional[str] = None
@@ -91,6 +136,8 @@ class Settings(BaseSettings):
     # S3
     S3_BUCKET_NAME: str = "llm-retrieval-documents"
     S3_PREFIX: str = "documents/"
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. a MinIO or LocalStack endpoint
+    S3_UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # Bytes per multipart part (S3 minimum is 5 MiB)
 
     # AWS Lambda
     LAMBDA_FUNCTION_NAME: Optional[str] = None
@@ -98,11 +145,30 @@ class Settings(BaseSettings):
     # AWS Glue
     GLUE_JOB_NAME: Optional[str] = None
 
+    # Ingestion
+    INGESTION_WORKERS: int = 2  # Concurrent jobs per process; 0 to only enqueue
+    INGESTION_PARSE_PROCESSES: int = 2
+    INGESTION_PDF_PAGES_PER_TASK: int = 50  # PDF page range parsed per process task
+    INGESTION_JOB_LEASE_SECONDS: int = 600
+    INGESTION_JOB_TTL_SECONDS: int = 604800
+
     # RAG Configuration
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    CHUNK_SIZE_UNIT: str = Field(default="chars", pattern="^(chars|tokens)$")
+    CHUNK_TOKENIZER: str = "cl100k_base"
     TOP_K_RESULTS: int = 5
     SIMILARITY_THRESHOLD: float = 0.7
+    HYBRID_CANDIDATE_POOL: int = 50
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 50
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_TIMEOUT_MS: int = 200
+    RERANK_CACHE_MAX_ENTRIES: int = 100000
+    RERANK_CACHE_TTL_SECONDS: int = 3600
+    RETRIEVAL_MAX_BATCH_SIZE: int = 256
+    RRF_K: int = 60
+    MMR_CANDIDATES: int = 30
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
@@ -0,0 +1,54 @@
+"""
+Metrics
+Prometheus metrics shared across services.
+"""
+
+from prometheus_client import Counter, Histogram
+
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "embedding_cache_lookups_total",
+    "Query embedding cache lookups by outcome",
+    ["result"],
+)
+
+RESULT_CACHE_LOOKUPS = Counter(
+    "retrieval_result_cache_lookups_total",
+    "Retrieval result cache lookups by outcome",
+    ["result"],
+)
+
+RERANK_REQUESTS = Counter(
+    "rerank_requests_total",
+    "Cross-encoder rerank requests by outcome (complete, deadline, error)",
+    ["outcome"],
+)
+
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "semantic_cache_lookups_total",
+    "Semantic cache lookups by endpoint and outcome",
+    ["endpoint", "result"],
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Texts per batched embedding call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+EMBEDDING_QUEUE_WAIT = Histogram(
+    "embedding_queue_wait_seconds",
+    "Time a text waits in the embedding batcher before its batch starts",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 1.0),
+)
+
+DOCUMENT_PAGES_PARSED = Counter(
+    "document_pages_parsed_total",
+    "Document pages (or paragraphs and text blocks) parsed, by format",
+    ["format"],
+)
+
+DOCUMENT_PARSE_SECONDS = Counter(
+    "document_parse_seconds_total",
+    "Wall-clock seconds spent parsing documents, by format",
+    ["format"],
+)
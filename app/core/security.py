@@ -115,6 +115,37 @@ async def get_current_user(
     return payload
 
 
+def get_tenant_id(user: Dict[str, Any]) -> str:
+    """
+    Tenant that owns a user's documents.
+
+    Args:
+        user: Token payload
+
+    Returns:
+        The configured organisation claim, falling back to the subject
+    """
+    tenant_id = user.get(settings.TENANT_CLAIM) or user.get("sub")
+    if not tenant_id:
+        raise HTTPException(status_code=401, detail="Token has no tenant or subject claim")
+    return str(tenant_id)
+
+
+async def get_current_tenant(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> str:
+    """
+    Dependency to get the tenant of the current authenticated user.
+
+    Args:
+        current_user: Current authenticated user
+
+    Returns:
+        Tenant ID that scopes the user's documents and searches
+    """
+    return get_tenant_id(current_user)
+
+
 # Role-based access control decorators
 def require_role(required_role: str):
     """
@@ -0,0 +1,242 @@
+"""
+Text Chunker
+Splits a stream of extracted text into overlapping, boundary-aligned chunks.
+"""
+
+import functools
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import IO, Deque, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# A paragraph break, or whitespace after sentence-ending punctuation and closing quotes
+_BOUNDARY = re.compile(r"\n[ \t]*\n\s*|(?<=[.!?])[\"')\]]*\s+")
+
+# Upper bound on characters per token, used to cap sentences that never end
+_MAX_CHARS_PER_TOKEN = 8
+
+
+class Tokenizer(Protocol):
+    """Anything that can encode text to token ids and back, such as a tiktoken encoding."""
+
+    def encode(self, text: str) -> List[int]: ...
+
+    def decode(self, tokens: List[int]) -> str: ...
+
+
+@functools.lru_cache(maxsize=8)
+def get_tokenizer(name: Optional[str] = None) -> Tokenizer:
+    """
+    Load a tokenizer once per process.
+
+    Args:
+        name: tiktoken encoding name (defaults to ``CHUNK_TOKENIZER``)
+
+    Returns:
+        The cached tokenizer
+    """
+    # Imported lazily so character-sized chunking works without tiktoken
+    import tiktoken
+
+    return tiktoken.get_encoding(name or settings.CHUNK_TOKENIZER)
+
+
+@dataclass
+class TextChunk:
+    """A chunk of text and where it starts in the source stream."""
+
+    index: int
+    text: str
+    start: int
+
+
+Segment = Tuple[str, int, bool]
+
+
+def iter_text(file: IO[str], block_size: int = 1 << 20) -> Iterator[str]:
+    """Read a text file in fixed-size blocks."""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def iter_segments(stream: Iterable[str], max_chars: int) -> Iterator[Segment]:
+    """
+    Split streamed text into sentences and paragraphs.
+
+    Only the unfinished sentence at the end of each piece is carried over, and
+    it is cut at whitespace once it exceeds ``max_chars``, so memory stays
+    bounded however large the stream is and every character is scanned a
+    bounded number of times.
+
+    Args:
+        stream: Text pieces in order, such as file blocks or pages
+        max_chars: Longest segment to hold while waiting for a boundary
+
+    Yields:
+        (text including trailing whitespace, start offset, ends a paragraph)
+    """
+    tail = ""
+    offset = 0
+    for piece in stream:
+        buffer = tail + piece
+        cursor = 0
+        for match in _BOUNDARY.finditer(buffer):
+            # Whitespace running to the end of the buffer may continue in the next piece
+            if match.end() == len(buffer):
+                break
+            paragraph = match.group().count("\n") >= 2
+            yield buffer[cursor : match.end()], offset + cursor, paragraph
+            cursor = match.end()
+
+        while len(buffer) - cursor > max_chars:
+            space = buffer.rfind(" ", cursor, cursor + max_chars)
+            cut = space + 1 if space > cursor else cursor + max_chars
+            yield buffer[cursor:cut], offset + cursor, False
+            cursor = cut
+
+        tail = buffer[cursor:]
+        offset += cursor
+
+    if tail:
+        yield tail, offset, True
+
+
+class Chunker:
+    """
+    Packs sentences into chunks of at most ``chunk_size`` units.
+
+    A chunk ends at a sentence boundary when the next sentence would not fit,
+    or at a paragraph boundary once it is at least half full. The next chunk
+    starts with the trailing whole sentences of the previous one, up to
+    ``chunk_overlap`` units. Sizes are measured in characters or, with
+    ``unit="tokens"``, in tokenizer tokens counted once per sentence. Only a
+    ``chunk_size + chunk_overlap`` window is held in memory.
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        unit: Optional[str] = None,
+        tokenizer: Optional[Tokenizer] = None,
+    ):
+        self.chunk_size = chunk_size or settings.CHUNK_SIZE
+        self.chunk_overlap = settings.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+        self.unit = unit or settings.CHUNK_SIZE_UNIT
+        if self.unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk size unit: {self.unit}")
+        if not 0 <= self.chunk_overlap < self.chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.tokenizer = tokenizer
+        if self.unit == "tokens" and self.tokenizer is None:
+            self.tokenizer = get_tokenizer()
+
+    def _measure(self, text: str) -> int:
+        if self.unit == "chars":
+            return len(text)
+        return len(self.tokenizer.encode(text))
+
+    def _fit(self, segments: Iterable[Segment]) -> Iterator[Tuple[str, int, bool, int]]:
+        """Measure segments, splitting any single sentence longer than a chunk."""
+        for text, start, paragraph in segments:
+            size = self._measure(text)
+            if size <= self.chunk_size:
+                yield text, start, paragraph, size
+                continue
+            if self.unit == "chars":
+                pieces = [
+                    text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)
+                ]
+            else:
+                tokens = self.tokenizer.encode(text)
+                pieces = [
+                    self.tokenizer.decode(tokens[i : i + self.chunk_size])
+                    for i in range(0, len(tokens), self.chunk_size)
+                ]
+            for i, piece in enumerate(pieces):
+                yield piece, start, paragraph and i == len(pieces) - 1, self._measure(piece)
+                start += len(piece)
+
+    def chunks(self, stream: Iterable[str]) -> Iterator[TextChunk]:
+        """
+        Chunk a text stream lazily.
+
+        Args:
+            stream: Text pieces in order, e.g. from :func:`iter_text` or one per page
+
+        Yields:
+            Chunks in document order
+        """
+        max_chars = self.chunk_size
+        if self.unit == "tokens":
+            max_chars *= _MAX_CHARS_PER_TOKEN
+
+        window: Deque[Tuple[str, int, int]] = deque()
+        size = 0
+        fresh = 0
+        index = 0
+
+        def emit() -> Optional[TextChunk]:
+            text = "".join(segment for segment, _, _ in window)
+            stripped = text.strip()
+            if not stripped:
+                return None
+            start = window[0][1] + len(text) - len(text.lstrip())
+            return TextChunk(index=index, text=stripped, start=start)
+
+        for text, start, paragraph, n in self._fit(iter_segments(stream, max_chars)):
+            if window and size + n > self.chunk_size:
+                chunk = emit() if fresh else None
+                if chunk is not None:
+                    yield chunk
+                    index += 1
+                fresh = 0
+                while window and (size > self.chunk_overlap or size + n > self.chunk_size):
+                    size -= window.popleft()[2]
+
+            window.append((text, start, n))
+            size += n
+            fresh += 1
+
+            if paragraph and size >= self.chunk_size // 2:
+                chunk = emit()
+                if chunk is not None:
+                    yield chunk
+                    index += 1
+                fresh = 0
+                while window and size > self.chunk_overlap:
+                    size -= window.popleft()[2]
+
+        if fresh:
+            chunk = emit()
+            if chunk is not None:
+                yield chunk
+
+
+def chunk_text(
+    stream: Iterable[str],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    unit: Optional[str] = None,
+) -> Iterator[TextChunk]:
+    """
+    Chunk a text stream with the configured sizes.
+
+    Args:
+        stream: Text pieces in order
+        chunk_size: Maximum chunk size (defaults to ``CHUNK_SIZE``)
+        chunk_overlap: Overlap between consecutive chunks (defaults to ``CHUNK_OVERLAP``)
+        unit: ``"chars"`` or ``"tokens"`` (defaults to ``CHUNK_SIZE_UNIT``)
+
+    Yields:
+        Chunks in document order
+    """
+    return Chunker(chunk_size, chunk_overlap, unit).chunks(stream)
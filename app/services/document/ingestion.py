@@ -0,0 +1,129 @@
+"""
+Document Ingestion
+Chunks extracted text, embeds new chunks and indexes them in a tenant's partition.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from app.core.config import settings
+from app.services.document.chunker import Chunker, TextChunk
+from app.services.document.parser import Page, PageOffsets
+from app.services.llm.chunk_embeddings import EmbeddingReport, embed_chunks
+from app.services.rag.diversity import CHUNK_INDEX_KEY
+from app.services.rag.indexer import (
+    add_chunks,
+    checkpoint_indexes,
+    publish_indexes,
+    remove_document,
+    rollback_document,
+)
+from app.services.vector import ChunkRecord
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionReport:
+    """Outcome of ingesting one document."""
+
+    document_id: str
+    chunks: int = 0
+    characters: int = 0
+    embedding: EmbeddingReport = field(default_factory=EmbeddingReport)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Report as a plain dictionary."""
+        return {
+            "document_id": self.document_id,
+            "chunks": self.chunks,
+            "characters": self.characters,
+            **self.embedding.as_dict(),
+        }
+
+
+def to_record(
+    document_id: str,
+    chunk: TextChunk,
+    metadata: Dict[str, Any],
+    pages: Optional[PageOffsets] = None,
+) -> ChunkRecord:
+    """Build the stored record for a chunk of a document."""
+    page_metadata = pages.pages(chunk.start, chunk.text) if pages is not None else {}
+    return ChunkRecord(
+        chunk_id=f"{document_id}:{chunk.index}",
+        document_id=document_id,
+        content=chunk.text,
+        metadata={**metadata, CHUNK_INDEX_KEY: chunk.index, "start": chunk.start, **page_metadata},
+    )
+
+
+async def ingest_text(
+    tenant_id: str,
+    document_id: str,
+    stream: Iterable[Union[str, Page]],
+    metadata: Optional[Dict[str, Any]] = None,
+    publish: bool = True,
+    on_progress: Optional[Callable[[IngestionReport], Awaitable[None]]] = None,
+) -> IngestionReport:
+    """
+    Ingest a document's extracted text.
+
+    Chunks are embedded and indexed ``EMBEDDING_BATCH_SIZE`` at a time as the
+    chunker produces them, so the whole document is never held in memory.
+    Re-ingesting a document ID replaces the chunks indexed for it before.
+    If ingestion fails part way, the document's unpublished writes are rolled
+    back so the partition keeps the chunks it had before.
+    When the stream yields numbered pages, each chunk records the first and
+    last page it spans as ``page`` and ``page_end`` metadata.
+
+    Args:
+        tenant_id: Tenant that owns the document
+        document_id: Document ID
+        stream: Extracted text pieces or parsed pages in order
+        metadata: Metadata copied onto every chunk
+        publish: Publish the tenant's indexes to other workers when done
+        on_progress: Called with the running report after each indexed batch
+
+    Returns:
+        Chunk counts and what chunk deduplication saved
+    """
+    metadata = metadata or {}
+    report = IngestionReport(document_id=document_id)
+    batch: List[ChunkRecord] = []
+    partition, checkpoint = await asyncio.to_thread(checkpoint_indexes, tenant_id)
+
+    async def flush() -> None:
+        vectors, embedding = await embed_chunks([record.content for record in batch])
+        await asyncio.to_thread(add_chunks, tenant_id, list(batch), vectors)
+        report.chunks += len(batch)
+        report.embedding.merge(embedding)
+        last = batch[-1]
+        report.characters = last.metadata["start"] + len(last.content)
+        batch.clear()
+        if on_progress is not None:
+            await on_progress(report)
+
+    try:
+        replaced = await asyncio.to_thread(remove_document, tenant_id, document_id)
+        pages = PageOffsets()
+        for chunk in Chunker().chunks(pages.wrap(stream)):
+            batch.append(to_record(document_id, chunk, metadata, pages))
+            if len(batch) >= settings.EMBEDDING_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    except BaseException:
+        await asyncio.to_thread(rollback_document, tenant_id, document_id, partition, checkpoint)
+        raise
+
+    if publish and (report.chunks or replaced):
+        await asyncio.to_thread(publish_indexes, tenant_id)
+    logger.info(
+        f"Ingested document {document_id} for tenant {tenant_id}: {report.chunks} chunks, "
+        f"{report.embedding.deduplicated} deduplicated, "
+        f"{report.embedding.embedding_calls_saved} embedding calls saved"
+    )
+    return report
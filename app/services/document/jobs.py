@@ -0,0 +1,244 @@
+"""
+Ingestion Jobs
+Durable queue of document ingestion jobs and their live status.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Set
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PARSING = "parsing"
+INDEXING = "indexing"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the document it is ingesting was deleted."""
+
+
+@dataclass
+class IngestionJob:
+    """A document waiting for or going through ingestion."""
+
+    document_id: str
+    tenant_id: str
+    bucket: str
+    key: str
+    content_type: str
+    filename: Optional[str] = None
+    uploaded_by: Optional[str] = None
+    status: str = QUEUED
+    progress: float = 0.0
+    chunks_count: int = 0
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Job as a plain dictionary."""
+        return asdict(self)
+
+
+class JobQueue:
+    """
+    In-process job queue.
+
+    Jobs are lost on restart and are only visible to this process, so this is
+    the fallback for single-worker development setups without Redis.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._pending: "asyncio.Queue[str]" = asyncio.Queue()
+        self._cancelled: Set[str] = set()
+
+    async def enqueue(self, job: IngestionJob) -> None:
+        """Store a job and make it available to workers."""
+        self._jobs[job.document_id] = job
+        self._cancelled.discard(job.document_id)
+        self._pending.put_nowait(job.document_id)
+
+    async def claim(self, timeout: float) -> Optional[IngestionJob]:
+        """
+        Take the next job, waiting up to ``timeout`` seconds for one.
+
+        A claimed job stays leased to the caller until it is acknowledged.
+        """
+        try:
+            document_id = await asyncio.wait_for(self._pending.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if document_id in self._cancelled:
+            return None
+        job = self._jobs[document_id]
+        job.attempts += 1
+        return job
+
+    async def get(self, document_id: str) -> Optional[IngestionJob]:
+        """Look up a job by document ID."""
+        return self._jobs.get(document_id)
+
+    async def update(self, job: IngestionJob, **changes: Any) -> None:
+        """Update a job's status fields."""
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        self._jobs[job.document_id] = job
+
+    async def heartbeat(self, job: IngestionJob) -> None:
+        """Renew a claimed job's lease so it is not requeued while still running."""
+        await self.update(job)
+
+    async def cancel(self, job: IngestionJob) -> None:
+        """
+        Cancel a job whose document was deleted.
+
+        A queued job is never claimed, and a worker processing it stops at its
+        next check and removes whatever it indexed, so a finishing job cannot
+        bring the deleted document back.
+        """
+        self._cancelled.add(job.document_id)
+        await self.update(job, status=CANCELLED)
+
+    async def cancelled(self, document_id: str) -> bool:
+        """Whether a document's job was cancelled."""
+        return document_id in self._cancelled
+
+    async def ack(self, job: IngestionJob) -> None:
+        """Release a finished job's lease."""
+
+    async def requeue_stale(self, lease_seconds: float) -> int:
+        """Return jobs whose worker stopped heartbeating to the queue."""
+        return 0
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Redis-backed reliable job queue shared by every API and worker process.
+
+    Job state lives in one JSON value per document. Claiming atomically moves
+    a job ID from the pending list to the processing list, so a worker that
+    dies mid-job leaves the ID behind; ``requeue_stale`` moves such jobs back
+    once their status has not been updated for a full lease. Workers renew
+    the lease with periodic heartbeats while a job runs. Cancellation is a
+    separate key, so a worker's own status writes cannot overwrite it.
+    """
+
+    JOB_PREFIX = "ingest:v1:job:"
+    CANCELLED_PREFIX = "ingest:v1:cancelled:"
+    PENDING = "ingest:v1:pending"
+    PROCESSING = "ingest:v1:processing"
+
+    def __init__(self, redis_client: redis.Redis, ttl_seconds: int):
+        self._redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    async def _save(self, job: IngestionJob) -> None:
+        await self._redis.set(
+            f"{self.JOB_PREFIX}{job.document_id}", json.dumps(job.as_dict()), ex=self.ttl_seconds
+        )
+
+    async def enqueue(self, job: IngestionJob) -> None:
+        await self._save(job)
+        await self._redis.delete(f"{self.CANCELLED_PREFIX}{job.document_id}")
+        await self._redis.lpush(self.PENDING, job.document_id)
+
+    async def claim(self, timeout: float) -> Optional[IngestionJob]:
+        # BLMOVE needs a whole number of seconds, and 0 would block forever
+        document_id = await self._redis.blmove(
+            self.PENDING, self.PROCESSING, max(1, round(timeout)), "RIGHT", "LEFT"
+        )
+        if document_id is None:
+            return None
+        job = await self.get(document_id.decode("utf-8"))
+        if job is None or await self.cancelled(job.document_id):
+            # The job record expired or its document was deleted while queued
+            await self._redis.lrem(self.PROCESSING, 1, document_id)
+            return None
+        await self.update(job, attempts=job.attempts + 1)
+        return job
+
+    async def get(self, document_id: str) -> Optional[IngestionJob]:
+        value = await self._redis.get(f"{self.JOB_PREFIX}{document_id}")
+        return IngestionJob(**json.loads(value)) if value is not None else None
+
+    async def update(self, job: IngestionJob, **changes: Any) -> None:
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        await self._save(job)
+
+    async def cancel(self, job: IngestionJob) -> None:
+        await self._redis.set(f"{self.CANCELLED_PREFIX}{job.document_id}", 1, ex=self.ttl_seconds)
+        await self.update(job, status=CANCELLED)
+
+    async def cancelled(self, document_id: str) -> bool:
+        return bool(await self._redis.exists(f"{self.CANCELLED_PREFIX}{document_id}"))
+
+    async def ack(self, job: IngestionJob) -> None:
+        await self._redis.lrem(self.PROCESSING, 1, job.document_id)
+
+    async def requeue_stale(self, lease_seconds: float) -> int:
+        requeued = 0
+        cutoff = time.time() - lease_seconds
+        for document_id in await self._redis.lrange(self.PROCESSING, 0, -1):
+            job = await self.get(document_id.decode("utf-8"))
+            if job is not None and job.updated_at > cutoff:
+                continue
+            # Only the process that removes the ID gets to requeue it
+            if await self._redis.lrem(self.PROCESSING, 1, document_id):
+                if job is not None and not await self.cancelled(job.document_id):
+                    await self.update(job, status=QUEUED)
+                    await self._redis.lpush(self.PENDING, document_id)
+                    requeued += 1
+        if requeued:
+            logger.warning(f"Requeued {requeued} ingestion jobs abandoned by their workers")
+        return requeued
+
+
+_queue: Optional[JobQueue] = None
+
+
+def init_job_queue(redis_client: Optional[redis.Redis] = None) -> JobQueue:
+    """
+    Create the process-wide ingestion job queue.
+
+    Args:
+        redis_client: Shared Redis client; without one jobs are kept in-process
+
+    Returns:
+        The job queue
+    """
+    global _queue
+    if redis_client is None:
+        logger.warning(
+            "Redis unavailable: ingestion jobs are queued in-process and lost on restart"
+        )
+        _queue = JobQueue()
+    else:
+        _queue = RedisJobQueue(redis_client, ttl_seconds=settings.INGESTION_JOB_TTL_SECONDS)
+    return _queue
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Get the process-wide ingestion job queue, or ``None`` if it is not initialized."""
+    return _queue
+
+
+def close_job_queue() -> None:
+    """Drop the process-wide ingestion job queue."""
+    global _queue
+    _queue = None
@@ -0,0 +1,270 @@
+"""
+Document Parser
+Extracts page-ordered text from PDF, DOCX, PPTX, HTML, Markdown and plain-text files.
+"""
+
+import bisect
+import codecs
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+HTML = "text/html"
+MARKDOWN = "text/markdown"
+TEXT = "text/plain"
+
+# Short names used in logs and metric labels
+FORMAT_NAMES = {
+    PDF: "pdf",
+    DOCX: "docx",
+    PPTX: "pptx",
+    HTML: "html",
+    MARKDOWN: "markdown",
+    TEXT: "text",
+}
+
+Source = Union[str, BinaryIO]
+
+
+@dataclass
+class Page:
+    """Text of one page of a document, in reading order."""
+
+    # 1-based page (PDF) or slide (PPTX) number; None for formats without pages
+    number: Optional[int]
+    text: str
+
+
+class PageOffsets:
+    """
+    Remembers where each numbered page starts in a stream of pages.
+
+    Wrapping the stream passed to the chunker records page boundaries as the
+    chunker consumes it, so a chunk can be traced back to the pages it spans.
+    """
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._numbers: List[int] = []
+
+    def wrap(self, stream: Iterable[Union[str, Page]]) -> Iterator[str]:
+        """Yield the text of each piece, recording the start of numbered pages."""
+        offset = 0
+        for piece in stream:
+            if isinstance(piece, Page):
+                if piece.number is not None:
+                    self._starts.append(offset)
+                    self._numbers.append(piece.number)
+                piece = piece.text
+            offset += len(piece)
+            yield piece
+
+    def page_at(self, offset: int) -> Optional[int]:
+        """Number of the page holding a character offset, if pages are numbered."""
+        position = bisect.bisect_right(self._starts, offset) - 1
+        return self._numbers[position] if position >= 0 else None
+
+    def pages(self, start: int, text: str) -> Dict[str, int]:
+        """``page`` and ``page_end`` metadata for a chunk; empty without page numbers."""
+        first = self.page_at(start)
+        if first is None:
+            return {}
+        return {"page": first, "page_end": self.page_at(start + max(len(text) - 1, 0))}
+
+
+@contextmanager
+def _open_binary(source: Source) -> Iterator[BinaryIO]:
+    """Open a path, or pass a file object through without closing it."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        yield source
+
+
+def _pdf_pages(
+    file: BinaryIO, block_size: int, start: int = 0, stop: Optional[int] = None
+) -> Iterator[Page]:
+    from pypdf import PdfReader
+
+    # pypdf reads a path fully into memory, but parses a file object in place
+    pages = PdfReader(file).pages
+    for number in range(start, len(pages) if stop is None else min(stop, len(pages))):
+        yield Page(number + 1, (pages[number].extract_text() or "") + "\n\n")
+
+
+def _docx_pages(file: BinaryIO, block_size: int) -> Iterator[Page]:
+    # Imported lazily so worker processes that never see DOCX skip loading it
+    import docx
+
+    for paragraph in docx.Document(file).paragraphs:
+        yield Page(None, paragraph.text + "\n\n")
+
+
+def _pptx_pages(file: BinaryIO, block_size: int) -> Iterator[Page]:
+    from pptx import Presentation
+
+    for number, slide in enumerate(Presentation(file).slides, start=1):
+        texts = [
+            shape.text_frame.text
+            for shape in slide.shapes
+            if shape.has_text_frame and shape.text_frame.text
+        ]
+        yield Page(number, "\n".join(texts) + "\n\n")
+
+
+_BLOCK_TAGS = [
+    "p",
+    "div",
+    "br",
+    "li",
+    "tr",
+    "pre",
+    "blockquote",
+    "section",
+    "article",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "title",
+    "table",
+]
+
+
+def _markup_text(markup: str) -> str:
+    from bs4 import BeautifulSoup
+
+    try:
+        soup = BeautifulSoup(markup, "lxml")
+    except Exception:
+        soup = BeautifulSoup(markup, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    # Break lines after block elements only, so inline markup stays in its sentence
+    for tag in soup.find_all(_BLOCK_TAGS):
+        tag.append("\n")
+    lines = (" ".join(line.split()) for line in soup.get_text().splitlines())
+    return "\n".join(line for line in lines if line) + "\n\n"
+
+
+def _html_pages(file: BinaryIO, block_size: int) -> Iterator[Page]:
+    yield Page(None, _markup_text(file.read().decode("utf-8", errors="replace")))
+
+
+def _markdown_pages(file: BinaryIO, block_size: int) -> Iterator[Page]:
+    import markdown
+
+    yield Page(None, _markup_text(markdown.markdown(file.read().decode("utf-8", errors="replace"))))
+
+
+def _text_pages(file: BinaryIO, block_size: int) -> Iterator[Page]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while block := file.read(block_size):
+        text = decoder.decode(block)
+        if text:
+            yield Page(None, text)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield Page(None, tail)
+
+
+PAGE_PARSERS: Dict[str, Callable[[BinaryIO, int], Iterator[Page]]] = {
+    PDF: _pdf_pages,
+    DOCX: _docx_pages,
+    PPTX: _pptx_pages,
+    HTML: _html_pages,
+    MARKDOWN: _markdown_pages,
+}
+
+
+def iter_document(source: Source, content_type: str, block_size: int = 1 << 20) -> Iterator[Page]:
+    """
+    Extract a document's pages lazily, in reading order.
+
+    PDF pages are parsed one at a time as the iterator advances, so feeding
+    this to the chunker never holds more than one page of text. Sources can
+    be a local path or any seekable binary file, such as an ``S3RangeFile``.
+    Unknown content types are read as UTF-8 text.
+
+    Args:
+        source: Local path or seekable binary file
+        content_type: MIME type of the document
+        block_size: Bytes decoded at a time for plain text
+
+    Yields:
+        Pages (PDF pages, PPTX slides, DOCX paragraphs, blocks of plain text)
+    """
+    parse = PAGE_PARSERS.get(content_type, _text_pages)
+    with _open_binary(source) as file:
+        yield from parse(file, block_size)
+
+
+def iter_pages(source: Source, content_type: str, block_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Extract a document's text lazily, in reading order.
+
+    Args:
+        source: Local path or seekable binary file
+        content_type: MIME type of the document
+        block_size: Bytes decoded at a time for plain text
+
+    Yields:
+        Text of each page from :func:`iter_document`
+    """
+    for page in iter_document(source, content_type, block_size):
+        yield page.text
+
+
+def pdf_page_count(path: str) -> int:
+    """Number of pages in a PDF."""
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+
+def parse_pages(
+    path: str, content_type: str, start: int = 0, stop: Optional[int] = None
+) -> List[Page]:
+    """
+    Parse a document, or a range of a PDF's pages.
+
+    Parsing is CPU-bound, so callers run this in a worker process; it only
+    takes and returns picklable values.
+
+    Args:
+        path: Local path of the document
+        content_type: MIME type of the document
+        start: First PDF page to parse (0-based)
+        stop: PDF page to stop before; ``None`` for the last page
+
+    Returns:
+        Pages in reading order
+    """
+    if content_type == PDF:
+        with open(path, "rb") as f:
+            return list(_pdf_pages(f, 0, start, stop))
+    return list(iter_document(path, content_type))
+
+
+def extract_text(path: str, content_type: str) -> List[str]:
+    """
+    Extract a document's text.
+
+    Args:
+        path: Local path of the document
+        content_type: MIME type of the document
+
+    Returns:
+        Text pieces in reading order (one per PDF page or DOCX paragraph)
+    """
+    return [page.text for page in parse_pages(path, content_type)]
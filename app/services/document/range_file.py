@@ -0,0 +1,114 @@
+"""
+S3 Range File
+Seekable, read-only file object over an S3 object, backed by ranged GETs.
+"""
+
+import io
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class S3RangeFile(io.RawIOBase):
+    """
+    Read an S3 object through HTTP range requests.
+
+    The object is split into fixed-size blocks. A read fetches the block it
+    needs plus ``read_ahead`` following blocks in one ranged GET, and keeps
+    at most ``max_blocks`` blocks in an LRU, so memory stays bounded by
+    ``block_size * max_blocks`` no matter how large the object is or how
+    much a parser seeks around it (pypdf reads the trailer at the end first,
+    then jumps between objects).
+
+    The client must be a synchronous boto3 client; use this from a worker
+    thread when the caller is async.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        key: str,
+        size: Optional[int] = None,
+        block_size: int = 1024 * 1024,
+        read_ahead: int = 1,
+        max_blocks: int = 8,
+    ):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.block_size = block_size
+        self.read_ahead = read_ahead
+        self.max_blocks = max(max_blocks, read_ahead + 1)
+        self.content_type: Optional[str] = None
+        if size is None:
+            head = client.head_object(Bucket=bucket, Key=key)
+            size = head["ContentLength"]
+            self.content_type = head.get("ContentType")
+        self.size = size
+        self.requests = 0
+        self.bytes_fetched = 0
+        self._position = 0
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def _fetch(self, first: int) -> None:
+        last = min(first + self.read_ahead, (self.size - 1) // self.block_size)
+        start = first * self.block_size
+        end = min((last + 1) * self.block_size, self.size) - 1
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end}"
+        )
+        data = response["Body"].read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        for number in range(first, last + 1):
+            offset = (number - first) * self.block_size
+            self._blocks[number] = data[offset : offset + self.block_size]
+            self._blocks.move_to_end(number)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _block(self, number: int) -> bytes:
+        if number not in self._blocks:
+            self._fetch(number)
+        self._blocks.move_to_end(number)
+        return self._blocks[number]
+
+    def readinto(self, buffer: Any) -> int:
+        view = memoryview(buffer).cast("B")
+        wanted = min(len(view), max(self.size - self._position, 0))
+        copied = 0
+        while copied < wanted:
+            number, offset = divmod(self._position, self.block_size)
+            block = self._block(number)
+            take = min(len(block) - offset, wanted - copied)
+            view[copied : copied + take] = block[offset : offset + take]
+            copied += take
+            self._position += take
+        return copied
@@ -0,0 +1,209 @@
+"""
+Document Storage
+Streams uploaded documents to S3 in fixed-size multipart parts.
+"""
+
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Optional, Protocol
+
+from app.core.config import settings
+from app.services.document.parser import DOCX, HTML, MARKDOWN, PDF, PPTX, TEXT
+from app.utils.tenancy import partition_dirname
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_TYPES = (PDF, TEXT, DOCX, PPTX, HTML, MARKDOWN)
+
+# Formats stored as ZIP archives, and text formats told apart only by the client
+ZIP_TYPES = (DOCX, PPTX)
+TEXT_TYPES = (TEXT, HTML, MARKDOWN)
+
+# S3 rejects multipart parts smaller than this, except the last
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload's content is not an accepted document type."""
+
+
+class AsyncReadable(Protocol):
+    """Async byte source such as a Starlette ``UploadFile``."""
+
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+@dataclass
+class StoredObject:
+    """An object written to S3 and what was learned while streaming it."""
+
+    bucket: str
+    key: str
+    size: int
+    sha256: str
+    content_type: str
+
+
+def sniff_content_type(head: bytes, declared: Optional[str] = None) -> Optional[str]:
+    """
+    Detect a document type from its first bytes.
+
+    DOCX and PPTX files are ZIP archives, so a ZIP signature is accepted only
+    when the client declared one of them. HTML and Markdown are kept when
+    declared for UTF-8 content; other text is stored as plain text.
+
+    Args:
+        head: Leading bytes of the file
+        declared: Content type sent by the client
+
+    Returns:
+        Detected MIME type, or ``None`` if the content is not an accepted type
+    """
+    if head.startswith(b"%PDF-"):
+        return PDF
+    if head.startswith(b"PK\x03\x04"):
+        return declared if declared in ZIP_TYPES else None
+    if b"\x00" in head:
+        return None
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still text
+        if e.start < len(head) - 3:
+            return None
+    return declared if declared in TEXT_TYPES else TEXT
+
+
+def document_key(tenant_id: str, document_id: str) -> str:
+    """S3 key of a tenant's uploaded document."""
+    return f"{settings.S3_PREFIX}{partition_dirname(tenant_id)}/{document_id}"
+
+
+async def _read_part(source: AsyncReadable, size: int) -> bytes:
+    """Read exactly ``size`` bytes, or fewer only at end of stream."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        block = await source.read(size - len(buffer))
+        if not block:
+            break
+        buffer += block
+    return bytes(buffer)
+
+
+@asynccontextmanager
+async def s3_client() -> AsyncIterator[Any]:
+    """Open an aioboto3 S3 client for the configured account and endpoint."""
+    # Imported lazily so the API can start without the AWS SDK configured
+    import aioboto3
+
+    session = aioboto3.Session(
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+    )
+    async with session.client("s3", endpoint_url=settings.S3_ENDPOINT_URL) as client:
+        yield client
+
+
+async def stream_to_s3(
+    client: Any,
+    source: AsyncReadable,
+    bucket: str,
+    key: str,
+    declared_type: Optional[str] = None,
+    part_size: Optional[int] = None,
+) -> StoredObject:
+    """
+    Upload a byte stream to S3 holding at most one part in memory.
+
+    The first part is used to sniff the content type before anything is
+    written. Files shorter than one part are sent with a single
+    ``PutObject``; others go through a multipart upload that is aborted if
+    any part fails. Each part is uploaded before the next one is read, so a
+    file of exactly one part still takes the multipart path. The SHA-256 and
+    size are computed as the parts pass through.
+
+    Args:
+        client: aioboto3 S3 client
+        source: Byte stream to upload
+        bucket: Target bucket
+        key: Target object key
+        declared_type: Content type sent by the client
+        part_size: Bytes per part (defaults to ``S3_UPLOAD_PART_SIZE``)
+
+    Returns:
+        Location, size, hash and detected type of the stored object
+
+    Raises:
+        UploadRejected: If the content is not an accepted document type
+    """
+    part_size = max(part_size or settings.S3_UPLOAD_PART_SIZE, MIN_PART_SIZE)
+    digest = hashlib.sha256()
+
+    part = await _read_part(source, part_size)
+    content_type = sniff_content_type(part[:8192], declared_type)
+    if content_type is None:
+        raise UploadRejected(f"Content of {key} is not a supported document type")
+
+    if len(part) < part_size:
+        digest.update(part)
+        await client.put_object(Bucket=bucket, Key=key, Body=part, ContentType=content_type)
+        return StoredObject(bucket, key, len(part), digest.hexdigest(), content_type)
+
+    upload = await client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)
+    upload_id = upload["UploadId"]
+    parts = []
+    size = 0
+    try:
+        while part:
+            digest.update(part)
+            size += len(part)
+            number = len(parts) + 1
+            response = await client.upload_part(
+                Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=part
+            )
+            parts.append({"PartNumber": number, "ETag": response["ETag"]})
+            if len(part) < part_size:
+                break
+            # Release the uploaded part before reading the next, so only one is ever held
+            part = b""
+            part = await _read_part(source, part_size)
+
+        await client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        logger.warning(f"Aborting multipart upload of s3://{bucket}/{key} after {len(parts)} parts")
+        await client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    logger.info(f"Uploaded s3://{bucket}/{key} ({size} bytes in {len(parts)} parts)")
+    return StoredObject(bucket, key, size, digest.hexdigest(), content_type)
+
+
+async def download_to_file(
+    client: Any, bucket: str, key: str, path: str, block_size: int = 1024 * 1024
+) -> int:
+    """
+    Stream an S3 object to a local file.
+
+    Args:
+        client: aioboto3 S3 client
+        bucket: Source bucket
+        key: Source object key
+        path: Local file to write
+        block_size: Bytes read from the response body at a time
+
+    Returns:
+        Number of bytes written
+    """
+    response = await client.get_object(Bucket=bucket, Key=key)
+    written = 0
+    async with response["Body"] as body:
+        with open(path, "wb") as f:
+            while block := await body.read(block_size):
+                f.write(block)
+                written += len(block)
+    return written
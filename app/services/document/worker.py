@@ -0,0 +1,226 @@
+"""
+Ingestion Workers
+Background workers that turn queued uploads into indexed chunks.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncContextManager, Callable, List, Optional
+
+from app.core.config import settings
+from app.services.document.ingestion import IngestionReport, ingest_text
+from app.services.document.jobs import (
+    CANCELLED,
+    COMPLETED,
+    FAILED,
+    INDEXING,
+    PARSING,
+    IngestionJob,
+    JobCancelled,
+    JobQueue,
+)
+from app.services.document.parallel_parser import parse_document
+from app.services.document.storage import download_to_file, s3_client
+from app.services.rag.indexer import publish_indexes, remove_document
+from app.services.rag.result_cache import invalidate_results
+
+logger = logging.getLogger(__name__)
+
+# Share of a job's progress spent downloading and parsing; indexing is the rest
+PARSE_SHARE = 0.2
+
+
+class IngestionWorkerPool:
+    """
+    Pulls ingestion jobs from the queue and processes them end to end.
+
+    Each job is downloaded from S3 and parsed on a process pool so parsing
+    never blocks the event loop, with large PDFs split into page ranges
+    parsed in parallel. Pages are then chunked, embedded in batches and
+    bulk-added to the tenant's partition by ``ingest_text``.
+    ``workers`` jobs run concurrently per process, sharing ``processes``
+    parser processes; throughput scales further with every process that
+    consumes the same Redis queue.
+
+    While a job runs its lease is renewed every third of ``lease_seconds``,
+    and after every indexed batch the worker checks whether the document
+    was deleted meanwhile.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        workers: int,
+        processes: int,
+        lease_seconds: float,
+        client_factory: Callable[[], AsyncContextManager[Any]] = s3_client,
+    ):
+        self.queue = queue
+        self.workers = workers
+        self.processes = processes
+        self.lease_seconds = lease_seconds
+        self._client_factory = client_factory
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a process that holds FAISS indexes and a running event loop is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._requeue_stale()))
+
+    async def stop(self) -> None:
+        """
+        Stop the workers and the parser processes.
+
+        Jobs interrupted here stay leased and are requeued by a surviving
+        process once their lease expires.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def process(self, job: IngestionJob) -> None:
+        """
+        Ingest one claimed job and record its outcome.
+
+        Args:
+            job: Job claimed from the queue
+        """
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await self.queue.update(job, status=PARSING, progress=0.0, error=None)
+            with tempfile.TemporaryDirectory() as workdir:
+                path = os.path.join(workdir, "document")
+                async with self._client_factory() as client:
+                    await download_to_file(client, job.bucket, job.key, path)
+                parsed = await parse_document(path, job.content_type, self._get_pool())
+
+            total = max(sum(len(page.text) for page in parsed.pages), 1)
+            await self.queue.update(job, status=INDEXING, progress=PARSE_SHARE)
+
+            async def on_progress(report: IngestionReport) -> None:
+                if await self.queue.cancelled(job.document_id):
+                    raise JobCancelled(job.document_id)
+                done = min(report.characters / total, 1.0)
+                await self.queue.update(
+                    job, progress=PARSE_SHARE + (1 - PARSE_SHARE) * done, chunks_count=report.chunks
+                )
+
+            metadata = {"filename": job.filename} if job.filename else {}
+            report = await ingest_text(
+                job.tenant_id,
+                job.document_id,
+                parsed.pages,
+                metadata=metadata,
+                on_progress=on_progress,
+            )
+            # Checked after the chunks are in, so a delete racing the last batch still wins
+            if await self.queue.cancelled(job.document_id):
+                raise JobCancelled(job.document_id)
+            await self.queue.update(job, status=COMPLETED, progress=1.0, chunks_count=report.chunks)
+            await invalidate_results(job.tenant_id)
+        except asyncio.CancelledError:
+            raise
+        except JobCancelled:
+            await self._discard(job)
+        except Exception as e:
+            logger.error(f"Ingestion of document {job.document_id} failed: {e}", exc_info=True)
+            await self.queue.update(job, status=FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        await self.queue.ack(job)
+
+    async def _heartbeat(self, job: IngestionJob) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.queue.heartbeat(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Renewing the lease of document {job.document_id} failed: {e}")
+
+    async def _discard(self, job: IngestionJob) -> None:
+        """Remove the chunks a job indexed for a document deleted while it ran."""
+        if await asyncio.to_thread(remove_document, job.tenant_id, job.document_id):
+            await asyncio.to_thread(publish_indexes, job.tenant_id)
+        await invalidate_results(job.tenant_id)
+        await self.queue.update(job, status=CANCELLED)
+        logger.info(f"Stopped ingesting document {job.document_id}: it was deleted")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                job = await self.queue.claim(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Claiming an ingestion job failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if job is not None:
+                await self.process(job)
+
+    async def _requeue_stale(self) -> None:
+        while True:
+            try:
+                await self.queue.requeue_stale(self.lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Requeueing stale ingestion jobs failed: {e}")
+            await asyncio.sleep(self.lease_seconds / 2)
+
+
+_workers: Optional[IngestionWorkerPool] = None
+
+
+def init_ingestion_workers(queue: JobQueue) -> Optional[IngestionWorkerPool]:
+    """
+    Start the process-wide ingestion workers.
+
+    Args:
+        queue: Queue to consume
+
+    Returns:
+        The worker pool, or ``None`` when ``INGESTION_WORKERS`` is 0 (this
+        process only enqueues and other processes do the work)
+    """
+    global _workers
+    if settings.INGESTION_WORKERS <= 0:
+        _workers = None
+        return None
+    _workers = IngestionWorkerPool(
+        queue,
+        workers=settings.INGESTION_WORKERS,
+        processes=settings.INGESTION_PARSE_PROCESSES,
+        lease_seconds=settings.INGESTION_JOB_LEASE_SECONDS,
+    )
+    _workers.start()
+    return _workers
+
+
+async def close_ingestion_workers() -> None:
+    """Stop the process-wide ingestion workers."""
+    global _workers
+    if _workers is not None:
+        await _workers.stop()
+    _workers = None
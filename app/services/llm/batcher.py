@@ -0,0 +1,201 @@
+"""
+Embedding Batcher
+Coalesces concurrent embedding requests into batched provider calls.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+EmbedFunction = Callable[[List[str]], Awaitable[np.ndarray]]
+
+# Defaults when EMBEDDING_MAX_BATCH_SIZE / EMBEDDING_BATCH_WORKERS are unset
+LOCAL_MAX_BATCH_SIZE = 64
+API_BATCH_WORKERS = 4
+
+
+@dataclass
+class _Pending:
+    text: str
+    future: "asyncio.Future[np.ndarray]"
+    enqueued_at: float
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batching in front of an embedding function.
+
+    Callers enqueue texts and await their own vectors. A worker takes the
+    first waiting text, then keeps collecting until ``max_batch_size`` texts
+    are gathered or ``max_wait_ms`` has passed since that first text, and
+    embeds the batch in one call. Local models run that call in a
+    worker thread, so the event loop keeps accepting requests; requests that
+    arrive while a batch is running simply make the next batch larger.
+    With several ``workers``, that many batches can be in flight at once.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFunction,
+        max_batch_size: int,
+        max_wait_ms: float,
+        workers: int = 1,
+    ):
+        self._embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self._queue: "asyncio.Queue[_Pending]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers and fail any request still waiting in the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Embedding batcher stopped"))
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts as part of whatever batches they land in.
+
+        Args:
+            texts: Texts to embed (at least one)
+
+        Returns:
+            float32 matrix of shape (len(texts), dimension)
+        """
+        loop = asyncio.get_running_loop()
+        now = time.perf_counter()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait(_Pending(text, future, now))
+            futures.append(future)
+        return np.stack(await asyncio.gather(*futures))
+
+    async def _collect(self) -> List[_Pending]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without yielding to the event loop
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [pending for pending in await self._collect() if not pending.future.done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for pending in batch:
+                EMBEDDING_QUEUE_WAIT.observe(started - pending.enqueued_at)
+            EMBEDDING_BATCH_SIZE.observe(len(batch))
+
+            try:
+                vectors = await self._embed([pending.text for pending in batch])
+            except asyncio.CancelledError:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(RuntimeError("Embedding batcher stopped"))
+                raise
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                continue
+
+            if len(vectors) != len(batch):
+                error = RuntimeError(
+                    f"Embedding batch of {len(batch)} returned {len(vectors)} vectors"
+                )
+                logger.error(str(error))
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(error)
+                continue
+
+            for pending, vector in zip(batch, vectors, strict=True):
+                if not pending.future.done():
+                    pending.future.set_result(vector)
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def init_embedding_batcher(embed: EmbedFunction) -> Optional[EmbeddingBatcher]:
+    """
+    Start the process-wide embedding batcher.
+
+    Args:
+        embed: Function that embeds one batch, such as ``embed_with_provider``
+
+    Batching pays off for local models, where one forward pass over many
+    texts costs little more than over one. API providers already serve
+    concurrent requests in parallel, so for them batching is off unless
+    ``EMBEDDING_MAX_BATCH_SIZE`` is set, and then runs several workers so
+    calls still overlap.
+
+    Returns:
+        The batcher, or ``None`` (callers embed directly) when the effective
+        ``EMBEDDING_MAX_BATCH_SIZE`` is 1 or less
+    """
+    global _batcher
+    local = settings.EMBEDDING_PROVIDER == "sentence_transformers"
+    max_batch_size = settings.EMBEDDING_MAX_BATCH_SIZE
+    if max_batch_size is None:
+        max_batch_size = LOCAL_MAX_BATCH_SIZE if local else 1
+    if max_batch_size <= 1:
+        _batcher = None
+        return None
+    workers = settings.EMBEDDING_BATCH_WORKERS or (1 if local else API_BATCH_WORKERS)
+    _batcher = EmbeddingBatcher(
+        embed,
+        max_batch_size=max_batch_size,
+        max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+        workers=workers,
+    )
+    _batcher.start()
+    return _batcher
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """Get the process-wide embedding batcher, or ``None`` if batching is off."""
+    return _batcher
+
+
+async def close_embedding_batcher() -> None:
+    """Stop the process-wide embedding batcher."""
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+    _batcher = None
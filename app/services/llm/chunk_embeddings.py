@@ -0,0 +1,256 @@
+"""
+Chunk Embedding Store
+Content-addressed embeddings for document chunks, so unchanged text is embedded once.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.services.llm.embeddings import embed_texts, embed_with_provider, get_embedding_provider
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_chunk(text: str) -> str:
+    """Normalize chunk text so re-extracted copies of the same passage hash alike."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def chunk_hash(text: str, model: str) -> str:
+    """Content hash of a chunk under an embedding model."""
+    return hashlib.sha256(f"{model}\0{normalize_chunk(text)}".encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingStore:
+    """
+    Persistent hash → embedding store with an optional shared Redis tier.
+
+    The local tier is a SQLite file, so vectors survive restarts and are
+    shared by the processes of one host. Redis, when configured, shares them
+    across hosts; Redis hits are copied into the local tier. Redis failures
+    are logged and treated as misses.
+    """
+
+    KEY_PREFIX = "chunkemb:v1:"
+
+    def __init__(
+        self,
+        path: str,
+        redis_client: Optional[redis.Redis] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    def close(self) -> None:
+        """Close the local database."""
+        with self._lock:
+            self._db.close()
+
+    def _get_local(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = list(hashes[start : start + 500])
+                rows = self._db.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _set_local(self, items: Sequence[Tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                [
+                    (digest, np.asarray(vector, dtype=np.float32).tobytes())
+                    for digest, vector in items
+                ],
+            )
+            self._db.commit()
+
+    async def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up embeddings by chunk hash.
+
+        Args:
+            hashes: Chunk hashes
+
+        Returns:
+            Stored vector per hash that was found
+        """
+        if not hashes:
+            return {}
+        found = await asyncio.to_thread(self._get_local, hashes)
+
+        remote = [digest for digest in hashes if digest not in found]
+        if remote and self._redis is not None:
+            try:
+                values = await self._redis.mget([f"{self.KEY_PREFIX}{digest}" for digest in remote])
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"Chunk embedding Redis lookup failed: {e}")
+                values = [None] * len(remote)
+            promoted = [
+                (digest, np.frombuffer(value, dtype=np.float32))
+                for digest, value in zip(remote, values, strict=True)
+                if value is not None
+            ]
+            if promoted:
+                await asyncio.to_thread(self._set_local, promoted)
+                found.update(promoted)
+        return found
+
+    async def set_many(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Store embeddings in both tiers.
+
+        Args:
+            hashes: Chunk hashes
+            vectors: Embedding matrix, one row per hash
+        """
+        items = list(zip(hashes, np.asarray(vectors, dtype=np.float32), strict=True))
+        if not items:
+            return
+        await asyncio.to_thread(self._set_local, items)
+
+        if self._redis is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for digest, vector in items:
+                    pipe.set(f"{self.KEY_PREFIX}{digest}", vector.tobytes(), ex=self.ttl_seconds)
+                await pipe.execute()
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Chunk embedding Redis write failed: {e}")
+
+
+@dataclass
+class EmbeddingReport:
+    """How many chunks an ingestion run had to embed and what deduplication saved."""
+
+    chunks: int = 0
+    deduplicated: int = 0
+    embedded: int = 0
+    embedding_calls: int = 0
+    embedding_calls_saved: int = 0
+
+    def merge(self, other: "EmbeddingReport") -> None:
+        """Add another report's counts to this one."""
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Report as a plain dictionary."""
+        return asdict(self)
+
+
+async def embed_chunks(
+    texts: Sequence[str], batch_size: Optional[int] = None
+) -> Tuple[np.ndarray, EmbeddingReport]:
+    """
+    Embed document chunks, reusing vectors for text that was embedded before.
+
+    Chunks are hashed after normalization. Repeats within the batch and
+    hashes found in the chunk embedding store reuse their vector; only the
+    remaining unique texts are sent to the provider, ``batch_size`` per call.
+    Those calls bypass the embedding micro-batcher unless
+    ``EMBEDDING_BATCH_INGESTION`` is set.
+
+    Args:
+        texts: Chunk texts
+        batch_size: Texts per provider call (defaults to ``EMBEDDING_BATCH_SIZE``)
+
+    Returns:
+        float32 matrix of shape (len(texts), dimension) and the dedup report
+    """
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    provider = get_embedding_provider()
+    report = EmbeddingReport(chunks=len(texts))
+    if not texts:
+        return np.empty((0, provider.dimension), dtype=np.float32), report
+
+    hashes = [chunk_hash(text, provider.model) for text in texts]
+    positions: Dict[str, List[int]] = {}
+    for i, digest in enumerate(hashes):
+        positions.setdefault(digest, []).append(i)
+
+    store = get_chunk_embedding_store()
+    found = await store.get_many(list(positions)) if store is not None else {}
+    missing = [digest for digest in positions if digest not in found]
+
+    if missing:
+        texts_to_embed = [texts[positions[digest][0]] for digest in missing]
+        # Already full batches: by default calling the provider directly keeps
+        # them from queueing query embeddings behind them in the micro-batcher
+        embed = embed_texts if settings.EMBEDDING_BATCH_INGESTION else embed_with_provider
+        batches = [
+            await embed(texts_to_embed[start : start + batch_size])
+            for start in range(0, len(texts_to_embed), batch_size)
+        ]
+        fresh = np.concatenate(batches).astype(np.float32, copy=False)
+        if store is not None:
+            await store.set_many(missing, fresh)
+        found.update(zip(missing, fresh, strict=True))
+
+    vectors = np.empty((len(texts), provider.dimension), dtype=np.float32)
+    for digest, rows in positions.items():
+        vectors[rows] = found[digest]
+
+    report.embedded = len(missing)
+    report.deduplicated = len(texts) - len(missing)
+    report.embedding_calls = math.ceil(len(missing) / batch_size)
+    report.embedding_calls_saved = math.ceil(len(texts) / batch_size) - report.embedding_calls
+    logger.debug(
+        f"Embedded {report.embedded} of {report.chunks} chunks, {report.deduplicated} deduplicated"
+    )
+    return vectors, report
+
+
+_store: Optional[ChunkEmbeddingStore] = None
+
+
+def init_chunk_embedding_store(redis_client: Optional[redis.Redis] = None) -> ChunkEmbeddingStore:
+    """Open the process-wide chunk embedding store, using Redis as the shared tier if available."""
+    global _store
+    _store = ChunkEmbeddingStore(
+        settings.CHUNK_EMBEDDING_STORE_PATH,
+        redis_client=redis_client,
+        ttl_seconds=settings.CHUNK_EMBEDDING_REDIS_TTL_SECONDS,
+    )
+    return _store
+
+
+def get_chunk_embedding_store() -> Optional[ChunkEmbeddingStore]:
+    """Get the process-wide chunk embedding store, or ``None`` if it is not initialized."""
+    return _store
+
+
+def close_chunk_embedding_store() -> None:
+    """Close the process-wide chunk embedding store."""
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = None
@@ -0,0 +1,149 @@
+"""
+Embedding Cache
+Two-tier query embedding cache: an in-process LRU backed by Redis.
+"""
+
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_CACHE_LOOKUPS
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different spellings share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class EmbeddingCache:
+    """
+    Cache of query embeddings keyed on a hash of the normalized text and model.
+
+    Lookups check the local LRU first, then Redis; Redis hits are promoted into
+    the local tier. Redis failures are logged and treated as misses so the
+    cache can never fail a request.
+    """
+
+    KEY_PREFIX = "emb:v1:"
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: int,
+        redis_client: Optional[redis.Redis] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._local: LRUCache[np.ndarray] = LRUCache(max_entries, ttl_seconds)
+        self._redis = redis_client
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def key(cls, text: str, model: str) -> str:
+        """Build the cache key for a text under an embedding model."""
+        digest = hashlib.sha256(f"{model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+        return f"{cls.KEY_PREFIX}{digest}"
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters for this cache instance."""
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_entries": len(self._local),
+        }
+
+    async def get_many(self, texts: Sequence[str], model: str) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for several texts.
+
+        Args:
+            texts: Query texts
+            model: Embedding model name
+
+        Returns:
+            Cached vector per text, or ``None`` for misses
+        """
+        keys = [self.key(text, model) for text in texts]
+        results: List[Optional[np.ndarray]] = [self._local.get(key) for key in keys]
+        self.local_hits += sum(1 for r in results if r is not None)
+
+        remote = [i for i, r in enumerate(results) if r is None]
+        if remote and self._redis is not None:
+            try:
+                values = await self._redis.mget([keys[i] for i in remote])
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"Embedding cache Redis lookup failed: {e}")
+                values = [None] * len(remote)
+
+            for i, value in zip(remote, values, strict=True):
+                if value is not None:
+                    vector = np.frombuffer(value, dtype=np.float32)
+                    self._local.set(keys[i], vector)
+                    results[i] = vector
+                    self.redis_hits += 1
+
+        misses = sum(1 for r in results if r is None)
+        self.misses += misses
+        EMBEDDING_CACHE_LOOKUPS.labels(result="local_hit").inc(len(texts) - len(remote))
+        EMBEDDING_CACHE_LOOKUPS.labels(result="redis_hit").inc(len(remote) - misses)
+        EMBEDDING_CACHE_LOOKUPS.labels(result="miss").inc(misses)
+        return results
+
+    async def set_many(self, texts: Sequence[str], vectors: np.ndarray, model: str) -> None:
+        """
+        Store embeddings in both tiers.
+
+        Args:
+            texts: Query texts
+            vectors: Embedding matrix, one row per text
+            model: Embedding model name
+        """
+        keys = [self.key(text, model) for text in texts]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for key, vector in zip(keys, vectors, strict=True):
+            self._local.set(key, vector)
+
+        if self._redis is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, vector in zip(keys, vectors, strict=True):
+                    pipe.set(key, vector.tobytes(), ex=self.ttl_seconds)
+                await pipe.execute()
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Embedding cache Redis write failed: {e}")
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def init_embedding_cache(redis_client: Optional[redis.Redis] = None) -> EmbeddingCache:
+    """Create the process-wide embedding cache, using Redis as the shared tier if available."""
+    global _cache
+    _cache = EmbeddingCache(
+        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+        redis_client=redis_client,
+    )
+    return _cache
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide embedding cache, or ``None`` if caching is not initialized."""
+    return _cache
+
+
+def close_embedding_cache() -> None:
+    """Drop the process-wide embedding cache."""
+    global _cache
+    _cache = None
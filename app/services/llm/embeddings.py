@@ -0,0 +1,189 @@
+"""
+Embedding Providers
+Generates dense vector embeddings for queries and document chunks.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.llm.batcher import get_embedding_batcher
+from app.services.llm.embedding_cache import get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider:
+    """Base class for embedding providers."""
+
+    def __init__(self, model: str, dimension: int):
+        self.model = model
+        self.dimension = dimension
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix of shape (len(texts), dimension)
+        """
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embedding provider backed by the OpenAI embeddings API."""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        dimension: Optional[int] = None,
+        api_key: Optional[str] = None,
+    ):
+        super().__init__(
+            model=model or settings.OPENAI_EMBEDDING_MODEL,
+            dimension=dimension or settings.EMBEDDING_DIMENSION,
+        )
+        # Imported lazily so the API can start without the OpenAI SDK configured
+        from openai import AsyncOpenAI
+
+        self._client = AsyncOpenAI(api_key=api_key or settings.OPENAI_API_KEY)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts with a single API call."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        response = await self._client.embeddings.create(model=self.model, input=texts)
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """Embedding provider backed by a local sentence-transformers model."""
+
+    def __init__(self, model: Optional[str] = None, dimension: Optional[int] = None):
+        super().__init__(
+            model=model or settings.LOCAL_EMBEDDING_MODEL,
+            dimension=dimension or settings.EMBEDDING_DIMENSION,
+        )
+        # Imported lazily so the API can start without torch when a remote provider is used
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(self.model)
+        model_dimension = self._model.get_sentence_embedding_dimension()
+        if model_dimension != self.dimension:
+            raise ValueError(
+                f"{self.model} produces {model_dimension}-dimensional embeddings, "
+                f"but EMBEDDING_DIMENSION is {self.dimension}"
+            )
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch in one forward pass, in a worker thread so the event loop keeps running."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        vectors = await asyncio.to_thread(
+            self._model.encode,
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+_provider: Optional[EmbeddingProvider] = None
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Get the process-wide embedding provider, creating it on first use."""
+    global _provider
+    if _provider is None:
+        if settings.EMBEDDING_PROVIDER == "sentence_transformers":
+            _provider = SentenceTransformerEmbeddingProvider()
+        else:
+            _provider = OpenAIEmbeddingProvider()
+    return _provider
+
+
+def set_embedding_provider(provider: Optional[EmbeddingProvider]) -> None:
+    """Replace the process-wide embedding provider (``None`` resets to the default)."""
+    global _provider
+    _provider = provider
+
+
+async def embed_with_provider(texts: List[str]) -> np.ndarray:
+    """Embed texts with the configured provider in one call, bypassing the batcher."""
+    return await get_embedding_provider().embed(texts)
+
+
+async def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Embed texts with the configured provider.
+
+    When the embedding batcher is running, the texts join the batches shared
+    by every concurrent request instead of making their own provider call.
+
+    Args:
+        texts: Texts to embed
+
+    Returns:
+        float32 matrix of shape (len(texts), dimension)
+    """
+    batcher = get_embedding_batcher()
+    if batcher is None or not texts:
+        return await embed_with_provider(texts)
+    return await batcher.embed(texts)
+
+
+async def embed_queries(queries: List[str]) -> np.ndarray:
+    """
+    Embed search queries, serving repeats from the embedding cache.
+
+    Only cache misses are sent to the provider, in a single batch, and
+    duplicate queries within the batch are embedded once.
+
+    Args:
+        queries: Query texts
+
+    Returns:
+        float32 matrix of shape (len(queries), dimension)
+    """
+    provider = get_embedding_provider()
+    cache = get_embedding_cache()
+    if cache is None:
+        return await embed_texts(queries)
+
+    cached = await cache.get_many(queries, provider.model)
+    missing: Dict[str, List[int]] = {}
+    for i, vector in enumerate(cached):
+        if vector is None:
+            missing.setdefault(cache.key(queries[i], provider.model), []).append(i)
+
+    if missing:
+        texts = [queries[positions[0]] for positions in missing.values()]
+        vectors = await embed_texts(texts)
+        await cache.set_many(texts, vectors, provider.model)
+        for positions, vector in zip(missing.values(), vectors, strict=True):
+            for i in positions:
+                cached[i] = vector
+
+    return np.stack(cached).astype(np.float32, copy=False)
+
+
+async def embed_query(query: str) -> np.ndarray:
+    """
+    Embed a single search query.
+
+    Args:
+        query: Query text
+
+    Returns:
+        float32 vector of shape (dimension,)
+    """
+    vectors = await embed_queries([query])
+    return vectors[0]
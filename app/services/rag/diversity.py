@@ -0,0 +1,136 @@
+"""
+Result Diversity
+Maximal-marginal-relevance selection and merging of adjacent chunks.
+"""
+
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.vector import SearchHit
+
+# Metadata key holding a chunk's position within its document
+CHUNK_INDEX_KEY = "chunk_index"
+
+
+def maximal_marginal_relevance(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Select candidates that are relevant to the query but not to each other.
+
+    Each step picks the candidate maximising
+    ``lambda * sim(query, c) - (1 - lambda) * max(sim(c, selected))``. All
+    pairwise similarities come from one matrix product, and the running
+    maximum against the selected set is updated with a single vector
+    operation per step.
+
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: Candidate embeddings, one row per candidate
+        top_k: Number of candidates to select
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        Positions of the selected candidates, in selection order
+    """
+    matrix = np.array(candidate_vectors, dtype=np.float32, copy=True, ndmin=2)
+    n = len(matrix)
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return []
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32).ravel()
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    selected: List[int] = []
+    for step in range(top_k):
+        if step == 0:
+            scores = relevance.copy()
+        else:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_adjacent(hits: Sequence[SearchHit], max_overlap: int) -> List[SearchHit]:
+    """
+    Merge hits that are consecutive chunks of the same document.
+
+    Chunks are adjacent when their ``chunk_index`` metadata differs by one.
+    A run of adjacent chunks becomes one hit at the position of its
+    best-ranked member, with the text shared by overlapping chunks kept
+    once. Its score is the best score in the run and
+    ``metadata["chunk_ids"]`` lists the merged chunks in document order.
+    Hits without a chunk index are kept as they are.
+
+    Args:
+        hits: Hits ordered best first
+        max_overlap: Longest overlap to remove between neighbours (``CHUNK_OVERLAP``)
+
+    Returns:
+        Merged hits, ordered by their best member's rank
+    """
+    by_document: Dict[str, List[int]] = {}
+    for i, hit in enumerate(hits):
+        if isinstance(hit.record.metadata.get(CHUNK_INDEX_KEY), int):
+            by_document.setdefault(hit.record.document_id, []).append(i)
+
+    run_of: Dict[int, List[int]] = {}
+    for members in by_document.values():
+        members.sort(key=lambda i: hits[i].record.metadata[CHUNK_INDEX_KEY])
+        run: List[int] = []
+        previous: Optional[int] = None
+        for i in members:
+            index = hits[i].record.metadata[CHUNK_INDEX_KEY]
+            if previous is None or index != previous + 1:
+                run = []
+            run.append(i)
+            run_of[i] = run
+            previous = index
+
+    merged: List[SearchHit] = []
+    emitted = set()
+    for i, hit in enumerate(hits):
+        run = run_of.get(i, [i])
+        if len(run) == 1:
+            merged.append(hit)
+            continue
+        if id(run) in emitted:
+            continue
+        emitted.add(id(run))
+
+        content = hits[run[0]].record.content
+        for j in run[1:]:
+            text = hits[j].record.content
+            content += text[_overlap(content, text, max_overlap) :]
+        first = hits[run[0]].record
+        metadata = {**first.metadata, "chunk_ids": [hits[j].record.chunk_id for j in run]}
+        last_page = hits[run[-1]].record.metadata.get("page_end")
+        if last_page is not None:
+            metadata["page_end"] = last_page
+        record = replace(first, content=content, metadata=metadata)
+        # ``i`` is the run's best-ranked member, since hits are visited in rank order
+        merged.append(replace(hit, record=record, score=max(hits[j].score for j in run)))
+    return merged
@@ -0,0 +1,41 @@
+"""
+Result Fusion
+Merges ranked result lists from independent retrievers.
+"""
+
+from typing import Dict, List, Sequence
+
+from app.services.vector import SearchHit
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[List[SearchHit]],
+    top_k: int,
+    k: int = 60,
+) -> List[SearchHit]:
+    """
+    Combine ranked lists with reciprocal-rank fusion.
+
+    Each chunk scores ``sum(1 / (k + rank))`` over the lists it appears in, so
+    fusion depends only on ranks and needs no score calibration between
+    retrievers.
+
+    Args:
+        result_lists: Ranked hit lists, best first
+        top_k: Maximum number of fused hits
+        k: Rank smoothing constant
+
+    Returns:
+        Fused hits ordered by descending RRF score
+    """
+    scores: Dict[str, float] = {}
+    hits: Dict[str, SearchHit] = {}
+
+    for results in result_lists:
+        for rank, hit in enumerate(results, start=1):
+            chunk_id = hit.record.chunk_id
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            hits.setdefault(chunk_id, hit)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [SearchHit(record=hits[chunk_id].record, score=score) for chunk_id, score in ranked]
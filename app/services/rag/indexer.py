@@ -0,0 +1,107 @@
+"""
+Chunk Indexer
+Single write path that keeps a tenant's vector store, keyword index and document graph in step.
+"""
+
+import logging
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from app.services.rag.partitions import Partition, PartitionEvictedError, get_partitions
+from app.services.vector import ChunkRecord
+
+logger = logging.getLogger(__name__)
+
+
+def add_chunks(tenant_id: str, records: Sequence[ChunkRecord], vectors: np.ndarray) -> None:
+    """
+    Index chunks for semantic and keyword search in a tenant's partition.
+
+    Args:
+        tenant_id: Tenant that owns the chunks
+        records: Chunk records
+        vectors: Embedding matrix, one row per record
+    """
+    manager = get_partitions()
+    try:
+        manager.get(tenant_id).add(records, vectors)
+    except PartitionEvictedError:
+        # Evicted between lookup and write; it was saved, so reloading picks up its state
+        manager.get(tenant_id).add(records, vectors)
+    logger.debug(f"Indexed {len(records)} chunks for tenant {tenant_id}")
+
+
+def remove_document(tenant_id: str, document_id: str) -> int:
+    """
+    Delete a document's chunks from a tenant's partition.
+
+    Args:
+        tenant_id: Tenant that owns the document
+        document_id: Document to delete
+
+    Returns:
+        Number of chunks deleted
+    """
+    manager = get_partitions()
+    try:
+        removed = manager.get(tenant_id).remove_document(document_id)
+    except PartitionEvictedError:
+        removed = manager.get(tenant_id).remove_document(document_id)
+    logger.debug(f"Deleted {removed} chunks of document {document_id} for tenant {tenant_id}")
+    return removed
+
+
+def publish_indexes(tenant_id: str) -> str:
+    """
+    Persist a tenant's indexes and publish a new snapshot to other workers.
+
+    Args:
+        tenant_id: Tenant whose partition to publish
+
+    Returns:
+        The published vector store version
+    """
+    return get_partitions().get(tenant_id).save()
+
+
+def checkpoint_indexes(tenant_id: str) -> Tuple[Partition, int]:
+    """
+    Mark a tenant's partition before a series of writes that may need undoing.
+
+    Args:
+        tenant_id: Tenant about to be written to
+
+    Returns:
+        The partition and its journal checkpoint, for :func:`rollback_document`
+    """
+    partition = get_partitions().get(tenant_id)
+    return partition, partition.checkpoint()
+
+
+def rollback_document(
+    tenant_id: str, document_id: str, partition: Partition, checkpoint: int
+) -> None:
+    """
+    Undo a document's writes since a checkpoint after a failed ingestion.
+
+    If the partition was published or evicted meanwhile, part of the write
+    is already public; the document is then removed altogether rather than
+    left half indexed.
+
+    Args:
+        tenant_id: Tenant that owns the document
+        document_id: Document whose writes to undo
+        partition: Partition returned by :func:`checkpoint_indexes`
+        checkpoint: Checkpoint returned by :func:`checkpoint_indexes`
+    """
+    try:
+        if partition.rollback(checkpoint, document_id):
+            return
+    except PartitionEvictedError:
+        pass
+    logger.warning(
+        f"Document {document_id} was partly published for tenant {tenant_id}; removing it"
+    )
+    if remove_document(tenant_id, document_id):
+        publish_indexes(tenant_id)
@@ -0,0 +1,436 @@
+"""
+Keyword Index
+In-process BM25 inverted index over chunk text with block-compressed postings.
+"""
+
+import logging
+import math
+import pickle
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.vector import ChunkRecord, SearchHit
+from app.utils.delta_log import append_log, read_log, start_log
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Postings are sealed into fixed-size blocks; each block is the unit of decoding and skipping
+BLOCK_SIZE = 128
+
+KEYWORD_INDEX_FILE = "keywords.pkl"
+KEYWORD_LOG_FILE = "keywords.log"
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _smallest_uint(max_value: int) -> type:
+    """Pick the narrowest unsigned dtype that can hold ``max_value``."""
+    if max_value < 1 << 8:
+        return np.uint8
+    if max_value < 1 << 16:
+        return np.uint16
+    return np.uint32
+
+
+def _reserve(values: np.ndarray, size: int) -> np.ndarray:
+    """Return ``values``, grown by doubling and zero-filled, to hold at least ``size`` entries."""
+    if len(values) >= size:
+        return values
+    grown = np.zeros(max(size, 2 * len(values)), dtype=values.dtype)
+    grown[: len(values)] = values
+    return grown
+
+
+@dataclass
+class _Block:
+    """
+    A sealed run of postings.
+
+    Doc ids are delta-encoded against the previous posting (the first delta is
+    relative to the previous block's last doc), so any run of consecutive
+    blocks decodes with a single cumulative sum. Each array uses the narrowest
+    unsigned dtype that fits the block.
+    """
+
+    first_doc: int
+    last_doc: int
+    deltas: np.ndarray
+    tfs: np.ndarray
+
+    @classmethod
+    def encode(cls, docs: Sequence[int], tfs: Sequence[int], previous_doc: int) -> "_Block":
+        deltas = np.diff(np.asarray(docs, dtype=np.int64), prepend=previous_doc)
+        return cls(
+            first_doc=docs[0],
+            last_doc=docs[-1],
+            deltas=deltas.astype(_smallest_uint(int(deltas.max()))),
+            tfs=np.asarray(tfs).astype(_smallest_uint(max(tfs))),
+        )
+
+
+class _PostingList:
+    """Postings for one term: sealed compressed blocks plus an uncompressed tail."""
+
+    __slots__ = ("blocks", "tail_docs", "tail_tfs", "df", "max_tf", "min_length")
+
+    def __init__(self):
+        self.blocks: List[_Block] = []
+        self.tail_docs: List[int] = []
+        self.tail_tfs: List[int] = []
+        self.df = 0
+        self.max_tf = 0
+        self.min_length = 0
+
+    def append(self, doc: int, tf: int, length: int) -> None:
+        self.tail_docs.append(doc)
+        self.tail_tfs.append(tf)
+        self.max_tf = max(self.max_tf, tf)
+        self.min_length = length if self.df == 0 else min(self.min_length, length)
+        self.df += 1
+        if len(self.tail_docs) == BLOCK_SIZE:
+            self.blocks.append(self._encode_tail())
+            self.tail_docs, self.tail_tfs = [], []
+
+    def _encode_tail(self) -> _Block:
+        previous_doc = self.blocks[-1].last_doc if self.blocks else 0
+        return _Block.encode(self.tail_docs, self.tail_tfs, previous_doc)
+
+    def all_blocks(self) -> List[_Block]:
+        """Return a snapshot of the sealed blocks plus the encoded tail."""
+        if self.tail_docs:
+            return self.blocks + [self._encode_tail()]
+        return list(self.blocks)
+
+
+def _decode(
+    blocks: Sequence[_Block], candidates: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode postings, optionally only from blocks that may hold a candidate.
+
+    Args:
+        blocks: Blocks of one posting list, in doc order
+        candidates: Sorted doc ids; blocks whose doc range contains none of
+            them are skipped without being decompressed
+
+    Returns:
+        Doc ids and term frequencies
+    """
+    if candidates is not None:
+        firsts = np.fromiter((b.first_doc for b in blocks), dtype=np.int64, count=len(blocks))
+        lasts = np.fromiter((b.last_doc for b in blocks), dtype=np.int64, count=len(blocks))
+        hits = np.searchsorted(candidates, lasts, side="right") > np.searchsorted(
+            candidates, firsts
+        )
+        blocks = [blocks[j] for j in np.flatnonzero(hits)]
+        if not blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    docs = np.cumsum(np.concatenate([b.deltas for b in blocks]), dtype=np.int64)
+    if candidates is not None:
+        # Re-anchor each selected block, since skipped blocks break the running sum
+        sizes = np.fromiter((len(b.deltas) for b in blocks), dtype=np.int64, count=len(blocks))
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        anchors = np.fromiter((b.first_doc for b in blocks), dtype=np.int64, count=len(blocks))
+        docs += np.repeat(anchors - docs[starts], sizes)
+    tfs = np.concatenate([b.tfs for b in blocks]).astype(np.float32)
+    return docs, tfs
+
+
+def _log_size(entries: Sequence[Tuple[str, object]]) -> int:
+    """Number of chunks added or documents deleted by delta log entries."""
+    return sum(len(argument) if operation == "add" else 1 for operation, argument in entries)
+
+
+class KeywordIndex:
+    """
+    BM25 keyword index.
+
+    Queries are evaluated term-at-a-time using MaxScore: terms are processed in
+    descending order of their score upper bound, and once the bounds of the
+    remaining terms cannot lift an unseen document into the top-k, evaluation
+    only updates surviving candidates and skips blocks that contain none of them.
+
+    Deleted documents are tombstoned: their chunks stay in the postings but
+    never score, until :meth:`compact` rebuilds the index without them.
+
+    Saves append the changes made since the previous save to a delta log
+    over the last full snapshot, so a save costs the size of the changes
+    rather than of the index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, _PostingList] = {}
+        self._records: List[ChunkRecord] = []
+        # Chunk lengths as float32, with spare capacity so adds rarely reallocate
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._total_length = 0
+        self._documents: Dict[str, List[int]] = {}
+        self._deleted: Set[int] = set()
+        # Deleted flag per chunk, mirroring ``_deleted`` for vectorized lookups
+        self._tombstones = np.zeros(0, dtype=bool)
+        self._lock = threading.RLock()
+        self._dirty = False
+        # Snapshot identifier, the log file on disk extending it, and its size in chunks
+        self._epoch: Optional[int] = None
+        self._log: Optional[Path] = None
+        self._logged = 0
+        # Changes not yet written, as delta log entries
+        self._pending: List[Tuple[str, object]] = []
+
+    @property
+    def ntotal(self) -> int:
+        """Number of indexed chunks, excluding deleted ones."""
+        return len(self._records) - len(self._deleted)
+
+    @property
+    def dead_ratio(self) -> float:
+        """Fraction of stored chunks that are deleted."""
+        return len(self._deleted) / len(self._records) if self._records else 0.0
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the index has changes that have not been saved."""
+        return self._dirty
+
+    def add(self, records: Sequence[ChunkRecord]) -> None:
+        """
+        Index chunk records.
+
+        Args:
+            records: Chunk records to index
+        """
+        with self._lock:
+            self._lengths = _reserve(self._lengths, len(self._records) + len(records))
+            for record in records:
+                doc = len(self._records)
+                terms = Counter(tokenize(record.content))
+                length = sum(terms.values())
+
+                self._records.append(record)
+                self._documents.setdefault(record.document_id, []).append(doc)
+                self._lengths[doc] = length
+                self._total_length += length
+
+                for term, tf in terms.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = _PostingList()
+                    postings.append(doc, tf, length)
+            self._tombstones = _reserve(self._tombstones, len(self._records))
+            if records:
+                self._pending.append(("add", list(records)))
+                self._dirty = True
+
+    def delete_document(self, document_id: str) -> int:
+        """
+        Tombstone every chunk of a document.
+
+        Args:
+            document_id: Document to delete
+
+        Returns:
+            Number of chunks deleted
+        """
+        with self._lock:
+            docs = self._documents.pop(document_id, [])
+            self._deleted.update(docs)
+            self._tombstones[docs] = True
+            if docs:
+                self._pending.append(("delete", document_id))
+                self._dirty = True
+            return len(docs)
+
+    def compact(self) -> None:
+        """Rebuild the index without deleted chunks."""
+        with self._lock:
+            if not self._deleted:
+                return
+            live = [record for doc, record in enumerate(self._records) if doc not in self._deleted]
+            rebuilt = KeywordIndex(self.k1, self.b)
+            rebuilt.add(live)
+            state = rebuilt.__getstate__()
+            self.__dict__.update(state)
+            self._tombstones = rebuilt._tombstones
+            # The saved snapshot no longer matches, so the next save rewrites it
+            self._log = None
+            self._dirty = True
+            logger.info(f"Compacted keyword index to {len(live)} chunks")
+
+    def _bm25(
+        self, idf: float, tfs: np.ndarray, lengths: np.ndarray, avg_length: float
+    ) -> np.ndarray:
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+        return idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+    def search(self, query: str, top_k: int) -> List[SearchHit]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Query text
+            top_k: Maximum number of hits
+
+        Returns:
+            Hits ordered by descending BM25 score
+        """
+        # Snapshot under the lock; adds only write past ``total`` and compaction
+        # swaps in new containers, so scoring can run without holding it
+        with self._lock:
+            total = len(self._records)
+            if self.ntotal == 0 or top_k <= 0:
+                return []
+            records = self._records
+            lengths = self._lengths
+            tombstones = self._tombstones
+            avg_length = max(self._total_length / total, 1.0)
+
+            terms = []
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                idf = math.log(1.0 + (total - postings.df + 0.5) / (postings.df + 0.5))
+                # BM25 grows with tf and shrinks with length, so this bounds every posting
+                upper_bound = float(
+                    self._bm25(
+                        idf,
+                        np.float32(postings.max_tf),
+                        np.float32(postings.min_length),
+                        avg_length,
+                    )
+                )
+                terms.append((upper_bound, idf, postings.all_blocks()))
+
+        if not terms:
+            return []
+
+        terms.sort(key=lambda item: item[0], reverse=True)
+        remaining = [sum(t[0] for t in terms[i + 1 :]) for i in range(len(terms))]
+
+        # Sparse accumulator: sorted doc ids seen so far and their partial scores
+        seen = np.empty(0, dtype=np.int64)
+        scores = np.empty(0, dtype=np.float32)
+        pruned = False
+
+        for i, (_, idf, blocks) in enumerate(terms):
+            docs, tfs = _decode(blocks, seen if pruned else None)
+            keep = ~tombstones[docs]
+            docs, tfs = docs[keep], tfs[keep]
+            contributions = self._bm25(idf, tfs, lengths[docs], avg_length)
+
+            if pruned:
+                # Only surviving candidates still collect score
+                slots = np.minimum(np.searchsorted(seen, docs), len(seen) - 1)
+                hits = seen[slots] == docs
+                scores[slots[hits]] += contributions[hits]
+            else:
+                seen, inverse = np.unique(np.concatenate([seen, docs]), return_inverse=True)
+                weights = np.concatenate([scores, contributions])
+                scores = np.bincount(inverse, weights=weights, minlength=len(seen))
+                scores = scores.astype(np.float32)
+
+            if len(seen) < top_k:
+                continue
+            threshold = np.partition(scores, -top_k)[-top_k]
+            if remaining[i] < threshold:
+                # Unseen docs can score at most remaining[i]: stop admitting new ones
+                keep = scores + remaining[i] >= threshold
+                seen, scores = seen[keep], scores[keep]
+                pruned = True
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [SearchHit(record=records[seen[j]], score=float(scores[j])) for j in order]
+
+    def save(self, path: str, fold: bool = False) -> None:
+        """
+        Persist the index next to the vector store.
+
+        Changes since the previous save are appended to the delta log. The
+        log is folded into a new full snapshot instead when ``fold`` is set,
+        when it would outgrow half the index, or when the index was not loaded
+        from or last saved to ``path``.
+
+        Args:
+            path: Directory to save into
+            fold: Whether to rewrite the snapshot and start an empty log
+        """
+        target = Path(path)
+        target.mkdir(parents=True, exist_ok=True)
+        log = target / KEYWORD_LOG_FILE
+        with self._lock:
+            logged = self._logged + _log_size(self._pending)
+            if fold or self._log != log or 2 * logged > len(self._records):
+                self._epoch = time.time_ns()
+                tmp = target / f"{KEYWORD_INDEX_FILE}.tmp"
+                with open(tmp, "wb") as f:
+                    pickle.dump(self.__getstate__(), f, protocol=pickle.HIGHEST_PROTOCOL)
+                tmp.replace(target / KEYWORD_INDEX_FILE)
+                start_log(log, self._epoch)
+                self._log, self._logged = log, 0
+            elif self._pending:
+                append_log(log, self._pending)
+                self._logged = logged
+            self._pending = []
+            self._dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordIndex":
+        """Load an index written by :meth:`save`, replaying its delta log."""
+        root = Path(path)
+        with open(root / KEYWORD_INDEX_FILE, "rb") as f:
+            index = cls.__new__(cls)
+            index.__setstate__(pickle.load(f))
+
+        entries = read_log(root / KEYWORD_LOG_FILE, index._epoch)
+        if entries is not None:
+            for operation, argument in entries:
+                if operation == "add":
+                    index.add(argument)
+                else:
+                    index.delete_document(argument)
+            index._log, index._logged = root / KEYWORD_LOG_FILE, _log_size(entries)
+        index._pending = []
+        index._dirty = False
+        return index
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        for name in ("_tombstones", "_log", "_logged", "_pending"):
+            state.pop(name, None)
+        state["_lengths"] = self._lengths[: len(self._records)].copy()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if isinstance(self._lengths, array):
+            # Saved with lengths as an unsigned int array
+            self._lengths = np.asarray(self._lengths, dtype=np.float32)
+        if "_documents" not in state:
+            # Saved before deletes were supported
+            self._documents = {}
+            for doc, record in enumerate(self._records):
+                self._documents.setdefault(record.document_id, []).append(doc)
+            self._deleted = set()
+        self._tombstones = np.zeros(len(self._records), dtype=bool)
+        self._tombstones[list(self._deleted)] = True
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._epoch = state.get("_epoch")
+        self._log, self._logged, self._pending = None, 0, []
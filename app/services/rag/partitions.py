@@ -0,0 +1,545 @@
+"""
+Tenant Partitions
+Per-tenant vector, keyword and document indexes with LRU residency.
+"""
+
+import asyncio
+import fcntl
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.rag.keyword_index import KEYWORD_INDEX_FILE, KeywordIndex
+from app.services.vector import ChunkRecord, DocumentIndex, SegmentedVectorStore
+from app.utils.tenancy import partition_path
+
+logger = logging.getLogger(__name__)
+
+WRITER_LOCK_FILE = "writer.lock"
+
+
+class PartitionEvictedError(RuntimeError):
+    """Raised when writing to a partition that has already been evicted from memory."""
+
+
+@contextmanager
+def writer_lock(path: Path) -> Iterator[None]:
+    """
+    Hold a tenant's writer lock, shared by every thread and worker process on the host.
+
+    Args:
+        path: Partition directory
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / WRITER_LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class Partition:
+    """
+    One tenant's searchable corpus: vector store, keyword index and document graph.
+
+    Vectors live in a segmented store: writes land in an exact memtable and
+    deletes are tombstones, so document churn never rewrites an ANN index in
+    place. New partitions only hold exact flat segments, which beat ANN for
+    small corpora and need no training. Once a partition reaches
+    ``TENANT_ANN_MIN_VECTORS`` it is compacted into one ANN segment.
+
+    Writes since the last save are also kept in a journal. Several worker
+    processes may write to the same tenant, so publishing takes the tenant's
+    writer lock and, if another worker published first, replays the journal
+    onto its snapshot instead of overwriting it.
+
+    The keyword and document indexes save as delta logs over a full snapshot;
+    the logs are folded into new snapshots when the vector segments compact.
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        path: Path,
+        store: SegmentedVectorStore,
+        keywords: KeywordIndex,
+        documents: DocumentIndex,
+    ):
+        self.tenant_id = tenant_id
+        self.path = path
+        self.store = store
+        self.keywords = keywords
+        self.documents = documents
+        self.checked_at = time.monotonic()
+        # Newest result cache generation this partition is known to be current for
+        self.generation = -1
+        # Unpublished writes as ("add", (records, vectors)) and ("remove", document_id)
+        self._journal: List[Tuple[str, Any]] = []
+        # Writes journaled before the current journal, all of them published
+        self._published = 0
+        # Whether the next save folds the companion delta logs into snapshots
+        self._fold = False
+        self._lock = threading.RLock()
+        self._closed = False
+
+    @property
+    def dirty(self) -> bool:
+        """Whether any index has changes that have not been saved."""
+        return self.store.dirty or self.keywords.dirty or self.documents.dirty
+
+    @classmethod
+    def open(cls, tenant_id: str, path: Path) -> "Partition":
+        """
+        Load a tenant's saved partition, or start an empty one.
+
+        Companion indexes are reused when they cover the same chunks as the
+        vector store and rebuilt from it otherwise.
+        """
+        if not SegmentedVectorStore.exists(str(path)):
+            store = SegmentedVectorStore(settings.EMBEDDING_DIMENSION, str(path))
+            documents = DocumentIndex(settings.EMBEDDING_DIMENSION, settings.DOCUMENT_GRAPH_K)
+            return cls(tenant_id, path, store, KeywordIndex(), documents)
+
+        store = SegmentedVectorStore.load(str(path))
+
+        keywords = None
+        if (path / KEYWORD_INDEX_FILE).exists():
+            keywords = KeywordIndex.load(str(path))
+            if keywords.ntotal != store.ntotal:
+                keywords = None
+        if keywords is None:
+            keywords = KeywordIndex()
+            keywords.add(store.records)
+            logger.info(f"Rebuilt keyword index for tenant {tenant_id}")
+
+        documents = None
+        if (path / DocumentIndex.FILE).exists():
+            documents = DocumentIndex.load(str(path), settings.DOCUMENT_GRAPH_K)
+            if documents.nchunks != store.ntotal:
+                documents = None
+        if documents is None:
+            documents = DocumentIndex.build(store, settings.DOCUMENT_GRAPH_K)
+            logger.info(f"Rebuilt document index for tenant {tenant_id}")
+
+        return cls(tenant_id, path, store, keywords, documents)
+
+    def outdated(self) -> bool:
+        """Whether another worker has published a snapshot newer than this partition's."""
+        version = SegmentedVectorStore.current_version(str(self.path))
+        return version is not None and version != self.store.version
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise PartitionEvictedError(f"Partition for tenant {self.tenant_id} was evicted")
+
+    def add(self, records: Sequence[ChunkRecord], vectors: np.ndarray) -> None:
+        """
+        Index chunks in every index of the partition.
+
+        Args:
+            records: Chunk records
+            vectors: Embedding matrix, one row per record
+        """
+        with self._lock:
+            self._check_open()
+            self._apply_add(records, vectors)
+            self._journal.append(("add", (list(records), vectors)))
+
+    def _apply_add(self, records: Sequence[ChunkRecord], vectors: np.ndarray) -> None:
+        self.store.add(records, vectors)
+        self.keywords.add(records)
+        self.documents.add(records, vectors)
+
+        if self.store.index_type == "flat" and self.store.ntotal >= settings.TENANT_ANN_MIN_VECTORS:
+            self.store.compact(full=True)
+            self._fold = True
+            logger.info(
+                f"Promoted tenant {self.tenant_id} to {settings.VECTOR_INDEX_TYPE} "
+                f"at {self.store.ntotal} vectors"
+            )
+
+    def remove_document(self, document_id: str) -> int:
+        """
+        Delete a document's chunks from every index of the partition.
+
+        Args:
+            document_id: Document to delete
+
+        Returns:
+            Number of chunks deleted from the vector store
+        """
+        with self._lock:
+            self._check_open()
+            removed = self._apply_remove(document_id)
+            self._journal.append(("remove", document_id))
+            return removed
+
+    def _apply_remove(self, document_id: str) -> int:
+        removed = self.store.delete_document(document_id)
+        self.keywords.delete_document(document_id)
+        self.documents.remove(document_id)
+        return removed
+
+    def rebase(self) -> None:
+        """
+        Replay unpublished writes onto the latest published snapshot.
+
+        The partition's indexes are replaced by ones loaded from the newest
+        snapshot with this partition's journal applied on top, so neither this
+        worker's pending writes nor another worker's published ones are lost.
+        """
+        with self._lock:
+            self._check_open()
+            self._replay()
+            if self._journal:
+                logger.info(
+                    f"Rebased {len(self._journal)} unpublished writes for tenant {self.tenant_id} "
+                    f"onto version {self.store.version}"
+                )
+            else:
+                logger.info(f"Reloaded tenant {self.tenant_id} at version {self.store.version}")
+
+    def _replay(self) -> None:
+        latest = Partition.open(self.tenant_id, self.path)
+        for operation, argument in self._journal:
+            if operation == "add":
+                latest._apply_add(*argument)
+            else:
+                latest._apply_remove(argument)
+        self.store, self.keywords, self.documents = latest.store, latest.keywords, latest.documents
+
+    def checkpoint(self) -> int:
+        """Position in the write journal that :meth:`rollback` can return to."""
+        with self._lock:
+            return self._published + len(self._journal)
+
+    def rollback(self, checkpoint: int, document_id: str) -> bool:
+        """
+        Undo a document's writes made since a checkpoint.
+
+        Writes to other documents since the checkpoint are kept, so a failed
+        ingestion can be undone while others into the same partition go on.
+
+        Args:
+            checkpoint: Value of :meth:`checkpoint` before the writes
+            document_id: Document whose writes to undo
+
+        Returns:
+            Whether the writes were undone; ``False`` if some were already published
+        """
+        with self._lock:
+            self._check_open()
+            kept = checkpoint - self._published
+            if kept < 0:
+                return False
+            journal = self._journal[:kept]
+            for operation, argument in self._journal[kept:]:
+                if operation == "remove":
+                    if argument != document_id:
+                        journal.append((operation, argument))
+                    continue
+                records, vectors = argument
+                others = [
+                    i for i, record in enumerate(records) if record.document_id != document_id
+                ]
+                if others:
+                    journal.append((operation, ([records[i] for i in others], vectors[others])))
+            self._journal = journal
+            self._replay()
+            logger.info(
+                f"Rolled back unpublished writes to document {document_id} for tenant {self.tenant_id}"
+            )
+            return True
+
+    def compact(self) -> bool:
+        """
+        Merge vector segments and drop deleted chunks where due.
+
+        Runs without the partition lock: the vector store builds merged
+        segments off to the side and swaps them in, so writes and searches
+        are not blocked meanwhile.
+
+        Returns:
+            Whether anything was compacted
+        """
+        self._check_open()
+        compacted = self.store.compact()
+        if self.keywords.dead_ratio >= settings.VECTOR_COMPACTION_DEAD_RATIO:
+            self.keywords.compact()
+            compacted = True
+        self._fold = self._fold or compacted
+        return compacted
+
+    def save(self) -> str:
+        """
+        Persist every index and publish a new vector store snapshot.
+
+        Publishing holds the tenant's writer lock. If another worker has
+        published since this partition was loaded, the unpublished writes are
+        first replayed onto that snapshot with :meth:`rebase`. Companion
+        indexes are written before the snapshot pointer moves, so a worker
+        that sees the new version also finds files covering its chunks.
+
+        Returns:
+            The published vector store version
+        """
+        with self._lock, writer_lock(self.path):
+            if self.outdated():
+                self.rebase()
+                if not self.dirty:
+                    # Nothing of ours left to publish on top of the other worker's snapshot
+                    return self.store.version
+            self.keywords.save(str(self.path), fold=self._fold)
+            self.documents.save(str(self.path), fold=self._fold)
+            version = self.store.save(str(self.path))
+            self._fold = False
+            self._published += len(self._journal)
+            self._journal.clear()
+            return version
+
+    def close(self, save: bool = True) -> None:
+        """Save unsaved changes and refuse further writes."""
+        with self._lock:
+            if save and self.dirty:
+                self.save()
+            self._closed = True
+
+
+class PartitionManager:
+    """
+    Loads tenant partitions on demand and keeps the most recently used in memory.
+
+    At most ``max_loaded`` partitions stay resident; the least recently used
+    is saved and dropped when another has to be loaded. When another worker
+    has published a newer snapshot, checked at most every
+    ``VECTOR_STORE_RELOAD_SECONDS``, a resident partition is rebased onto it
+    in place, so callers holding the partition never write to a dropped copy.
+    """
+
+    def __init__(self, root: str, max_loaded: int):
+        self.root = Path(root)
+        self.max_loaded = max_loaded
+        self._partitions: "OrderedDict[str, Partition]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    def path_for(self, tenant_id: str) -> Path:
+        """Directory holding a tenant's partition."""
+        return partition_path(str(self.root), tenant_id)
+
+    def peek(self, tenant_id: str, generation: Optional[int] = None) -> Optional[Partition]:
+        """
+        Resident partition for a tenant, if no reload check is due.
+
+        A check is due every ``VECTOR_STORE_RELOAD_SECONDS``, and as soon as a
+        caller presents a result cache generation newer than the partition
+        was last checked under.
+        """
+        with self._lock:
+            partition = self._partitions.get(tenant_id)
+            if partition is None:
+                return None
+            if time.monotonic() - partition.checked_at >= settings.VECTOR_STORE_RELOAD_SECONDS:
+                return None
+            if generation is not None and generation > partition.generation:
+                return None
+            self._partitions.move_to_end(tenant_id)
+            return partition
+
+    def _refresh(self, partition: Partition) -> None:
+        partition.checked_at = time.monotonic()
+        # Checked and reloaded under the partition lock, so no write can slip in between
+        with partition._lock:
+            if partition.outdated():
+                partition.rebase()
+
+    def get(self, tenant_id: str, generation: Optional[int] = None) -> Partition:
+        """
+        Get a tenant's partition, loading it and evicting others as needed.
+
+        Args:
+            tenant_id: Tenant identifier
+            generation: Result cache generation read before this call; the
+                partition returned is at least as new as the snapshot
+                published when that generation was read
+
+        Returns:
+            The tenant's resident partition
+        """
+        while True:
+            with self._lock:
+                resident = self._partitions.get(tenant_id)
+                if resident is not None:
+                    self._partitions.move_to_end(tenant_id)
+            if resident is not None:
+                try:
+                    self._refresh(resident)
+                except PartitionEvictedError:
+                    # Evicted meanwhile; it was saved, so loading it again picks up its state
+                    continue
+                if generation is not None:
+                    resident.generation = max(resident.generation, generation)
+                return resident
+
+            loaded = Partition.open(tenant_id, self.path_for(tenant_id))
+            if generation is not None:
+                loaded.generation = generation
+
+            evicted: List[Partition] = []
+            with self._lock:
+                if tenant_id in self._partitions:
+                    # Another thread loaded it meanwhile; use that one
+                    continue
+                self._partitions[tenant_id] = loaded
+                while len(self._partitions) > self.max_loaded:
+                    evicted.append(self._partitions.popitem(last=False)[1])
+            break
+
+        for partition in evicted:
+            partition.close()
+            logger.info(f"Evicted tenant {partition.tenant_id} partition")
+        return loaded
+
+    def compact(self) -> int:
+        """
+        Compact resident partitions and publish the ones that changed.
+
+        A clean partition that another worker has published past is skipped;
+        it is reloaded on its next lookup, and publishing a compacted copy of
+        it would only be rebased away.
+
+        Returns:
+            Number of partitions compacted
+        """
+        with self._lock:
+            partitions = list(self._partitions.values())
+        compacted = 0
+        for partition in partitions:
+            try:
+                if not partition.dirty and partition.outdated():
+                    continue
+                if partition.compact():
+                    partition.save()
+                    compacted += 1
+            except PartitionEvictedError:
+                continue
+        return compacted
+
+    def close(self) -> None:
+        """Save and drop every resident partition."""
+        with self._lock:
+            partitions = list(self._partitions.values())
+            self._partitions.clear()
+        for partition in partitions:
+            partition.close()
+
+
+class PartitionCompactor:
+    """Background task that periodically compacts resident partitions off the event loop."""
+
+    def __init__(self, manager: PartitionManager, interval: float):
+        self.manager = manager
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start compacting on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop compacting; a compaction already running in its thread finishes on its own."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                compacted = await asyncio.to_thread(self.manager.compact)
+                if compacted:
+                    logger.info(f"Compacted {compacted} partitions")
+            except Exception as e:
+                logger.error(f"Partition compaction failed: {e}", exc_info=True)
+
+
+_manager: Optional[PartitionManager] = None
+_compactor: Optional[PartitionCompactor] = None
+
+
+def init_partitions() -> PartitionManager:
+    """Create the process-wide partition manager rooted at ``VECTOR_STORE_PATH``."""
+    global _manager
+    _manager = PartitionManager(settings.VECTOR_STORE_PATH, settings.TENANT_PARTITIONS_MAX_LOADED)
+    return _manager
+
+
+async def close_partitions() -> None:
+    """Persist unsaved changes and release every partition."""
+    global _manager
+    if _manager is not None:
+        await asyncio.to_thread(_manager.close)
+    _manager = None
+
+
+def init_compactor() -> Optional[PartitionCompactor]:
+    """
+    Start background compaction of the process-wide partitions.
+
+    Returns:
+        The compactor, or ``None`` when ``VECTOR_COMPACTION_INTERVAL_SECONDS`` is 0
+    """
+    global _compactor
+    if settings.VECTOR_COMPACTION_INTERVAL_SECONDS <= 0:
+        _compactor = None
+        return None
+    _compactor = PartitionCompactor(get_partitions(), settings.VECTOR_COMPACTION_INTERVAL_SECONDS)
+    _compactor.start()
+    return _compactor
+
+
+async def close_compactor() -> None:
+    """Stop background compaction."""
+    global _compactor
+    if _compactor is not None:
+        await _compactor.stop()
+    _compactor = None
+
+
+def get_partitions() -> PartitionManager:
+    """Get the process-wide partition manager."""
+    if _manager is None:
+        raise RuntimeError("Partitions are not initialized")
+    return _manager
+
+
+async def get_partition(tenant_id: str, generation: Optional[int] = None) -> Partition:
+    """
+    Get a tenant's partition without blocking the event loop on disk I/O.
+
+    Args:
+        tenant_id: Tenant identifier
+        generation: Result cache generation the caller keys cached results
+            under; a partition not yet checked for new snapshots since that
+            generation is checked first
+
+    Returns:
+        The tenant's resident partition
+    """
+    manager = get_partitions()
+    partition = manager.peek(tenant_id, generation)
+    if partition is not None:
+        return partition
+    return await asyncio.to_thread(manager.get, tenant_id, generation)
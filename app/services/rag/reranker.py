@@ -0,0 +1,172 @@
+"""
+Cross-Encoder Reranker
+Rescores retrieval candidates with a cross-encoder under a latency budget.
+"""
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import replace
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import RERANK_REQUESTS
+from app.services.llm.embedding_cache import normalize_query
+from app.services.vector import SearchHit
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    """Base class for query/passage relevance scorers."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        """
+        Score passages against a query.
+
+        Args:
+            query: Query text
+            passages: Candidate passages
+
+        Returns:
+            float32 relevance scores, one per passage (higher is better)
+        """
+        raise NotImplementedError
+
+
+class CrossEncoderReranker(Reranker):
+    """Reranker backed by a sentence-transformers cross-encoder."""
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__(model=model or settings.RERANK_MODEL)
+        # Imported lazily so the API can start without torch when reranking is unused
+        from sentence_transformers import CrossEncoder
+
+        self._encoder = CrossEncoder(self.model, max_length=settings.RERANK_MAX_LENGTH)
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        """Score every pair in one padded forward pass."""
+        if not passages:
+            return np.empty(0, dtype=np.float32)
+        pairs = [(query, passage) for passage in passages]
+        scores = self._encoder.predict(
+            pairs,
+            batch_size=len(pairs),
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        return np.asarray(scores, dtype=np.float32)
+
+
+_reranker: Optional[Reranker] = None
+_scores: Optional[LRUCache[float]] = None
+
+
+def get_reranker() -> Reranker:
+    """Get the process-wide reranker, loading the model on first use."""
+    global _reranker
+    if _reranker is None:
+        _reranker = CrossEncoderReranker()
+    return _reranker
+
+
+def set_reranker(reranker: Optional[Reranker]) -> None:
+    """Replace the process-wide reranker (``None`` resets to the default) and drop cached scores."""
+    global _reranker, _scores
+    _reranker = reranker
+    _scores = None
+
+
+def _score_cache() -> LRUCache[float]:
+    global _scores
+    if _scores is None:
+        _scores = LRUCache(settings.RERANK_CACHE_MAX_ENTRIES, settings.RERANK_CACHE_TTL_SECONDS)
+    return _scores
+
+
+def _query_digest(query: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+
+def _store_scores(
+    cache: LRUCache[float], digest: str, chunk_ids: Sequence[str], task: "asyncio.Future"
+) -> None:
+    """Cache scores when scoring finishes, even if the request stopped waiting for them."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    for chunk_id, score in zip(chunk_ids, task.result(), strict=True):
+        cache.set((digest, chunk_id), float(score))
+
+
+async def rerank(
+    query: str,
+    hits: Sequence[SearchHit],
+    top_k: int,
+    timeout: Optional[float] = None,
+) -> Tuple[List[SearchHit], bool]:
+    """
+    Reorder candidates by cross-encoder relevance within a deadline.
+
+    Cached (query, chunk) scores are reused and only the remaining pairs are
+    scored, as one batch in a worker thread. If the deadline passes first, the
+    request proceeds without them: scored candidates are reordered among the
+    positions they held and unscored ones keep their ANN position. The batch
+    still finishes in the background and fills the cache for the next request.
+
+    Args:
+        query: Query text
+        hits: Candidates in ANN order
+        top_k: Number of hits to return
+        timeout: Deadline in seconds (defaults to ``RERANK_TIMEOUT_MS``)
+
+    Returns:
+        Reranked hits and whether every candidate was scored
+    """
+    if not hits:
+        return [], True
+    if timeout is None:
+        timeout = settings.RERANK_TIMEOUT_MS / 1000
+
+    reranker = get_reranker()
+    cache = _score_cache()
+    digest = _query_digest(query, reranker.model)
+    scores: List[Optional[float]] = [cache.get((digest, hit.record.chunk_id)) for hit in hits]
+    missing = [i for i, score in enumerate(scores) if score is None]
+
+    outcome = "complete"
+    if missing:
+        task = asyncio.ensure_future(
+            asyncio.to_thread(reranker.score, query, [hits[i].record.content for i in missing])
+        )
+        task.add_done_callback(
+            lambda done: _store_scores(
+                cache, digest, [hits[i].record.chunk_id for i in missing], done
+            )
+        )
+        try:
+            fresh = await asyncio.wait_for(asyncio.shield(task), timeout)
+            for i, score in zip(missing, fresh, strict=True):
+                scores[i] = float(score)
+        except asyncio.TimeoutError:
+            outcome = "deadline"
+            logger.warning(
+                f"Rerank deadline of {timeout:.3f}s passed with {len(missing)} pairs unscored"
+            )
+        except Exception as e:
+            outcome = "error"
+            logger.error(f"Rerank failed, keeping ANN order: {e}")
+
+    scored = [i for i, score in enumerate(scores) if score is not None]
+    ranked = sorted(scored, key=lambda i: scores[i], reverse=True)
+    reordered = list(hits)
+    for slot, source in zip(scored, ranked, strict=True):
+        reordered[slot] = replace(hits[source], rerank_score=scores[source])
+
+    RERANK_REQUESTS.labels(outcome=outcome).inc()
+    return reordered[:top_k], outcome == "complete"
@@ -0,0 +1,179 @@
+"""
+Retrieval Result Cache
+Caches retrieval responses and invalidates them with per-namespace generation counters.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.metrics import RESULT_CACHE_LOOKUPS
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Retrieval result cache with generation-based invalidation.
+
+    Namespaces are tenants, since each tenant searches its own partition.
+    Every namespace has a generation counter that is part of each cache key.
+    Changing the corpus bumps the counter, so older entries simply stop being
+    addressable and age out of the LRU and Redis TTLs; nothing has to scan or
+    delete keys. Keys are built before a search runs, so a search that races
+    with an upload is stored under the old generation and never served.
+    Writers publish a snapshot before bumping, and a search keyed under a
+    generation first makes sure its partition was checked for new snapshots
+    since that generation was read (see ``get_partition``), so no worker
+    stores results from an older snapshot under the new generation.
+
+    Generations live in Redis so that every worker sees a bump. Without Redis
+    they are kept in-process, which is only correct for a single worker.
+    """
+
+    KEY_PREFIX = "ret:v1:"
+    GENERATION_PREFIX = "gen:v1:"
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: int,
+        redis_client: Optional[redis.Redis] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._local: LRUCache[List[Dict[str, Any]]] = LRUCache(max_entries, ttl_seconds)
+        self._redis = redis_client
+        self._generations: Dict[str, int] = {}
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        """Current generation of a namespace, or ``None`` if it cannot be read."""
+        if self._redis is None:
+            return self._generations.get(namespace, 0)
+        try:
+            value = await self._redis.get(f"{self.GENERATION_PREFIX}{namespace}")
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Result cache generation lookup failed: {e}")
+            return None
+        return int(value or 0)
+
+    async def bump(self, namespace: str) -> None:
+        """Invalidate every cached result in a namespace."""
+        if self._redis is None:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            return
+        try:
+            await self._redis.incr(f"{self.GENERATION_PREFIX}{namespace}")
+        except (redis.RedisError, OSError) as e:
+            logger.error(f"Result cache invalidation failed for {namespace}: {e}")
+
+    async def key_for(
+        self,
+        namespace: str,
+        user_id: str,
+        payload: Dict[str, Any],
+        generation: Optional[int] = None,
+    ) -> Optional[str]:
+        """
+        Build the cache key for a request.
+
+        Args:
+            namespace: Tenant whose partition the request searches
+            user_id: Requesting user
+            payload: Request parameters that determine the result
+            generation: Generation already read for this request (read if ``None``)
+
+        Returns:
+            Cache key, or ``None`` if caching must be bypassed
+        """
+        if generation is None:
+            generation = await self.generation(namespace)
+        if generation is None:
+            return None
+        body = json.dumps({"user": user_id, "payload": payload}, sort_keys=True, default=str)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}{namespace}:{generation}:{digest}"
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Look up cached results."""
+        value = self._local.get(key)
+        if value is None and self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except (redis.RedisError, OSError) as e:
+                logger.warning(f"Result cache Redis lookup failed: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._local.set(key, value)
+
+        RESULT_CACHE_LOOKUPS.labels(result="hit" if value is not None else "miss").inc()
+        return value
+
+    async def set(self, key: str, results: List[Dict[str, Any]]) -> None:
+        """Store results under a key from :meth:`key_for`."""
+        self._local.set(key, results)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(key, json.dumps(results), ex=self.ttl_seconds)
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Result cache Redis write failed: {e}")
+
+
+_cache: Optional[ResultCache] = None
+
+
+def init_result_cache(redis_client: Optional[redis.Redis] = None) -> Optional[ResultCache]:
+    """
+    Create the process-wide result cache.
+
+    Without Redis, generation bumps cannot reach other workers, so the cache is
+    disabled when more than one worker is configured rather than risk serving
+    stale results.
+    """
+    global _cache
+    if redis_client is None and settings.WORKERS > 1:
+        logger.warning("Result cache disabled: multiple workers require Redis for invalidation")
+        _cache = None
+        return None
+
+    _cache = ResultCache(
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        redis_client=redis_client,
+    )
+    return _cache
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Get the process-wide result cache, or ``None`` if it is disabled."""
+    return _cache
+
+
+def close_result_cache() -> None:
+    """Drop the process-wide result cache."""
+    global _cache
+    _cache = None
+
+
+async def current_generation(namespace: str) -> Optional[int]:
+    """
+    Generation a request should key its cache entries under.
+
+    Returns:
+        The namespace's generation, or ``None`` if caching is disabled or unavailable
+    """
+    if _cache is None:
+        return None
+    return await _cache.generation(namespace)
+
+
+async def invalidate_results(namespace: str) -> None:
+    """Invalidate cached results after the corpus of tenant ``namespace`` changes."""
+    if _cache is not None:
+        await _cache.bump(namespace)
@@ -0,0 +1,230 @@
+"""
+Retrieval Service
+Embeds queries and searches a tenant's partition for relevant chunks.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.llm.embeddings import embed_queries, embed_query
+from app.services.rag.diversity import maximal_marginal_relevance
+from app.services.rag.fusion import reciprocal_rank_fusion
+from app.services.rag.partitions import Partition
+from app.services.rag.reranker import rerank
+from app.services.vector import SearchHit
+
+logger = logging.getLogger(__name__)
+
+
+async def retrieve(
+    partition: Partition,
+    query: str,
+    top_k: int,
+    similarity_threshold: float,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[SearchHit]:
+    """
+    Retrieve the chunks most similar to a query.
+
+    Args:
+        partition: Tenant partition to search
+        query: Query text
+        top_k: Maximum number of chunks to return
+        similarity_threshold: Minimum cosine similarity
+        filters: Optional metadata filters, applied before the vector search
+
+    Returns:
+        Hits ordered by descending similarity
+    """
+    store = partition.store
+    if store.ntotal == 0:
+        return []
+    vector = await embed_query(query)
+
+    # FAISS releases the GIL, so searching in a worker thread keeps the event loop free
+    return await asyncio.to_thread(store.search, vector, top_k, similarity_threshold, filters)
+
+
+async def retrieve_reranked(
+    partition: Partition,
+    query: str,
+    top_k: int,
+    similarity_threshold: float,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[SearchHit], bool]:
+    """
+    Retrieve a wider ANN candidate pool and rerank it with the cross-encoder.
+
+    Args:
+        partition: Tenant partition to search
+        query: Query text
+        top_k: Maximum number of chunks to return
+        similarity_threshold: Minimum cosine similarity for a candidate
+        filters: Optional metadata filters, applied before the vector search
+
+    Returns:
+        Reranked hits and whether every candidate was scored before the deadline
+    """
+    pool = max(top_k, settings.RERANK_CANDIDATES)
+    hits = await retrieve(partition, query, pool, similarity_threshold, filters)
+    return await rerank(query, hits, top_k)
+
+
+async def diversify(
+    partition: Partition,
+    query: str,
+    hits: Sequence[SearchHit],
+    top_k: int,
+    lambda_mult: float,
+) -> List[SearchHit]:
+    """
+    Pick a relevant but non-redundant subset of semantic search hits.
+
+    Args:
+        partition: Partition the hits came from
+        query: Query text
+        hits: Candidate pool from the vector store, best first
+        top_k: Number of hits to keep
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        Selected hits in maximal-marginal-relevance order
+    """
+    if len(hits) <= 1 or any(hit.label is None for hit in hits):
+        return list(hits[:top_k])
+    # Served from the embedding cache: the pool was just retrieved for this query
+    vector = await embed_query(query)
+    labels = [hit.label for hit in hits]
+    try:
+        candidates = await asyncio.to_thread(partition.store.vectors, labels)
+    except KeyError:
+        # Compaction moved the hits to a new segment since the search
+        return list(hits[:top_k])
+    selected = maximal_marginal_relevance(vector, candidates, top_k, lambda_mult)
+    return [hits[i] for i in selected]
+
+
+async def retrieve_context(
+    partition: Partition, query: str, use_rerank: bool = False
+) -> List[SearchHit]:
+    """
+    Retrieve chunks to ground a chat answer.
+
+    Args:
+        partition: Tenant partition to search
+        query: User message
+        use_rerank: Rerank candidates with the cross-encoder
+
+    Returns:
+        Up to ``TOP_K_RESULTS`` chunks above ``SIMILARITY_THRESHOLD``
+    """
+    if use_rerank:
+        hits, _ = await retrieve_reranked(
+            partition, query, settings.TOP_K_RESULTS, settings.SIMILARITY_THRESHOLD
+        )
+        return hits
+    return await retrieve(partition, query, settings.TOP_K_RESULTS, settings.SIMILARITY_THRESHOLD)
+
+
+async def retrieve_batch(
+    partition: Partition,
+    queries: Sequence[str],
+    top_ks: Sequence[int],
+    similarity_thresholds: Sequence[float],
+    filters: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+) -> List[List[SearchHit]]:
+    """
+    Retrieve chunks for many queries at once.
+
+    Queries are embedded in one batched call. Queries sharing the same filters
+    are scored against the index as one matrix search at the group's largest
+    ``top_k``; each query's hits are then cut to its own ``top_k`` and threshold.
+
+    Args:
+        partition: Tenant partition to search
+        queries: Query texts
+        top_ks: Maximum number of chunks per query
+        similarity_thresholds: Minimum cosine similarity per query
+        filters: Optional metadata filters per query
+
+    Returns:
+        Hits per query, each ordered by descending similarity
+    """
+    store = partition.store
+    if not queries or store.ntotal == 0:
+        return [[] for _ in queries]
+
+    vectors = await embed_queries(list(queries))
+    per_query_filters = list(filters) if filters is not None else [None] * len(queries)
+
+    groups: Dict[str, List[int]] = {}
+    for i, query_filters in enumerate(per_query_filters):
+        groups.setdefault(json.dumps(query_filters, sort_keys=True, default=str), []).append(i)
+
+    results: List[List[SearchHit]] = [[] for _ in queries]
+    for positions in groups.values():
+        group_hits = await asyncio.to_thread(
+            store.search_batch,
+            vectors[positions],
+            max(top_ks[i] for i in positions),
+            0.0,
+            per_query_filters[positions[0]],
+        )
+        for i, hits in zip(positions, group_hits, strict=True):
+            results[i] = [hit for hit in hits if hit.score >= similarity_thresholds[i]][: top_ks[i]]
+    return results
+
+
+async def keyword_retrieve(partition: Partition, query: str, top_k: int) -> List[SearchHit]:
+    """
+    Retrieve chunks by BM25 keyword relevance.
+
+    Args:
+        partition: Tenant partition to search
+        query: Query text
+        top_k: Maximum number of chunks to return
+
+    Returns:
+        Hits ordered by descending BM25 score
+    """
+    return await asyncio.to_thread(partition.keywords.search, query, top_k)
+
+
+async def hybrid_retrieve(
+    partition: Partition,
+    query: str,
+    top_k: int,
+    use_semantic: bool = True,
+    use_keyword: bool = True,
+) -> List[SearchHit]:
+    """
+    Retrieve chunks with semantic and keyword search fused by reciprocal rank.
+
+    Both legs run concurrently, so the keyword search overlaps the query
+    embedding call instead of waiting behind it.
+
+    Args:
+        partition: Tenant partition to search
+        query: Query text
+        top_k: Maximum number of chunks to return
+        use_semantic: Include the vector search leg
+        use_keyword: Include the BM25 keyword leg
+
+    Returns:
+        Fused hits ordered by descending RRF score
+    """
+    pool = max(top_k, settings.HYBRID_CANDIDATE_POOL)
+
+    legs = []
+    if use_semantic:
+        legs.append(retrieve(partition, query, top_k=pool, similarity_threshold=0.0))
+    if use_keyword:
+        legs.append(keyword_retrieve(partition, query, top_k=pool))
+    if not legs:
+        return []
+
+    result_lists = await asyncio.gather(*legs)
+    return reciprocal_rank_fusion(result_lists, top_k=top_k, k=settings.RRF_K)
@@ -0,0 +1,218 @@
+"""
+Semantic Cache
+Serves cached answers to queries that are near-duplicates of recent ones.
+"""
+
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import SEMANTIC_CACHE_LOOKUPS
+from app.services.rag.result_cache import get_result_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    scope: str
+    value: Any
+    expires_at: float
+
+
+@dataclass
+class _Scope:
+    """Normalized query vectors of the live entries that share a scope."""
+
+    ids: List[int] = field(default_factory=list)
+    vectors: Optional[np.ndarray] = None
+
+    def add(self, entry_id: int, vector: np.ndarray) -> None:
+        if self.vectors is None:
+            self.vectors = np.empty((16, len(vector)), dtype=np.float32)
+        elif len(self.ids) == len(self.vectors):
+            grown = np.empty((2 * len(self.vectors), self.vectors.shape[1]), dtype=np.float32)
+            grown[: len(self.ids)] = self.vectors
+            self.vectors = grown
+        self.vectors[len(self.ids)] = vector
+        self.ids.append(entry_id)
+
+    def remove(self, entry_id: int) -> None:
+        # Keep rows dense by moving the last entry into the freed slot
+        row = self.ids.index(entry_id)
+        last = len(self.ids) - 1
+        self.ids[row] = self.ids[last]
+        self.vectors[row] = self.vectors[last]
+        self.ids.pop()
+
+
+class SemanticCache:
+    """
+    Cache keyed on query meaning rather than query text.
+
+    Entries are grouped by scope: everything other than the query text that
+    determines the answer (tenant, corpus generation, filters, model
+    parameters). Within a scope, a lookup returns the entry whose query
+    embedding is closest to the new one, provided the cosine distance is at
+    most ``max_distance``. Scopes hold at most ``max_entries`` vectors between
+    them, so an exact scan of a scope costs about as much as one small
+    matrix-vector product and no ANN structure has to be maintained under
+    constant insertion and eviction.
+
+    Not thread-safe; intended for use from the event loop. Entries live in
+    this process only: a worker that misses simply answers the query itself.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_distance: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._scopes: Dict[str, _Scope] = {}
+        self._ids = itertools.count()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counters for this cache instance."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _evict(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        scope = self._scopes[entry.scope]
+        scope.remove(entry_id)
+        if not scope.ids:
+            del self._scopes[entry.scope]
+
+    def get(self, scope: str, vector: np.ndarray, endpoint: str = "retrieval") -> Optional[Any]:
+        """
+        Look up the answer to the nearest cached query in a scope.
+
+        Args:
+            scope: Scope key from the caller
+            vector: Query embedding
+            endpoint: Endpoint label for hit-rate metrics
+
+        Returns:
+            The cached value, or ``None`` if no query in the scope is close enough
+        """
+        value = None
+        bucket = self._scopes.get(scope)
+        if bucket is not None:
+            n = len(bucket.ids)
+            scores = bucket.vectors[:n] @ self._normalize(vector)
+            best = int(np.argmax(scores))
+            if 1.0 - float(scores[best]) <= self.max_distance:
+                entry_id = bucket.ids[best]
+                entry = self._entries[entry_id]
+                if entry.expires_at < time.monotonic():
+                    self._evict(entry_id)
+                else:
+                    self._entries.move_to_end(entry_id)
+                    value = entry.value
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        SEMANTIC_CACHE_LOOKUPS.labels(
+            endpoint=endpoint, result="hit" if value is not None else "miss"
+        ).inc()
+        return value
+
+    def set(self, scope: str, vector: np.ndarray, value: Any) -> None:
+        """
+        Cache the answer to a query, evicting the least recently used entries if full.
+
+        Args:
+            scope: Scope key from the caller
+            vector: Query embedding
+            value: Answer to serve for near-duplicate queries
+        """
+        entry_id = next(self._ids)
+        self._entries[entry_id] = _Entry(scope, value, time.monotonic() + self.ttl_seconds)
+        self._scopes.setdefault(scope, _Scope()).add(entry_id, self._normalize(vector))
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
+        self._scopes.clear()
+
+
+_cache: Optional[SemanticCache] = None
+
+
+def init_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Create the process-wide semantic cache.
+
+    Scopes embed the result cache generation so that corpus changes retire
+    old answers, so the semantic cache is disabled whenever the result cache is.
+    """
+    global _cache
+    if settings.SEMANTIC_CACHE_MAX_DISTANCE <= 0 or get_result_cache() is None:
+        _cache = None
+        return None
+
+    _cache = SemanticCache(
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_distance=settings.SEMANTIC_CACHE_MAX_DISTANCE,
+    )
+    return _cache
+
+
+async def scope_for(
+    namespace: str, params: Dict[str, Any], generation: Optional[int] = None
+) -> Optional[str]:
+    """
+    Build the scope key for a request.
+
+    Every user of a tenant searches the same partition, so scopes are shared
+    across the tenant's users rather than kept per user.
+
+    Args:
+        namespace: Tenant whose corpus answers the request
+        params: Request parameters other than the query text
+        generation: Result cache generation already read for this request
+
+    Returns:
+        Scope key, or ``None`` if caching must be bypassed
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return None
+    return await cache.key_for(namespace, "", params, generation)
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the process-wide semantic cache, or ``None`` if it is disabled."""
+    return _cache
+
+
+def close_semantic_cache() -> None:
+    """Drop the process-wide semantic cache."""
+    global _cache
+    _cache = None
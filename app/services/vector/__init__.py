@@ -0,0 +1,14 @@
+"""Vector search services."""
+
+from app.services.vector.document_index import DocumentIndex
+from app.services.vector.records import ChunkRecord
+from app.services.vector.segments import SegmentedVectorStore
+from app.services.vector.store import FaissVectorStore, SearchHit
+
+__all__ = [
+    "ChunkRecord",
+    "DocumentIndex",
+    "FaissVectorStore",
+    "SearchHit",
+    "SegmentedVectorStore",
+]
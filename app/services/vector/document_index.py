@@ -0,0 +1,362 @@
+"""
+Document Index
+Document-level centroid vectors with an incrementally maintained k-NN graph.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from app.services.vector.records import ChunkRecord
+from app.services.vector.segments import SegmentedVectorStore
+from app.services.vector.store import FaissVectorStore
+from app.utils.delta_log import append_log, read_log, start_log
+
+logger = logging.getLogger(__name__)
+
+Neighbor = Tuple[str, float]
+VectorStore = Union[FaissVectorStore, SegmentedVectorStore]
+
+
+def _log_size(entries: Sequence[Tuple[str, object]]) -> int:
+    """Number of chunks pooled or documents removed by delta log entries."""
+    return sum(len(argument[0]) if operation == "add" else 1 for operation, argument in entries)
+
+
+class DocumentIndex:
+    """
+    Mean-pooled document vectors and a precomputed k-nearest-neighbour graph.
+
+    Each document is represented by the normalised mean of its normalised chunk
+    embeddings. When a document gains chunks, its neighbour list is recomputed
+    and the change is pushed to every other document whose list it now enters
+    or whose score for it changed, so "similar documents" is a dictionary
+    lookup. Lists that may have lost a true neighbour are marked stale and
+    recomputed on their next lookup.
+
+    Saves append the chunks pooled and documents removed since the previous
+    save to a delta log over the last full snapshot of pooled vectors.
+    """
+
+    FILE = "documents.npz"
+    LOG_FILE = "documents.log"
+
+    def __init__(self, dimension: int, graph_k: int):
+        self.dimension = dimension
+        self.graph_k = graph_k
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._sums = np.zeros((0, dimension), dtype=np.float32)
+        self._centroids = np.zeros((0, dimension), dtype=np.float32)
+        self._counts = np.zeros(0, dtype=np.int64)
+        # Score of each document's k-th neighbour (-inf while its list is short)
+        self._worst = np.zeros(0, dtype=np.float32)
+        self._neighbors: Dict[str, List[Neighbor]] = {}
+        self._reverse: Dict[str, Set[str]] = {}
+        self._stale: Set[str] = set()
+        self._lock = threading.RLock()
+        self._dirty = False
+        # Snapshot identifier, the log file on disk extending it, and its size in chunks
+        self._epoch: Optional[int] = None
+        self._log: Optional[Path] = None
+        self._logged = 0
+        # Changes not yet written, as delta log entries
+        self._pending: List[Tuple[str, object]] = []
+
+    @property
+    def ndocuments(self) -> int:
+        """Number of indexed documents."""
+        return len(self._ids)
+
+    @property
+    def nchunks(self) -> int:
+        """Number of chunks pooled into document vectors."""
+        return int(self._counts[: self.ndocuments].sum())
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the index has changes that have not been saved."""
+        return self._dirty
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._positions
+
+    def _ensure_capacity(self, size: int) -> None:
+        if size <= len(self._counts):
+            return
+        capacity = max(size, 2 * len(self._counts), 64)
+        for name, fill in (("_sums", 0.0), ("_centroids", 0.0)):
+            grown = np.full((capacity, self.dimension), fill, dtype=np.float32)
+            grown[: self.ndocuments] = getattr(self, name)[: self.ndocuments]
+            setattr(self, name, grown)
+        counts = np.zeros(capacity, dtype=np.int64)
+        counts[: self.ndocuments] = self._counts[: self.ndocuments]
+        worst = np.full(capacity, -np.inf, dtype=np.float32)
+        worst[: self.ndocuments] = self._worst[: self.ndocuments]
+        self._counts, self._worst = counts, worst
+
+    def _position(self, document_id: str) -> int:
+        position = self._positions.get(document_id)
+        if position is None:
+            position = len(self._ids)
+            self._ensure_capacity(position + 1)
+            self._ids.append(document_id)
+            self._positions[document_id] = position
+            self._neighbors[document_id] = []
+        return position
+
+    def _set_neighbors(self, document_id: str, neighbors: List[Neighbor]) -> None:
+        for old, _ in self._neighbors.get(document_id, []):
+            self._reverse.get(old, set()).discard(document_id)
+        for new, _ in neighbors:
+            self._reverse.setdefault(new, set()).add(document_id)
+        self._neighbors[document_id] = neighbors
+        full = len(neighbors) >= self.graph_k
+        self._worst[self._positions[document_id]] = neighbors[-1][1] if full else -np.inf
+
+    def _similarities(self, position: int) -> np.ndarray:
+        n = self.ndocuments
+        scores = self._centroids[:n] @ self._centroids[position]
+        scores[position] = -np.inf
+        return scores
+
+    def _top_neighbors(self, scores: np.ndarray, k: int) -> List[Neighbor]:
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[j], float(scores[j])) for j in top]
+
+    def _refresh(self, document_id: str) -> None:
+        """Recompute a document's neighbour list exactly."""
+        scores = self._similarities(self._positions[document_id])
+        self._set_neighbors(document_id, self._top_neighbors(scores, self.graph_k))
+        self._stale.discard(document_id)
+
+    def _propagate(self, document_id: str) -> None:
+        """Refresh a changed document and push its new scores into other lists."""
+        position = self._positions[document_id]
+        scores = self._similarities(position)
+        self._set_neighbors(document_id, self._top_neighbors(scores, self.graph_k))
+        self._stale.discard(document_id)
+
+        # Lists that already contain the document: rescore, and mark stale on a drop
+        for other in list(self._reverse.get(document_id, ())):
+            if other in self._stale:
+                continue
+            neighbors = self._neighbors[other]
+            new_score = float(scores[self._positions[other]])
+            old_score = next(score for doc, score in neighbors if doc == document_id)
+            updated = sorted(
+                [(doc, new_score if doc == document_id else score) for doc, score in neighbors],
+                key=lambda item: item[1],
+                reverse=True,
+            )
+            self._set_neighbors(other, updated)
+            if new_score < old_score:
+                self._stale.add(other)
+
+        # Lists the document now enters: its score beats their current k-th neighbour
+        entering = np.flatnonzero(scores > self._worst[: self.ndocuments])
+        for j in entering:
+            other = self._ids[j]
+            if other in self._stale or any(doc == document_id for doc, _ in self._neighbors[other]):
+                continue
+            updated = sorted(
+                self._neighbors[other] + [(document_id, float(scores[j]))],
+                key=lambda item: item[1],
+                reverse=True,
+            )[: self.graph_k]
+            self._set_neighbors(other, updated)
+
+    def add(self, records: Sequence[ChunkRecord], vectors: np.ndarray) -> None:
+        """
+        Pool new chunk embeddings into their documents and update the graph.
+
+        Args:
+            records: Chunk records
+            vectors: Chunk embeddings, one row per record
+        """
+        matrix = np.array(vectors, dtype=np.float32, copy=True, ndmin=2)
+        if len(matrix) == 0:
+            return
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            touched: Dict[str, int] = {}
+            for record, vector in zip(records, matrix, strict=True):
+                position = self._position(record.document_id)
+                self._sums[position] += vector
+                self._counts[position] += 1
+                touched[record.document_id] = position
+
+            for position in touched.values():
+                norm = max(float(np.linalg.norm(self._sums[position])), 1e-12)
+                self._centroids[position] = self._sums[position] / norm
+
+            for document_id in touched:
+                self._propagate(document_id)
+            self._pending.append(("add", ([r.document_id for r in records], matrix)))
+            self._dirty = True
+
+    def remove(self, document_id: str) -> None:
+        """
+        Drop a document and mark lists that pointed at it for refresh.
+
+        Args:
+            document_id: Document to remove
+        """
+        with self._lock:
+            if document_id not in self._positions:
+                return
+
+            self._set_neighbors(document_id, [])
+            for other in self._reverse.pop(document_id, set()):
+                self._set_neighbors(
+                    other, [n for n in self._neighbors[other] if n[0] != document_id]
+                )
+                self._stale.add(other)
+            self._stale.discard(document_id)
+            del self._neighbors[document_id]
+            position = self._positions.pop(document_id)
+
+            # Keep rows dense by moving the last document into the freed slot
+            last = self.ndocuments - 1
+            if position != last:
+                moved = self._ids[last]
+                self._ids[position] = moved
+                self._positions[moved] = position
+                for name in ("_sums", "_centroids", "_counts", "_worst"):
+                    array = getattr(self, name)
+                    array[position] = array[last]
+            self._ids.pop()
+            self._pending.append(("remove", document_id))
+            self._dirty = True
+
+    def similar(self, document_id: str, top_k: int) -> Optional[List[Neighbor]]:
+        """
+        Documents most similar to ``document_id``.
+
+        Args:
+            document_id: Source document
+            top_k: Number of neighbours to return
+
+        Returns:
+            (document_id, cosine similarity) pairs, or ``None`` for an unknown document
+        """
+        with self._lock:
+            if document_id not in self._positions:
+                return None
+            if top_k > self.graph_k:
+                scores = self._similarities(self._positions[document_id])
+                return self._top_neighbors(scores, top_k)
+            if document_id in self._stale:
+                self._refresh(document_id)
+            return self._neighbors[document_id][:top_k]
+
+    def save(self, path: str, fold: bool = False) -> None:
+        """
+        Persist pooled document vectors; neighbour lists are rebuilt on demand after loading.
+
+        Changes since the previous save are appended to the delta log. The
+        log is folded into a new snapshot instead when ``fold`` is set, when
+        it would outgrow half the pooled chunks, or when the index was not
+        loaded from or last saved to ``path``.
+
+        Args:
+            path: Directory to save into
+            fold: Whether to rewrite the snapshot and start an empty log
+        """
+        target = Path(path)
+        target.mkdir(parents=True, exist_ok=True)
+        log = target / self.LOG_FILE
+        with self._lock:
+            logged = self._logged + _log_size(self._pending)
+            if fold or self._log != log or 2 * logged > self.nchunks:
+                self._epoch = time.time_ns()
+                n = self.ndocuments
+                tmp = target / f"{self.FILE}.tmp.npz"
+                np.savez(
+                    tmp,
+                    ids=np.array(self._ids, dtype=str),
+                    sums=self._sums[:n],
+                    counts=self._counts[:n],
+                    epoch=np.int64(self._epoch),
+                )
+                os.replace(tmp, target / self.FILE)
+                start_log(log, self._epoch)
+                self._log, self._logged = log, 0
+            elif self._pending:
+                append_log(log, self._pending)
+                self._logged = logged
+            self._pending = []
+            self._dirty = False
+
+    @classmethod
+    def load(cls, path: str, graph_k: int) -> "DocumentIndex":
+        """Load pooled document vectors written by :meth:`save`, replaying its delta log."""
+        root = Path(path)
+        with np.load(root / cls.FILE) as data:
+            sums, counts, ids = data["sums"], data["counts"], data["ids"].tolist()
+            epoch = int(data["epoch"]) if "epoch" in data.files else None
+
+        index = cls(dimension=sums.shape[1], graph_k=graph_k)
+        index._ensure_capacity(len(ids))
+        index._ids = ids
+        index._positions = {doc: i for i, doc in enumerate(ids)}
+        index._neighbors = {doc: [] for doc in ids}
+        index._sums[: len(ids)] = sums
+        index._counts[: len(ids)] = counts
+        index._epoch = epoch
+
+        entries = read_log(root / cls.LOG_FILE, epoch)
+        if entries is not None:
+            # Pool logged changes directly; every list is recomputed on lookup anyway
+            for operation, argument in entries:
+                if operation == "add":
+                    document_ids, matrix = argument
+                    for document_id, vector in zip(document_ids, matrix, strict=True):
+                        position = index._position(document_id)
+                        index._sums[position] += vector
+                        index._counts[position] += 1
+                else:
+                    index.remove(argument)
+            index._log, index._logged = root / cls.LOG_FILE, _log_size(entries)
+
+        n = index.ndocuments
+        norms = np.maximum(np.linalg.norm(index._sums[:n], axis=1, keepdims=True), 1e-12)
+        index._centroids[:n] = index._sums[:n] / norms
+        index._stale = set(index._ids)
+        index._pending = []
+        index._dirty = False
+        return index
+
+    @classmethod
+    def build(cls, store: VectorStore, graph_k: int, batch_size: int = 65536) -> "DocumentIndex":
+        """Pool every live chunk in a vector store into document vectors."""
+        index = cls(dimension=store.dimension, graph_k=graph_k)
+        records = store.records
+        live = store.labels()
+        for start in range(0, len(live), batch_size):
+            labels = live[start : start + batch_size]
+            # Segmented stores index records by position among live chunks
+            batch = records[start : start + len(labels)]
+            vectors = store.vectors(labels)
+            with index._lock:
+                for record, vector in zip(batch, vectors, strict=True):
+                    position = index._position(record.document_id)
+                    index._sums[position] += vector
+                    index._counts[position] += 1
+
+        n = index.ndocuments
+        norms = np.maximum(np.linalg.norm(index._sums[:n], axis=1, keepdims=True), 1e-12)
+        index._centroids[:n] = index._sums[:n] / norms
+        index._stale = set(index._ids)
+        index._dirty = bool(n)
+        return index
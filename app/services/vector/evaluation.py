@@ -0,0 +1,145 @@
+"""
+Vector Store Evaluation
+Recall@k and memory reports for choosing an index quantization mode.
+
+Run against a tenant's saved partition with::
+
+    python -m app.services.vector.evaluation --tenant acme --queries 500 --top-k 5
+"""
+
+import argparse
+import json
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector.segments import SegmentedVectorStore
+from app.services.vector.store import FaissVectorStore
+from app.utils.tenancy import partition_path
+
+VectorStore = Union[FaissVectorStore, SegmentedVectorStore]
+
+logger = logging.getLogger(__name__)
+
+
+def exact_neighbors(
+    store: VectorStore, queries: np.ndarray, top_k: int, batch_size: int = 65536
+) -> np.ndarray:
+    """
+    Ground-truth neighbours by exhaustive search over full-precision vectors.
+
+    Args:
+        store: Vector store to scan
+        queries: Normalized query matrix
+        top_k: Neighbours per query
+
+    Returns:
+        int64 matrix of shape (len(queries), top_k) of positions in
+        ``store.records``, ordered by similarity
+    """
+    live = store.labels()
+    k = min(top_k, len(live))
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_positions = np.full((len(queries), k), -1, dtype=np.int64)
+    for start in range(0, len(live), batch_size):
+        positions = np.arange(start, min(start + batch_size, len(live)), dtype=np.int64)
+        scores = queries @ store.vectors(live[positions]).T
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_positions = np.concatenate(
+            [best_positions, np.broadcast_to(positions, scores.shape)], axis=1
+        )
+        top = np.argsort(-merged_scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_positions = np.take_along_axis(merged_positions, top, axis=1)
+    return best_positions
+
+
+def recall_at_k(store: VectorStore, queries: np.ndarray, top_k: int) -> float:
+    """
+    Fraction of the exact top-k neighbours the store's search returns.
+
+    Args:
+        store: Vector store under test
+        queries: Query matrix
+        top_k: Cut-off, usually ``TOP_K_RESULTS``
+
+    Returns:
+        Mean recall@k over the queries
+    """
+    queries = np.array(queries, dtype=np.float32, copy=True, ndmin=2)
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+    truth = exact_neighbors(store, queries, top_k)
+    hits = store.search_batch(queries, top_k, similarity_threshold=-1.0)
+    records = store.records
+
+    found = 0
+    for expected, row in zip(truth, hits, strict=True):
+        expected_ids = {records[position].chunk_id for position in expected if position >= 0}
+        found += len(expected_ids & {hit.record.chunk_id for hit in row})
+    return found / max(truth.size, 1)
+
+
+def quantization_report(
+    store: VectorStore,
+    num_queries: int = 200,
+    top_k: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Memory use and recall@k for a store, with queries sampled from its own vectors.
+
+    Sampled vectors are perturbed with noise so queries do not trivially match
+    themselves. For a segmented store, recall is measured over the merged
+    search of every segment and memory is also reported per segment.
+
+    Args:
+        store: Vector store to evaluate
+        num_queries: Number of sampled queries
+        top_k: Cut-off (defaults to ``TOP_K_RESULTS``)
+        seed: Sampling seed
+
+    Returns:
+        Report with the index layout, memory figures and recall@k
+    """
+    top_k = top_k or settings.TOP_K_RESULTS
+    report: Dict[str, Any] = {
+        "index_type": store.index_type,
+        "quantization": store.quantization,
+        "top_k": top_k,
+        **store.memory_usage(),
+    }
+    if store.ntotal == 0:
+        report["recall_at_k"] = None
+        return report
+
+    rng = np.random.default_rng(seed)
+    live = store.labels()
+    sample = rng.choice(len(live), size=min(num_queries, len(live)), replace=False)
+    queries = store.vectors(live[np.sort(sample)])
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+    report["recall_at_k"] = round(recall_at_k(store, queries, top_k), 4)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Report vector store memory use and recall@k")
+    parser.add_argument("--tenant", required=True, help="Tenant whose partition to evaluate")
+    parser.add_argument("--path", default=settings.VECTOR_STORE_PATH, help="Vector store root")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=settings.TOP_K_RESULTS)
+    args = parser.parse_args(argv)
+
+    path = partition_path(args.path, args.tenant)
+    if not SegmentedVectorStore.exists(str(path)):
+        parser.error(f"No saved partition for tenant {args.tenant} under {args.path}")
+    store = SegmentedVectorStore.load(str(path))
+    report = {"tenant": args.tenant, "version": store.version}
+    report.update(quantization_report(store, args.queries, args.top_k))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
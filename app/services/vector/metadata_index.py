@@ -0,0 +1,199 @@
+"""
+Metadata Index
+Roaring-style bitmaps over chunk labels, one per metadata field/value pair.
+"""
+
+import logging
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Containers at or below this cardinality are sorted uint16 arrays; above it, 65536-bit sets
+ARRAY_CONTAINER_LIMIT = 4096
+BITSET_WORDS = 1 << 16 >> 6
+
+
+def _bitset_to_array(words: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _array_to_bitset(values: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << 16, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _cardinality(container: np.ndarray) -> int:
+    if container.dtype == np.uint16:
+        return len(container)
+    return int(np.unpackbits(container.view(np.uint8)).sum())
+
+
+def _optimize(words: np.ndarray) -> np.ndarray:
+    """Shrink a bitset container to an array container when it is sparse enough."""
+    if _cardinality(words) <= ARRAY_CONTAINER_LIMIT:
+        return _bitset_to_array(words)
+    return words
+
+
+def _as_bitset(container: np.ndarray) -> np.ndarray:
+    return container if container.dtype == np.uint64 else _array_to_bitset(container)
+
+
+class Bitmap:
+    """
+    Compressed set of non-negative integer labels.
+
+    Labels are split on their high 16 bits into containers. Sparse containers
+    are sorted ``uint16`` arrays and dense ones are 8 KiB bitsets, so memory
+    tracks cardinality while intersections stay vectorised. Additions are
+    buffered and merged into containers on the next read.
+    """
+
+    __slots__ = ("_containers", "_pending")
+
+    def __init__(self, labels: Optional[Iterable[int]] = None):
+        self._containers: Dict[int, np.ndarray] = {}
+        self._pending: List[int] = []
+        if labels is not None:
+            self._pending.extend(labels)
+
+    def add(self, label: int) -> None:
+        """Add a label."""
+        self._pending.append(label)
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        labels = np.unique(np.asarray(self._pending, dtype=np.int64))
+        self._pending = []
+
+        highs = labels >> 16
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        for chunk in np.split(labels, bounds):
+            high = int(chunk[0] >> 16)
+            lows = (chunk & 0xFFFF).astype(np.uint16)
+            existing = self._containers.get(high)
+            if existing is not None:
+                if existing.dtype == np.uint64:
+                    self._containers[high] = existing | _array_to_bitset(lows)
+                    continue
+                lows = np.union1d(existing, lows)
+            self._containers[high] = (
+                lows if len(lows) <= ARRAY_CONTAINER_LIMIT else _array_to_bitset(lows)
+            )
+
+    def __len__(self) -> int:
+        self._flush()
+        return sum(_cardinality(c) for c in self._containers.values())
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        self._flush()
+        other._flush()
+        result = Bitmap()
+        for high in self._containers.keys() & other._containers.keys():
+            a, b = self._containers[high], other._containers[high]
+            if a.dtype == np.uint16 and b.dtype == np.uint16:
+                merged = np.intersect1d(a, b, assume_unique=True)
+            elif a.dtype == np.uint16 or b.dtype == np.uint16:
+                values, words = (a, b) if a.dtype == np.uint16 else (b, a)
+                bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+                merged = values[bits[values].astype(bool)]
+            else:
+                merged = _optimize(a & b)
+            if len(merged):
+                result._containers[high] = merged
+        return result
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        self._flush()
+        other._flush()
+        result = Bitmap()
+        for high in self._containers.keys() | other._containers.keys():
+            a, b = self._containers.get(high), other._containers.get(high)
+            if a is None or b is None:
+                result._containers[high] = (a if b is None else b).copy()
+            elif a.dtype == np.uint16 and b.dtype == np.uint16:
+                merged = np.union1d(a, b).astype(np.uint16)
+                result._containers[high] = (
+                    merged if len(merged) <= ARRAY_CONTAINER_LIMIT else _array_to_bitset(merged)
+                )
+            else:
+                result._containers[high] = _as_bitset(a) | _as_bitset(b)
+        return result
+
+    def to_array(self) -> np.ndarray:
+        """Sorted labels as an int64 array."""
+        self._flush()
+        parts = []
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            lows = container if container.dtype == np.uint16 else _bitset_to_array(container)
+            parts.append(lows.astype(np.int64) | (high << 16))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def to_dense(self, size: int) -> np.ndarray:
+        """Pack labels into a little-endian bitmap of ``size`` bits (FAISS ``IDSelectorBitmap`` layout)."""
+        bits = np.zeros(size, dtype=bool)
+        bits[self.to_array()] = True
+        return np.packbits(bits, bitorder="little")
+
+
+def _index_values(value: Any) -> List[Hashable]:
+    """Metadata values that can be indexed: scalars, or each scalar in a list."""
+    if isinstance(value, (list, tuple, set)):
+        return [v for v in value if isinstance(v, (str, int, float, bool))]
+    if isinstance(value, (str, int, float, bool)):
+        return [value]
+    return []
+
+
+class MetadataIndex:
+    """
+    Inverted index from metadata field/value pairs to label bitmaps.
+
+    Filters are ``{field: value}`` or ``{field: [values]}``: values within a
+    field are OR-ed and fields are AND-ed.
+    """
+
+    def __init__(self):
+        self._bitmaps: Dict[Tuple[str, Hashable], Bitmap] = {}
+
+    def add(self, label: int, fields: Dict[str, Any]) -> None:
+        """
+        Index a chunk's filterable fields.
+
+        Args:
+            label: Chunk label in the vector index
+            fields: Field name to scalar or list of scalars
+        """
+        for name, value in fields.items():
+            for item in _index_values(value):
+                bitmap = self._bitmaps.get((name, item))
+                if bitmap is None:
+                    bitmap = self._bitmaps[(name, item)] = Bitmap()
+                bitmap.add(label)
+
+    def select(self, filters: Dict[str, Any]) -> Bitmap:
+        """
+        Resolve filters to the bitmap of matching labels.
+
+        Args:
+            filters: Metadata filters
+
+        Returns:
+            Labels matching every field
+        """
+        result: Optional[Bitmap] = None
+        for name, value in filters.items():
+            field_bitmap = Bitmap()
+            for item in _index_values(value):
+                bitmap = self._bitmaps.get((name, item))
+                if bitmap is not None:
+                    field_bitmap = field_bitmap | bitmap
+            result = field_bitmap if result is None else result & field_bitmap
+            if len(result) == 0:
+                break
+        return result if result is not None else Bitmap()
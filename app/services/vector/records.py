@@ -0,0 +1,127 @@
+"""
+Chunk Records
+Chunk metadata records and a memory-mapped, label-addressed record table.
+"""
+
+import json
+import logging
+import mmap
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union, overload
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChunkRecord:
+    """A stored document chunk and its metadata."""
+
+    chunk_id: str
+    document_id: str
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class RecordTable(Sequence[ChunkRecord]):
+    """
+    Chunk records addressed by FAISS label.
+
+    Saved records stay in a JSONL file that is memory-mapped read-only and
+    decoded on access through an array of line offsets, so every worker
+    process shares the OS page cache instead of holding its own copy of every
+    record. Records appended since the last save are kept in a list.
+    """
+
+    OFFSETS_SUFFIX = ".offsets.npy"
+
+    def __init__(self, path: Optional[Path] = None):
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._tail: List[ChunkRecord] = []
+        if path is not None:
+            self._open(path)
+
+    def _open(self, path: Path) -> None:
+        if path.stat().st_size == 0:
+            return
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offsets_path = path.with_name(path.name + self.OFFSETS_SUFFIX)
+        if offsets_path.exists():
+            self._offsets = np.load(offsets_path, mmap_mode="r")
+        else:
+            # Files saved before offsets were written: one vectorised newline scan
+            newlines = np.flatnonzero(np.frombuffer(self._map, dtype=np.uint8) == ord("\n"))
+            self._offsets = np.concatenate([[0], newlines + 1]).astype(np.int64)
+
+    @property
+    def saved(self) -> int:
+        """Number of records backed by the mapped file."""
+        return len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self.saved + len(self._tail)
+
+    def _decode(self, label: int) -> ChunkRecord:
+        start, end = int(self._offsets[label]), int(self._offsets[label + 1])
+        return ChunkRecord(**json.loads(self._map[start:end]))
+
+    @overload
+    def __getitem__(self, label: int) -> ChunkRecord: ...
+
+    @overload
+    def __getitem__(self, label: slice) -> List[ChunkRecord]: ...
+
+    def __getitem__(self, label: Union[int, slice]) -> Union[ChunkRecord, List[ChunkRecord]]:
+        if isinstance(label, slice):
+            return [self[i] for i in range(*label.indices(len(self)))]
+        label = int(label)
+        if label < 0:
+            label += len(self)
+        if not 0 <= label < len(self):
+            raise IndexError(f"record label {label} out of range")
+        if label < self.saved:
+            return self._decode(label)
+        return self._tail[label - self.saved]
+
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        for label in range(len(self)):
+            yield self[label]
+
+    def append(self, record: ChunkRecord) -> None:
+        """Append a record after the saved ones."""
+        self._tail.append(record)
+
+    def save(self, path: Path) -> "RecordTable":
+        """
+        Write all records to ``path`` with their offsets.
+
+        Saved records are copied byte-for-byte from the mapped file, so only
+        records appended since the last save are encoded.
+
+        Returns:
+            A table mapped from the new file
+        """
+        offsets = [np.asarray(self._offsets, dtype=np.int64)]
+        with open(path, "wb") as f:
+            if self._map is not None:
+                f.write(self._map[: int(self._offsets[-1])])
+            position = int(self._offsets[-1])
+            tail_offsets = []
+            for record in self._tail:
+                line = (json.dumps(asdict(record)) + "\n").encode("utf-8")
+                f.write(line)
+                position += len(line)
+                tail_offsets.append(position)
+            f.flush()
+            os.fsync(f.fileno())
+
+        offsets.append(np.asarray(tail_offsets, dtype=np.int64))
+        np.save(path.with_name(path.name + self.OFFSETS_SUFFIX), np.concatenate(offsets))
+        return RecordTable(path)
@@ -0,0 +1,592 @@
+"""
+Segmented Vector Store
+Log-structured vector store: a brute-force memtable, immutable sealed segments,
+tombstone bitsets and background compaction.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector.records import ChunkRecord
+from app.services.vector.store import FaissVectorStore, SearchHit
+
+logger = logging.getLogger(__name__)
+
+# A label is the segment number in the high bits and the segment's own label below
+LABEL_BITS = 32
+LOCAL_MASK = (1 << LABEL_BITS) - 1
+
+
+class Segment:
+    """
+    A run of chunks stored in one :class:`FaissVectorStore`.
+
+    Chunks are never removed from a segment; deleting one sets its bit in
+    ``deleted`` and searches skip it until compaction rewrites the segment.
+    """
+
+    def __init__(self, number: int, store: FaissVectorStore, deleted: Optional[np.ndarray] = None):
+        self.number = number
+        self.store = store
+        self.deleted = deleted if deleted is not None else np.zeros(store.ntotal, dtype=bool)
+        self.dead = int(self.deleted.sum())
+        # Directory under ``segments/`` once written; sealed segments are written once
+        self.directory: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        """Stored chunks, live or deleted."""
+        return self.store.ntotal
+
+    @property
+    def live(self) -> int:
+        """Chunks not yet deleted."""
+        return self.size - self.dead
+
+    def label(self, local: int) -> int:
+        """Store-wide label of one of the segment's chunks."""
+        return (self.number << LABEL_BITS) | local
+
+    def grow(self, count: int) -> None:
+        """Extend the tombstones after chunks were appended."""
+        self.deleted = np.concatenate([self.deleted, np.zeros(count, dtype=bool)])
+
+    def delete(self, local: np.ndarray) -> int:
+        """Tombstone chunks by local label, returning how many were live."""
+        fresh = local[~self.deleted[local]]
+        self.deleted[fresh] = True
+        self.dead += len(fresh)
+        return len(fresh)
+
+
+class SegmentRecords(Sequence[ChunkRecord]):
+    """Live chunk records of a segmented store, in the order of :meth:`SegmentedVectorStore.labels`."""
+
+    def __init__(self, store: "SegmentedVectorStore"):
+        self._store = store
+
+    def __len__(self) -> int:
+        return self._store.ntotal
+
+    def __getitem__(self, position: Union[int, slice]) -> Union[ChunkRecord, List[ChunkRecord]]:  # type: ignore[override]
+        labels = self._store.labels()
+        if isinstance(position, slice):
+            return [self._store.record(label) for label in labels[position]]
+        return self._store.record(int(labels[position]))
+
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        for label in self._store.labels():
+            yield self._store.record(label)
+
+
+class SegmentedVectorStore:
+    """
+    Vector store that stays cheap to write and delete from as documents churn.
+
+    New chunks go to a small exact (flat) *memtable*. Once it holds
+    ``VECTOR_MEMTABLE_SIZE`` chunks, or when the store is saved, it is sealed:
+    it becomes an immutable segment and a fresh memtable takes its place.
+    Segments of ``TENANT_ANN_MIN_VECTORS`` chunks or more use the configured
+    ANN index; smaller ones stay exact.
+
+    ANN structures do not support cheap in-place deletes, so deleting a chunk
+    only sets its bit in its segment's tombstone bitset. Searches over-fetch
+    by each segment's tombstone count and drop deleted hits before merging
+    the per-segment results. :meth:`compact` merges small segments and
+    rewrites ones that are mostly tombstones, dropping dead chunks.
+
+    Labels put the segment number in the high bits, so a chunk keeps its
+    label until compaction moves it to a new segment.
+
+    Saves are versioned like :class:`FaissVectorStore`: sealed segments are
+    written once under ``segments/``, and each save publishes a manifest
+    naming the live segments and their tombstones in ``versions/<version>/``
+    by replacing the ``CURRENT`` pointer.
+    """
+
+    SEGMENTS_DIR = "segments"
+    MANIFEST_FILE = "segments.json"
+    TOMBSTONES_FILE = "tombstones.npz"
+    VERSIONS_DIR = FaissVectorStore.VERSIONS_DIR
+    CURRENT_FILE = FaissVectorStore.CURRENT_FILE
+
+    def __init__(self, dimension: int, path: Optional[str] = None):
+        self.dimension = dimension
+        self.path = path
+        self.version: Optional[str] = None
+        self._segments: Dict[int, Segment] = {}
+        self._next_number = 0
+        self._memtable = self._new_memtable()
+        self._lock = threading.RLock()
+        self._compacting = threading.Lock()
+        self._dirty = False
+
+    def _new_memtable(self) -> Segment:
+        segment = Segment(self._next_number, FaissVectorStore(self.dimension, "flat"))
+        self._next_number += 1
+        return segment
+
+    def _all(self) -> List[Segment]:
+        """Sealed segments in label order, then the memtable."""
+        return [self._segments[n] for n in sorted(self._segments)] + [self._memtable]
+
+    def _segment(self, label: int) -> Segment:
+        number = label >> LABEL_BITS
+        if number == self._memtable.number:
+            return self._memtable
+        segment = self._segments.get(number)
+        if segment is None:
+            raise KeyError(f"Label {label} belongs to a segment that was compacted away")
+        return segment
+
+    @property
+    def ntotal(self) -> int:
+        """Number of live (not deleted) vectors."""
+        with self._lock:
+            return sum(segment.live for segment in self._all())
+
+    @property
+    def nsegments(self) -> int:
+        """Number of sealed segments."""
+        return len(self._segments)
+
+    @property
+    def records(self) -> SegmentRecords:
+        """Live chunk records, positionally aligned with :meth:`labels`."""
+        return SegmentRecords(self)
+
+    def record(self, label: int) -> ChunkRecord:
+        """Chunk record stored under a label."""
+        with self._lock:
+            segment = self._segment(int(label))
+        return segment.store.records[int(label) & LOCAL_MASK]
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the store has changes that have not been saved."""
+        return self._dirty
+
+    @property
+    def index_type(self) -> str:
+        """Index type of the largest sealed segment ("flat" while every segment is exact)."""
+        with self._lock:
+            if not self._segments:
+                return "flat"
+            return max(self._segments.values(), key=lambda s: s.size).store.index_type
+
+    @property
+    def quantization(self) -> str:
+        """Quantization of the largest sealed segment ("none" while every segment is exact)."""
+        with self._lock:
+            if not self._segments:
+                return "none"
+            return max(self._segments.values(), key=lambda s: s.size).store.quantization
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Approximate memory footprint of the store in bytes, in total and per segment.
+
+        Totals have the keys of :meth:`FaissVectorStore.memory_usage`, with
+        ``vectors`` counting live chunks; ``segments`` lists each segment's
+        own figures along with its live and deleted chunk counts.
+        """
+        with self._lock:
+            segments = [segment for segment in self._all() if segment.size]
+        details = [
+            {
+                "segment": segment.number,
+                "index_type": segment.store.index_type,
+                "quantization": segment.store.quantization,
+                **segment.store.memory_usage(),
+                "vectors": segment.live,
+                "deleted": segment.dead,
+            }
+            for segment in segments
+        ]
+        index_bytes = sum(detail["index_bytes"] for detail in details)
+        stored = sum(segment.size for segment in segments)
+        return {
+            "vectors": sum(segment.live for segment in segments),
+            "index_bytes": index_bytes,
+            "full_precision_bytes": sum(detail["full_precision_bytes"] for detail in details),
+            "bytes_per_vector": index_bytes // stored if stored else 0,
+            "segments": details,
+        }
+
+    def labels(self) -> np.ndarray:
+        """Labels of every live chunk, in order."""
+        with self._lock:
+            parts = [
+                (segment.number << LABEL_BITS) | np.flatnonzero(~segment.deleted)
+                for segment in self._all()
+            ]
+        return np.concatenate(parts).astype(np.int64)
+
+    def add(self, records: Sequence[ChunkRecord], vectors: np.ndarray) -> None:
+        """
+        Add chunks and their embeddings to the memtable.
+
+        Args:
+            records: Chunk records, one per vector
+            vectors: Embedding matrix of shape (len(records), dimension)
+        """
+        with self._lock:
+            self._memtable.store.add(records, vectors)
+            self._memtable.grow(len(records))
+            self._dirty = self._dirty or bool(records)
+            if self._memtable.size >= settings.VECTOR_MEMTABLE_SIZE:
+                self._seal()
+
+    def _seal(self) -> None:
+        """Turn the memtable into an immutable segment and start a new one."""
+        memtable = self._memtable
+        if memtable.size == 0:
+            return
+        if memtable.live >= settings.TENANT_ANN_MIN_VECTORS:
+            memtable.store = memtable.store.rebuild(
+                settings.VECTOR_INDEX_TYPE, settings.VECTOR_QUANTIZATION
+            )
+        self._segments[memtable.number] = memtable
+        self._memtable = self._new_memtable()
+        logger.debug(f"Sealed segment {memtable.number} with {memtable.size} vectors")
+
+    def delete_document(self, document_id: str) -> int:
+        """
+        Tombstone every chunk of a document.
+
+        Args:
+            document_id: Document to delete
+
+        Returns:
+            Number of chunks deleted
+        """
+        with self._lock:
+            removed = 0
+            for segment in self._all():
+                removed += segment.delete(segment.store.select({"document_id": document_id}))
+            if removed:
+                self._dirty = True
+            return removed
+
+    def vectors(self, labels: np.ndarray) -> np.ndarray:
+        """
+        Stored full-precision (normalized) vectors for a set of labels.
+
+        Args:
+            labels: Store labels
+
+        Returns:
+            float32 matrix of shape (len(labels), dimension)
+
+        Raises:
+            KeyError: If a label's segment was compacted away since it was returned
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        out = np.empty((len(labels), self.dimension), dtype=np.float32)
+        with self._lock:
+            numbers = labels >> LABEL_BITS
+            for number in np.unique(numbers):
+                mask = numbers == number
+                segment = self._segment(int(number) << LABEL_BITS)
+                out[mask] = segment.store.vectors(labels[mask] & LOCAL_MASK)
+        return out
+
+    def search(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        similarity_threshold: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchHit]:
+        """
+        Find the live chunks nearest to a query vector.
+
+        Args:
+            vector: Query embedding
+            top_k: Maximum number of hits
+            similarity_threshold: Minimum cosine similarity for a hit
+            filters: Optional metadata filters
+
+        Returns:
+            Hits ordered by descending similarity
+        """
+        return self.search_batch(vector, top_k, similarity_threshold, filters)[0]
+
+    def search_batch(
+        self,
+        vectors: np.ndarray,
+        top_k: int,
+        similarity_threshold: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchHit]]:
+        """
+        Search every segment and merge the live hits.
+
+        Each segment is asked for ``top_k`` plus its tombstone count, so the
+        deleted hits it may return never push live ones out of the top ``k``.
+
+        Args:
+            vectors: Query embedding matrix, one row per query
+            top_k: Maximum number of hits per query
+            similarity_threshold: Minimum cosine similarity for a hit
+            filters: Optional metadata filters shared by every query
+
+        Returns:
+            Hits per query, each ordered by descending similarity
+        """
+        queries = np.array(vectors, dtype=np.float32, ndmin=2)
+        with self._lock:
+            segments = [segment for segment in self._all() if segment.live]
+
+        results: List[List[SearchHit]] = [[] for _ in range(len(queries))]
+        for segment in segments:
+            fetch = min(top_k + segment.dead, segment.size)
+            deleted = segment.deleted
+            batch = segment.store.search_batch(queries, fetch, similarity_threshold, filters)
+            for merged, hits in zip(results, batch, strict=True):
+                merged.extend(
+                    SearchHit(record=hit.record, score=hit.score, label=segment.label(hit.label))
+                    for hit in hits
+                    if not deleted[hit.label]
+                )
+        return [sorted(hits, key=lambda hit: hit.score, reverse=True)[:top_k] for hits in results]
+
+    def _pick(self, full: bool) -> List[Segment]:
+        """Segments the next compaction should merge."""
+        if full:
+            self._seal()
+            return list(self._segments.values())
+
+        chosen = {
+            segment.number: segment
+            for segment in self._segments.values()
+            if segment.size and segment.dead / segment.size >= settings.VECTOR_COMPACTION_DEAD_RATIO
+        }
+        excess = len(self._segments) - settings.VECTOR_MAX_SEGMENTS
+        if excess > 0:
+            # Size-tiered: fold the smallest segments together
+            for segment in sorted(self._segments.values(), key=lambda s: s.live)[: excess + 1]:
+                chosen[segment.number] = segment
+        return list(chosen.values())
+
+    def compact(self, full: bool = False) -> bool:
+        """
+        Merge segments and drop deleted chunks.
+
+        Merges segments whose tombstone ratio reached
+        ``VECTOR_COMPACTION_DEAD_RATIO``, plus the smallest segments while
+        there are more than ``VECTOR_MAX_SEGMENTS``. The merged segment is
+        built without holding the store lock, so writes and searches carry on;
+        chunks deleted meanwhile are tombstoned in it before it is swapped in.
+
+        Args:
+            full: Seal the memtable and merge everything into one segment
+
+        Returns:
+            Whether any segment was rewritten
+        """
+        if not self._compacting.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                chosen = self._pick(full)
+                if not chosen or (len(chosen) == 1 and not chosen[0].dead):
+                    return False
+                snapshots = [segment.deleted.copy() for segment in chosen]
+                number = self._next_number
+                self._next_number += 1
+
+            live = sum(int((~snapshot).sum()) for snapshot in snapshots)
+            large = live >= settings.TENANT_ANN_MIN_VECTORS
+            store = FaissVectorStore(
+                self.dimension,
+                settings.VECTOR_INDEX_TYPE if large else "flat",
+                quantization=settings.VECTOR_QUANTIZATION if large else "none",
+            )
+            for segment, snapshot in zip(chosen, snapshots, strict=True):
+                survivors = np.flatnonzero(~snapshot)
+                for start in range(0, len(survivors), 65536):
+                    labels = survivors[start : start + 65536]
+                    records = segment.store.records
+                    store.add([records[label] for label in labels], segment.store.vectors(labels))
+
+            merged = Segment(number, store)
+            with self._lock:
+                offset = 0
+                for segment, snapshot in zip(chosen, snapshots, strict=True):
+                    kept = ~snapshot
+                    # Deletes that landed while the merged segment was being built
+                    late = np.flatnonzero(segment.deleted[kept])
+                    merged.delete(offset + late)
+                    offset += int(kept.sum())
+                    del self._segments[segment.number]
+                if merged.size:
+                    self._segments[number] = merged
+                self._dirty = True
+
+            logger.info(
+                f"Compacted {len(chosen)} segments into {merged.store.index_type} segment {number} "
+                f"with {merged.live} vectors, dropping {sum(int(s.sum()) for s in snapshots)} deleted"
+            )
+            return True
+        finally:
+            self._compacting.release()
+
+    def save(self, path: Optional[str] = None) -> str:
+        """
+        Seal the memtable and publish a manifest of the store's segments.
+
+        Sealed segments are immutable, so only ones created since the last
+        save are written; tombstones are saved with every manifest.
+
+        Args:
+            path: Store root directory (defaults to the store's path)
+
+        Returns:
+            The published version
+        """
+        root = Path(path or self.path or settings.VECTOR_STORE_PATH)
+
+        with self._lock:
+            self._seal()
+            if self.path is not None and Path(self.path) != root:
+                for segment in self._segments.values():
+                    segment.directory = None
+
+            version = f"{time.time_ns():020d}-{os.getpid()}"
+            entries = []
+            for number in sorted(self._segments):
+                segment = self._segments[number]
+                if segment.directory is None:
+                    directory = f"{number:06d}-{version}"
+                    segment.store.save(str(root / self.SEGMENTS_DIR / directory))
+                    segment.directory = directory
+                entries.append({"number": number, "directory": segment.directory})
+
+            target = root / self.VERSIONS_DIR / version
+            target.mkdir(parents=True)
+            manifest = {
+                "dimension": self.dimension,
+                "next_number": self._next_number,
+                "segments": entries,
+            }
+            (target / self.MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+            np.savez(
+                target / self.TOMBSTONES_FILE,
+                **{str(n): np.packbits(self._segments[n].deleted) for n in self._segments},
+            )
+
+            pointer = root / f"{self.CURRENT_FILE}.tmp"
+            pointer.write_text(version, encoding="utf-8")
+            os.replace(pointer, root / self.CURRENT_FILE)
+
+            self.path = str(root)
+            self.version = version
+            self._dirty = False
+
+        self._prune(root)
+        logger.info(
+            f"Published vector store version {version} with {self.ntotal} vectors "
+            f"in {len(entries)} segments to {root}"
+        )
+        return version
+
+    def _prune(self, root: Path) -> None:
+        """
+        Delete old manifests, then old segments no remaining manifest refers to.
+
+        Segment directories are named after the version that wrote them. One
+        newer than the oldest kept manifest may belong to a save that has not
+        published its manifest yet, so it is kept even when unreferenced.
+        """
+        versions = sorted(p for p in (root / self.VERSIONS_DIR).iterdir() if p.is_dir())
+        for stale in versions[: -settings.VECTOR_STORE_KEEP_VERSIONS]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+        kept = versions[-settings.VECTOR_STORE_KEEP_VERSIONS :]
+        if not kept:
+            return
+        referenced = set()
+        for version in kept:
+            try:
+                manifest = json.loads((version / self.MANIFEST_FILE).read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                continue
+            referenced.update(entry["directory"] for entry in manifest["segments"])
+        segments = root / self.SEGMENTS_DIR
+        if segments.exists():
+            for directory in segments.iterdir():
+                written_by = directory.name.partition("-")[2]
+                if directory.name not in referenced and written_by < kept[0].name:
+                    shutil.rmtree(directory, ignore_errors=True)
+
+    @classmethod
+    def current_version(cls, path: str) -> Optional[str]:
+        """Published version at ``path``, or ``None`` if nothing is published there."""
+        return FaissVectorStore.current_version(path)
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Check whether a saved store, segmented or not, exists at ``path``."""
+        return FaissVectorStore.exists(path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "SegmentedVectorStore":
+        """
+        Load the published snapshot of a saved store.
+
+        A store saved by :class:`FaissVectorStore` loads as a single segment
+        and is rewritten in the segmented layout on the next save.
+
+        Args:
+            path: Store root directory written by :meth:`save`
+            mmap: Memory-map segment indexes instead of reading them into RAM
+
+        Returns:
+            Loaded vector store
+        """
+        root = Path(path)
+        version = cls.current_version(path)
+        directory = root / cls.VERSIONS_DIR / version if version else root
+        manifest_path = directory / cls.MANIFEST_FILE
+
+        if not manifest_path.exists():
+            legacy = FaissVectorStore.load(path, mmap=mmap)
+            store = cls(legacy.dimension, path)
+            # Keep the old store's labels by making it segment 0
+            store._segments[0] = Segment(0, legacy)
+            store._memtable = store._new_memtable()
+            store.version = version
+            return store
+
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        store = cls(manifest["dimension"], path)
+        with np.load(directory / cls.TOMBSTONES_FILE) as tombstones:
+            for entry in manifest["segments"]:
+                segment_store = FaissVectorStore.load(
+                    str(root / cls.SEGMENTS_DIR / entry["directory"]), mmap=mmap
+                )
+                deleted = np.unpackbits(
+                    tombstones[str(entry["number"])], count=segment_store.ntotal
+                ).astype(bool)
+                segment = Segment(entry["number"], segment_store, deleted)
+                segment.directory = entry["directory"]
+                store._segments[segment.number] = segment
+        store._next_number = manifest["next_number"]
+        store._memtable = store._new_memtable()
+        store.version = version
+
+        logger.info(
+            f"Loaded segmented vector store version {version} with {store.ntotal} vectors "
+            f"in {len(store._segments)} segments from {path}"
+        )
+        return store
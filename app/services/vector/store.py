@@ -0,0 +1,661 @@
+"""
+Local Vector Store
+In-process FAISS index for approximate nearest-neighbour search over chunk embeddings.
+"""
+
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector.metadata_index import Bitmap, MetadataIndex
+from app.services.vector.records import ChunkRecord, RecordTable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchHit:
+    """A chunk returned from a vector search with its cosine similarity."""
+
+    record: ChunkRecord
+    score: float
+    rerank_score: Optional[float] = None
+    # FAISS label of the chunk, for fetching its stored vector
+    label: Optional[int] = None
+
+
+# Product quantization uses 8-bit sub-codes, so training needs one point per centroid
+PQ_TRAINING_SIZE = 1 << 8
+
+# FAISS warns below this many training points per IVF list; fewer leave lists badly placed
+IVF_POINTS_PER_CENTROID = 39
+
+
+class FullPrecisionVectors:
+    """
+    Append-only float32 matrix backing the rerank step of quantized indexes.
+
+    Saved rows are memory-mapped from disk so they cost page cache rather than
+    heap; rows added since the last save live in an in-RAM tail.
+    """
+
+    def __init__(self, dimension: int, path: Optional[Path] = None):
+        self.dimension = dimension
+        self._base = self._map(path)
+        self._tail = np.empty((0, dimension), dtype=np.float32)
+        self._tail_size = 0
+
+    def _map(self, path: Optional[Path]) -> np.ndarray:
+        if path is None or not path.exists() or path.stat().st_size == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, self.dimension)
+
+    def __len__(self) -> int:
+        return len(self._base) + self._tail_size
+
+    def append(self, matrix: np.ndarray) -> None:
+        """Append rows, growing the in-RAM tail geometrically."""
+        needed = self._tail_size + len(matrix)
+        if needed > len(self._tail):
+            grown = np.empty((max(needed, 2 * len(self._tail)), self.dimension), dtype=np.float32)
+            grown[: self._tail_size] = self._tail[: self._tail_size]
+            self._tail = grown
+        self._tail[self._tail_size : needed] = matrix
+        self._tail_size = needed
+
+    def take(self, labels: np.ndarray) -> np.ndarray:
+        """Rows for ``labels``, gathered from the mapped file and the tail."""
+        base_size = len(self._base)
+        in_base = labels < base_size
+        out = np.empty((len(labels), self.dimension), dtype=np.float32)
+        out[in_base] = self._base[labels[in_base]]
+        out[~in_base] = self._tail[labels[~in_base] - base_size]
+        return out
+
+    def save(self, path: Path) -> None:
+        """Write every row to ``path`` atomically and remap it."""
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            for start in range(0, len(self._base), 65536):
+                f.write(np.ascontiguousarray(self._base[start : start + 65536]).tobytes())
+            f.write(self._tail[: self._tail_size].tobytes())
+        os.replace(tmp, path)
+        self._base = self._map(path)
+        self._tail = np.empty((0, self.dimension), dtype=np.float32)
+        self._tail_size = 0
+
+
+class FaissVectorStore:
+    """
+    FAISS-backed vector store.
+
+    Vectors are L2-normalised and indexed by inner product, so scores are cosine
+    similarities. FAISS labels are the record's position in ``_records``.
+
+    With ``sq8`` or ``pq`` quantization the index holds compressed codes only.
+    The ANN search over-fetches ``RERANK_FACTOR`` times as many candidates and
+    rescores them exactly against full-precision vectors kept in a
+    memory-mapped side file, so reported scores are still exact cosines.
+
+    Saves are versioned: each one writes a complete snapshot to
+    ``versions/<version>/`` and then atomically replaces the ``CURRENT``
+    pointer, so worker processes always load a consistent snapshot and pick
+    up new ones with :meth:`current_version` polling. Loaded snapshots are
+    mapped read-only and shared through the OS page cache.
+    """
+
+    INDEX_FILE = "index.faiss"
+    RECORDS_FILE = "chunks.jsonl"
+    VECTORS_FILE = "vectors.f32"
+    METADATA_FILE = "metadata.pkl"
+    VERSIONS_DIR = "versions"
+    CURRENT_FILE = "CURRENT"
+
+    def __init__(
+        self,
+        dimension: int,
+        index_type: str = "hnsw",
+        path: Optional[str] = None,
+        quantization: str = "none",
+    ):
+        if index_type not in ("flat", "hnsw", "ivf_flat"):
+            raise ValueError(f"Unsupported index type: {index_type}")
+        if quantization not in ("none", "sq8", "pq"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        if index_type == "flat" and quantization != "none":
+            raise ValueError("Exact flat indexes are not quantized")
+
+        self.dimension = dimension
+        self.index_type = index_type
+        self.quantization = quantization
+        self.path = path
+        self.version: Optional[str] = None
+        self._index: faiss.Index = self._create_index()
+        # Quantized indexes rerank against these; untrained ones hold every vector here
+        self._full: Optional[FullPrecisionVectors] = (
+            FullPrecisionVectors(dimension)
+            if quantization != "none" or not self._index.is_trained
+            else None
+        )
+        self._records = RecordTable()
+        self._metadata = MetadataIndex()
+        self._lock = threading.RLock()
+        self._read_only = False
+        self._dirty = False
+
+    def _create_index(self) -> faiss.Index:
+        """Create an empty index of the configured type and quantization."""
+        d, ip = self.dimension, faiss.METRIC_INNER_PRODUCT
+        if self.index_type == "flat":
+            index = faiss.IndexFlatIP(d)
+        elif self.index_type == "hnsw":
+            if self.quantization == "sq8":
+                index = faiss.IndexHNSWSQ(d, faiss.ScalarQuantizer.QT_8bit, settings.HNSW_M, ip)
+            elif self.quantization == "pq":
+                self._check_pq()
+                # Only L2 is available here; on unit vectors it ranks like inner product
+                index = faiss.IndexHNSWPQ(d, settings.PQ_M, settings.HNSW_M)
+            else:
+                index = faiss.IndexHNSWFlat(d, settings.HNSW_M, ip)
+            index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        else:
+            quantizer = faiss.IndexFlatIP(d)
+            nlist = settings.IVF_NLIST
+            if self.quantization == "sq8":
+                index = faiss.IndexIVFScalarQuantizer(
+                    quantizer, d, nlist, faiss.ScalarQuantizer.QT_8bit, ip
+                )
+            elif self.quantization == "pq":
+                self._check_pq()
+                index = faiss.IndexIVFPQ(quantizer, d, nlist, settings.PQ_M, 8, ip)
+            else:
+                index = faiss.IndexIVFFlat(quantizer, d, nlist, ip)
+        self._apply_search_params(index)
+        return index
+
+    def _check_pq(self) -> None:
+        if self.dimension % settings.PQ_M != 0:
+            raise ValueError(f"PQ_M={settings.PQ_M} must divide the dimension {self.dimension}")
+
+    def _apply_search_params(self, index: faiss.Index) -> None:
+        """Apply query-time parameters to an index."""
+        if self.index_type == "hnsw":
+            faiss.downcast_index(index).hnsw.efSearch = settings.HNSW_EF_SEARCH
+        elif self.index_type == "ivf_flat":
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = settings.IVF_NPROBE
+            if ivf.is_trained:
+                # Needed to reconstruct vectors for brute-force filtered search
+                ivf.make_direct_map()
+
+    @property
+    def ntotal(self) -> int:
+        """Number of indexed vectors."""
+        return len(self._records)
+
+    @property
+    def records(self) -> Sequence[ChunkRecord]:
+        """Stored chunk records, indexed by FAISS label."""
+        return self._records
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the store has changes that have not been saved."""
+        return self._dirty
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Return a normalised, contiguous float32 copy of ``vectors``."""
+        matrix = np.array(vectors, dtype=np.float32, copy=True, ndmin=2)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dimension}, got {matrix.shape[1]}"
+            )
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    def _training_size(self) -> int:
+        """Vectors needed before the index can be trained."""
+        size = 1
+        if self.index_type == "ivf_flat":
+            size = IVF_POINTS_PER_CENTROID * faiss.extract_index_ivf(self._index).nlist
+        if self.quantization == "pq":
+            size = max(size, PQ_TRAINING_SIZE)
+        return size
+
+    def _train(self, vectors: np.ndarray) -> None:
+        """Train the index on every vector held back so far."""
+        self._index.train(vectors)
+        self._apply_search_params(self._index)
+        logger.info(
+            f"Trained {self.index_type}/{self.quantization} index on {len(vectors)} vectors"
+        )
+
+    def _make_writable(self) -> None:
+        """Read a memory-mapped index into RAM before mutating it."""
+        if not self._read_only:
+            return
+        # Inverted lists on mmap cannot be cloned, so re-read the file instead
+        self._index = faiss.read_index(str(self._snapshot_dir() / self.INDEX_FILE))
+        self._apply_search_params(self._index)
+        self._read_only = False
+
+    def _index_metadata(self, label: int, record: ChunkRecord) -> None:
+        self._metadata.add(label, {**record.metadata, "document_id": record.document_id})
+
+    def add(self, records: Sequence[ChunkRecord], vectors: np.ndarray) -> None:
+        """
+        Add chunks and their embeddings to the index.
+
+        Args:
+            records: Chunk records, one per vector
+            vectors: Embedding matrix of shape (len(records), dimension)
+        """
+        matrix = self._prepare(vectors)
+        if len(records) != len(matrix):
+            raise ValueError("records and vectors must have the same length")
+        if not records:
+            return
+
+        with self._lock:
+            self._make_writable()
+            for record in records:
+                self._index_metadata(len(self._records), record)
+                self._records.append(record)
+            if self._full is not None:
+                self._full.append(matrix)
+
+            if self._index.is_trained:
+                self._index.add(matrix)
+            elif self.ntotal >= self._training_size():
+                # Train on everything held back so far; until then search is exact
+                pending = self.vectors(np.arange(self.ntotal))
+                self._train(pending)
+                self._index.add(pending)
+                if self.quantization == "none":
+                    # The index now stores every vector exactly
+                    self._full = None
+            self._dirty = True
+
+    def labels(self) -> np.ndarray:
+        """Labels of every stored chunk, in order."""
+        return np.arange(self.ntotal, dtype=np.int64)
+
+    def select(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Labels of the chunks matching metadata filters.
+
+        Args:
+            filters: Metadata filters, as accepted by :meth:`search`
+
+        Returns:
+            Sorted labels
+        """
+        with self._lock:
+            return self._metadata.select(filters).to_array()
+
+    def vectors(self, labels: np.ndarray) -> np.ndarray:
+        """
+        Stored full-precision (normalized) vectors for a set of labels.
+
+        Args:
+            labels: Record positions
+
+        Returns:
+            float32 matrix of shape (len(labels), dimension)
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        if len(labels) == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        with self._lock:
+            if self._full is not None:
+                return self._full.take(labels)
+            return self._index.reconstruct_batch(labels)
+
+    def search(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        similarity_threshold: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchHit]:
+        """
+        Find the chunks nearest to a query vector.
+
+        Args:
+            vector: Query embedding
+            top_k: Maximum number of hits
+            similarity_threshold: Minimum cosine similarity for a hit
+            filters: Optional metadata filters applied before the ANN search
+
+        Returns:
+            Hits ordered by descending similarity
+        """
+        return self.search_batch(vector, top_k, similarity_threshold, filters)[0]
+
+    def search_batch(
+        self,
+        vectors: np.ndarray,
+        top_k: int,
+        similarity_threshold: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchHit]]:
+        """
+        Search for many query vectors with a single FAISS call.
+
+        With filters, the matching labels are resolved to a bitmap first. Small
+        bitmaps are scored exactly by brute force over just those vectors; larger
+        ones are passed to FAISS as an ID selector so the ANN search only visits
+        matching chunks and still fills ``top_k``.
+
+        Args:
+            vectors: Query embedding matrix, one row per query
+            top_k: Maximum number of hits per query
+            similarity_threshold: Minimum cosine similarity for a hit
+            filters: Optional metadata filters shared by every query
+
+        Returns:
+            Hits per query, each ordered by descending similarity
+        """
+        queries = self._prepare(vectors)
+        if self.ntotal == 0:
+            return [[] for _ in range(len(queries))]
+
+        with self._lock:
+            # Quantized codes only shortlist candidates; fetch extra for the exact rerank
+            fetch = top_k if self._full is None else top_k * settings.RERANK_FACTOR
+            if self._index.ntotal < self.ntotal:
+                # Not trained yet: every vector is still only held at full precision
+                labels = np.arange(self.ntotal, dtype=np.int64)
+                if filters:
+                    labels = self._metadata.select(filters).to_array()
+                scores, labels = self._brute_force(queries, labels, top_k)
+            elif filters:
+                bitmap = self._metadata.select(filters)
+                if len(bitmap) <= settings.FILTER_BRUTE_FORCE_MAX:
+                    scores, labels = self._brute_force(queries, bitmap.to_array(), top_k)
+                else:
+                    scores, labels = self._filtered_search(queries, bitmap, fetch)
+                    scores, labels = self._rerank(queries, scores, labels, top_k)
+            else:
+                scores, labels = self._index.search(queries, min(fetch, self.ntotal))
+                scores, labels = self._rerank(queries, scores, labels, top_k)
+            records = self._records
+
+        results = []
+        for row_scores, row_labels in zip(scores, labels, strict=True):
+            keep = (row_labels >= 0) & (row_scores >= similarity_threshold)
+            results.append(
+                [
+                    SearchHit(record=records[label], score=float(score), label=int(label))
+                    for score, label in zip(row_scores[keep], row_labels[keep], strict=True)
+                ]
+            )
+        return results
+
+    def _brute_force(
+        self, queries: np.ndarray, labels: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact inner-product search restricted to ``labels``."""
+        if len(labels) == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        candidates = self.vectors(labels)
+        scores = queries @ candidates.T
+        k = min(top_k, len(labels))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return (
+            np.take_along_axis(top_scores, order, axis=1),
+            labels[np.take_along_axis(top, order, axis=1)],
+        )
+
+    def _rerank(
+        self, queries: np.ndarray, scores: np.ndarray, labels: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rescore ANN candidates against full-precision vectors and keep the best ``top_k``."""
+        if self._full is None:
+            return scores, labels
+
+        valid = labels >= 0
+        safe = np.where(valid, labels, 0)
+        candidates = self._full.take(safe.ravel()).reshape(*labels.shape, self.dimension)
+        scores = np.einsum("qkd,qd->qk", candidates, queries)
+        scores[~valid] = -np.inf
+
+        k = min(top_k, labels.shape[1])
+        order = np.argsort(-scores, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, order, axis=1)
+        top_labels = np.where(
+            np.isfinite(top_scores), np.take_along_axis(labels, order, axis=1), -1
+        )
+        return top_scores, top_labels
+
+    def _filtered_search(
+        self, queries: np.ndarray, bitmap: Bitmap, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ANN search that only visits labels in ``bitmap``."""
+        dense = bitmap.to_dense(self.ntotal)
+        selector = faiss.IDSelectorBitmap(self.ntotal, faiss.swig_ptr(dense))
+
+        # A selective filter hides most neighbours, so widen the search to compensate
+        selectivity = len(bitmap) / self.ntotal
+        if self.index_type == "flat":
+            params = faiss.SearchParameters(sel=selector)
+        elif self.index_type == "hnsw":
+            ef = min(settings.HNSW_EF_SEARCH_MAX, max(settings.HNSW_EF_SEARCH, top_k / selectivity))
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=int(ef))
+        else:
+            nlist = faiss.extract_index_ivf(self._index).nlist
+            nprobe = min(nlist, max(settings.IVF_NPROBE, settings.IVF_NPROBE / selectivity))
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=int(nprobe))
+
+        # ``dense`` must outlive the search: the selector only holds a raw pointer to it
+        return self._index.search(queries, min(top_k, len(bitmap)), params=params)
+
+    def _snapshot_dir(self) -> Path:
+        """Directory holding the files this store was loaded from or last saved to."""
+        root = Path(self.path or settings.VECTOR_STORE_PATH)
+        return root / self.VERSIONS_DIR / self.version if self.version else root
+
+    def save(self, path: Optional[str] = None) -> str:
+        """
+        Persist the store as a new snapshot and publish it.
+
+        The snapshot is written to a fresh version directory and only becomes
+        visible when the ``CURRENT`` pointer is atomically replaced, so a crash
+        mid-save never exposes a partial snapshot. Older snapshots beyond
+        ``VECTOR_STORE_KEEP_VERSIONS`` are pruned; processes still mapping them
+        keep their mappings.
+
+        Args:
+            path: Store root directory (defaults to the store's path)
+
+        Returns:
+            The published version
+        """
+        root = Path(path or self.path or settings.VECTOR_STORE_PATH)
+
+        with self._lock:
+            version = f"{time.time_ns():020d}-{os.getpid()}"
+            target = root / self.VERSIONS_DIR / version
+            target.mkdir(parents=True)
+
+            faiss.write_index(self._index, str(target / self.INDEX_FILE))
+            self._records = self._records.save(target / self.RECORDS_FILE)
+            with open(target / self.METADATA_FILE, "wb") as f:
+                pickle.dump(self._metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if self._full is not None:
+                self._full.save(target / self.VECTORS_FILE)
+
+            pointer = root / f"{self.CURRENT_FILE}.tmp"
+            pointer.write_text(version, encoding="utf-8")
+            os.replace(pointer, root / self.CURRENT_FILE)
+
+            self.path = str(root)
+            self.version = version
+            self._dirty = False
+
+        self._prune(root)
+        logger.info(
+            f"Published vector store version {version} with {self.ntotal} vectors to {root}"
+        )
+        return version
+
+    def _prune(self, root: Path) -> None:
+        """Delete snapshots older than the newest ``VECTOR_STORE_KEEP_VERSIONS``."""
+        versions = sorted(p for p in (root / self.VERSIONS_DIR).iterdir() if p.is_dir())
+        for stale in versions[: -settings.VECTOR_STORE_KEEP_VERSIONS]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    @classmethod
+    def current_version(cls, path: str) -> Optional[str]:
+        """Published version at ``path``, or ``None`` if nothing is published there."""
+        try:
+            return (Path(path) / cls.CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Check whether a saved store exists at ``path``."""
+        root = Path(path)
+        return cls.current_version(path) is not None or (root / cls.INDEX_FILE).exists()
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "FaissVectorStore":
+        """
+        Load the published snapshot of a saved store.
+
+        Args:
+            path: Store root directory written by :meth:`save`
+            mmap: Memory-map the index file instead of reading it into RAM
+
+        Returns:
+            Loaded vector store
+        """
+        root = Path(path)
+        version = cls.current_version(path)
+        # Stores saved before versioning keep their files directly in the root
+        directory = root / cls.VERSIONS_DIR / version if version else root
+
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(str(directory / cls.INDEX_FILE), flags)
+
+        index_type = _detect_index_type(index)
+        quantization = _detect_quantization(index)
+        store = cls(dimension=index.d, index_type=index_type, path=str(root))
+        store.version = version
+        store.quantization = quantization
+        store._index = index
+        if quantization != "none" or not index.is_trained:
+            store._full = FullPrecisionVectors(index.d, directory / cls.VECTORS_FILE)
+        else:
+            store._full = None
+        store._apply_search_params(index)
+        store._read_only = bool(mmap)
+
+        store._records = RecordTable(directory / cls.RECORDS_FILE)
+        metadata_path = directory / cls.METADATA_FILE
+        if metadata_path.exists():
+            with open(metadata_path, "rb") as f:
+                store._metadata = pickle.load(f)
+        else:
+            for label, record in enumerate(store._records):
+                store._index_metadata(label, record)
+
+        stored = len(store._full) if store._full is not None else index.ntotal
+        # An index still waiting for enough vectors to train holds none of them yet
+        if len(store._records) != stored or index.ntotal not in (0, len(store._records)):
+            raise ValueError(
+                f"Corrupt vector store at {directory}: {index.ntotal} vectors, "
+                f"{stored} stored, {len(store._records)} records"
+            )
+
+        logger.info(
+            f"Loaded {index_type}/{quantization} vector store version {version} with "
+            f"{len(store._records)} vectors from {path}"
+        )
+        return store
+
+    def rebuild(
+        self, index_type: str, quantization: str = "none", batch_size: int = 65536
+    ) -> "FaissVectorStore":
+        """
+        Copy every record and vector into a new store with a different index layout.
+
+        Args:
+            index_type: Index type of the new store
+            quantization: Quantization of the new store
+            batch_size: Vectors copied per batch
+
+        Returns:
+            Unsaved store holding the same chunks under the same labels
+        """
+        store = FaissVectorStore(self.dimension, index_type, self.path, quantization)
+        with self._lock:
+            for start in range(0, self.ntotal, batch_size):
+                labels = np.arange(start, min(start + batch_size, self.ntotal))
+                store.add(self._records[start : start + batch_size], self.vectors(labels))
+        return store
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate memory footprint of the store in bytes.
+
+        ``index`` covers the compressed codes plus graph links or inverted-list
+        ids, i.e. what must stay resident for ANN search. ``full_precision`` is
+        the rerank side file, which is memory-mapped and only paged in for the
+        candidates actually rescored.
+        """
+        with self._lock:
+            index = self._index
+            n = index.ntotal
+            if self.index_type == "flat":
+                index_bytes = n * self.dimension * 4
+            elif self.index_type == "hnsw":
+                hnsw = faiss.downcast_index(index)
+                storage = faiss.downcast_index(hnsw.storage)
+                index_bytes = n * storage.code_size + hnsw.hnsw.neighbors.size() * 4
+            else:
+                ivf = faiss.extract_index_ivf(index)
+                centroids = ivf.nlist * self.dimension * 4
+                index_bytes = n * (ivf.code_size + 8) + centroids
+            full = len(self._full) * self.dimension * 4 if self._full is not None else 0
+        return {
+            "vectors": self.ntotal,
+            "index_bytes": int(index_bytes),
+            "full_precision_bytes": int(full),
+            "bytes_per_vector": int(index_bytes // n) if n else 0,
+        }
+
+
+def _detect_index_type(index: faiss.Index) -> str:
+    """Infer the index type of a loaded index."""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivf_flat"
+    return "hnsw" if isinstance(index, faiss.IndexHNSW) else "flat"
+
+
+def _detect_quantization(index: faiss.Index) -> str:
+    """Infer the quantization mode of a loaded index from its code storage."""
+    if isinstance(index, faiss.IndexFlat):
+        return "none"
+    ivf = faiss.try_extract_index_ivf(index)
+    codes = faiss.downcast_index(index) if ivf is not None else faiss.downcast_index(index.storage)
+    if isinstance(codes, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq8"
+    if isinstance(codes, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    return "none"
@@ -0,0 +1,95 @@
+"""
+Caching Utilities
+Redis client lifecycle and an in-process TTL-aware LRU cache.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+_redis: Optional[redis.Redis] = None
+
+
+async def init_redis() -> Optional[redis.Redis]:
+    """
+    Connect to Redis.
+
+    Redis is an optional shared tier for caches, so a failed connection is
+    logged and the service continues with in-process caching only.
+    """
+    global _redis
+    client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+    try:
+        await client.ping()
+    except (redis.RedisError, OSError) as e:
+        logger.warning(f"Redis unavailable at {settings.REDIS_HOST}:{settings.REDIS_PORT}: {e}")
+        await client.aclose()
+        _redis = None
+        return None
+
+    logger.info(f"Connected to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
+    _redis = client
+    return client
+
+
+async def close_redis() -> None:
+    """Close the Redis connection pool."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+    _redis = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Get the shared Redis client, or ``None`` when Redis is unavailable."""
+    return _redis
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded in-process LRU cache with per-entry expiry.
+
+    Not thread-safe; intended for use from the event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return a live entry and mark it most recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """Insert or replace an entry, evicting the least recently used if full."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
@@ -0,0 +1,67 @@
+"""
+Delta Log Utilities
+Append-only change logs layered over an index snapshot file.
+"""
+
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def start_log(path: Path, epoch: int) -> None:
+    """
+    Replace the log at ``path`` with an empty one for a new snapshot.
+
+    Args:
+        path: Log file
+        epoch: Identifier stored in the snapshot the log extends
+    """
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(epoch, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def append_log(path: Path, entries: Sequence[Any]) -> None:
+    """
+    Append change entries to a log created by :func:`start_log`.
+
+    Args:
+        path: Log file
+        entries: Picklable change entries, in the order they were applied
+    """
+    with open(path, "ab") as f:
+        for entry in entries:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_log(path: Path, epoch: Optional[int]) -> Optional[List[Any]]:
+    """
+    Read the entries logged on top of a snapshot.
+
+    Args:
+        path: Log file
+        epoch: Identifier stored in the snapshot
+
+    Returns:
+        Entries in append order, or ``None`` if the log is missing, belongs to
+        another snapshot, or ends in an interrupted append; the snapshot then
+        has to be rewritten before anything is appended again
+    """
+    if epoch is None or not path.exists():
+        return None
+    entries = []
+    with open(path, "rb") as f:
+        try:
+            if pickle.load(f) != epoch:
+                return None
+            while f.peek(1):
+                entries.append(pickle.load(f))
+        except (EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f"Ignoring damaged delta log {path}: {e}")
+            return None
+    return entries
@@ -0,0 +1,22 @@
+"""
+Tenancy Utilities
+Naming of per-tenant directories and storage prefixes.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+TENANTS_DIR = "tenants"
+
+
+def partition_dirname(tenant_id: str) -> str:
+    """Filesystem-safe, collision-free directory name for a tenant."""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", tenant_id)[:48]
+    digest = hashlib.sha256(tenant_id.encode("utf-8")).hexdigest()[:12]
+    return f"{slug}-{digest}"
+
+
+def partition_path(root: str, tenant_id: str) -> Path:
+    """Directory holding a tenant's partition under a vector store root."""
+    return Path(root) / TENANTS_DIR / partition_dirname(tenant_id)
@@ -1,96 +1,466 @@
 """
 AWS Glue Job - Document Ingestion
 Processes large batches of documents and generates embeddings.
+
+The job is deployed with the service package in ``--extra-py-files`` so
+documents are parsed and chunked exactly as the API ingests them.
 """
 
+import json
+import os
 import sys
-from awsglue.transforms import *
-from awsglue.utils import getResolvedOptions
-from pyspark.context import SparkContext
-from awsglue.context import GlueContext
-from awsglue.job import Job
+import uuid
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
 import boto3
-import json
-from typing import List, Dict, Any
+from botocore.exceptions import ClientError
+
+from app.services.document.chunker import Chunker
+from app.services.document.parser import DOCX, HTML, MARKDOWN, PDF, PPTX, TEXT, PageOffsets, iter_document
+from app.services.document.range_file import S3RangeFile
+
+DOCUMENT_TYPES = {
+    '.pdf': PDF,
+    '.txt': TEXT,
+    '.docx': DOCX,
+    '.pptx': PPTX,
+    '.html': HTML,
+    '.htm': HTML,
+    '.md': MARKDOWN,
+}
+
+# Manifest rows: (key, etag, size, last_modified in epoch milliseconds)
+ObjectEntry = Tuple[str, str, int, int]
+MANIFEST_COLUMNS = ['key', 'etag', 'size', 'last_modified']
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+DELETED = 'deleted'
+
+# Embedding models loaded by this Python worker, reused by every partition it runs
+_embedders: Dict[str, Any] = {}
+
+
+@dataclass
+class JobOptions:
+    """Settings shipped to every executor."""
+
+    bucket: str
+    prefix: str = 'documents/'
+    embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2'
+    embedding_batch_size: int = 256
+    upsert_batch_size: int = 100
+    pinecone_api_key: Optional[str] = None
+    pinecone_index: str = 'llm-retrieval'
+    manifest_key: str = 'manifests/document-ingestion/LATEST.json'
+
+
+def make_s3_client() -> Any:
+    """Create an S3 client (one per partition, never shipped from the driver)."""
+    return boto3.client('s3')
+
+
+def get_embedder(model_name: str) -> Any:
+    """Load an embedding model once per Python worker."""
+    if model_name not in _embedders:
+        from sentence_transformers import SentenceTransformer
+
+        _embedders[model_name] = SentenceTransformer(model_name)
+    return _embedders[model_name]
+
+
+class PineconeSink:
+    """Buffers vectors per namespace and upserts them in fixed-size batches."""
+
+    def __init__(self, index: Any, batch_size: int):
+        self.index = index
+        self.batch_size = batch_size
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def from_options(cls, options: JobOptions) -> 'PineconeSink':
+        from pinecone import Pinecone
+
+        index = Pinecone(api_key=options.pinecone_api_key).Index(options.pinecone_index)
+        return cls(index, options.upsert_batch_size)
 
-# Initialize Glue context
-args = getResolvedOptions(sys.argv, ['JOB_NAME', 'S3_BUCKET', 'PINECONE_API_KEY'])
-sc = SparkContext()
-glueContext = GlueContext(sc)
-spark = glueContext.spark_session
-job = Job(glueContext)
-job.init(args['JOB_NAME'], args)
+    def add(self, namespace: str, vectors: Iterable[Dict[str, Any]]) -> None:
+        buffer = self._buffers.setdefault(namespace, [])
+        buffer.extend(vectors)
+        while len(buffer) >= self.batch_size:
+            self.index.upsert(vectors=buffer[:self.batch_size], namespace=namespace)
+            del buffer[:self.batch_size]
 
-# AWS clients
-s3_client = boto3.client('s3')
+    def flush(self) -> None:
+        for namespace, buffer in self._buffers.items():
+            if buffer:
+                self.index.upsert(vectors=buffer, namespace=namespace)
+        self._buffers.clear()
 
 
-def process_document(document_path: str) -> Dict[str, Any]:
+def is_document_key(key: str) -> bool:
+    """Whether a key holds a document (API uploads have no extension)."""
+    if key.endswith('/'):
+        return False
+    extension = os.path.splitext(key.rsplit('/', 1)[-1])[1].lower()
+    return extension == '' or extension in DOCUMENT_TYPES
+
+
+def object_entry(obj: Dict[str, Any]) -> ObjectEntry:
+    """Manifest row for a ``list_objects_v2`` entry."""
+    return (obj['Key'], obj['ETag'].strip('"'), obj['Size'], int(obj['LastModified'].timestamp() * 1000))
+
+
+def list_prefixes(s3_client: Any, bucket: str, prefix: str) -> Tuple[List[str], List[ObjectEntry]]:
     """
-    Process a single document.
+    List the tenant prefixes under ``prefix`` and any documents directly in it.
 
     Args:
-        document_path: S3 path to document
+        s3_client: S3 client
+        bucket: Source bucket
+        prefix: Root prefix of the documents
 
     Returns:
-        Processed document metadata
+        Child prefixes and top-level documents
     """
-    # TODO: Download document from S3
-    # TODO: Extract text
-    # TODO: Chunk text
-    # TODO: Generate embeddings
-    # TODO: Store in Pinecone
-
-    return {
-        'document_path': document_path,
-        'status': 'processed',
-        'chunks_count': 0
-    }
+    prefixes, entries = [], []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+        prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        entries.extend(object_entry(obj) for obj in page.get('Contents', []) if is_document_key(obj['Key']))
+    return prefixes, entries
 
 
-def main():
-    """Main Glue job execution."""
+def list_objects(s3_client: Any, bucket: str, prefix: str) -> Iterator[ObjectEntry]:
+    """
+    Yield every document under a prefix, following continuation tokens.
+
+    Args:
+        s3_client: S3 client
+        bucket: Source bucket
+        prefix: Prefix to list
+
+    Yields:
+        Key, ETag, size and last-modified time of each document
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if is_document_key(obj['Key']):
+                yield object_entry(obj)
+
+
+def list_partition_objects(
+    prefixes: Iterable[str],
+    bucket: str,
+    s3_factory: Callable[[], Any] = make_s3_client,
+) -> Iterator[ObjectEntry]:
+    """List the documents of a partition of prefixes with one S3 client."""
+    s3_client = s3_factory()
+    for prefix in prefixes:
+        yield from list_objects(s3_client, bucket, prefix)
 
-    # Read documents from S3
-    bucket = args['S3_BUCKET']
-    prefix = 'documents/'
 
-    print(f"Processing documents from s3://{bucket}/{prefix}")
+def document_location(key: str, prefix: str) -> Tuple[str, str]:
+    """Vector namespace (tenant directory) and document ID of a key."""
+    parts = key[len(prefix):].split('/')
+    namespace = parts[0] if len(parts) > 1 else 'default'
+    return namespace, os.path.splitext(parts[-1])[0]
 
-    # List objects in S3
-    response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)
 
-    documents = []
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            key = obj['Key']
-            if key.endswith(('.pdf', '.txt', '.docx')):
-                documents.append(f"s3://{bucket}/{key}")
+def cleanup_entry(key: str, prefix: str, **fields: Any) -> str:
+    """JSON line telling vector store cleanup which document a key held."""
+    namespace, document_id = document_location(key, prefix)
+    return json.dumps({'key': key, 'namespace': namespace, 'document_id': document_id, **fields})
+
+
+def classify(current: Optional[ObjectEntry], previous: Optional[ObjectEntry]) -> str:
+    """
+    Compare a listed document with its manifest row.
+
+    Args:
+        current: Row from this run's listing, if the object still exists
+        previous: Row from the last manifest, if it was processed before
+
+    Returns:
+        One of ``NEW``, ``CHANGED``, ``UNCHANGED`` or ``DELETED``
+    """
+    if current is None:
+        return DELETED
+    if previous is None:
+        return NEW
+    if current[1] != previous[1] or current[2] != previous[2]:
+        return CHANGED
+    return UNCHANGED
 
-    print(f"Found {len(documents)} documents to process")
 
-    # Process documents in parallel using Spark
-    if documents:
-        # Create RDD from documents list
-        documents_rdd = sc.parallelize(documents)
+def read_manifest_path(s3_client: Any, options: JobOptions) -> Optional[str]:
+    """Location of the last committed manifest, or ``None`` before the first run."""
+    try:
+        response = s3_client.get_object(Bucket=options.bucket, Key=options.manifest_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    return json.loads(response['Body'].read())['path']
 
-        # Process each document
-        results = documents_rdd.map(process_document).collect()
 
-        print(f"Processed {len(results)} documents")
+def commit_manifest_path(s3_client: Any, options: JobOptions, path: str) -> None:
+    """Point the next run at a fully written manifest."""
+    s3_client.put_object(
+        Bucket=options.bucket,
+        Key=options.manifest_key,
+        Body=json.dumps({'path': path}).encode('utf-8'),
+        ContentType='application/json',
+    )
 
-        # Write results to S3
-        results_json = json.dumps(results, indent=2)
-        s3_client.put_object(
-            Bucket=bucket,
-            Key='processing-results/latest.json',
-            Body=results_json.encode('utf-8')
-        )
+
+def document_type(key: str, declared: Optional[str]) -> str:
+    """Content type from the key's extension, else the object's metadata."""
+    extension = os.path.splitext(key)[1].lower()
+    return DOCUMENT_TYPES.get(extension) or declared or TEXT
+
+
+def process_partition(
+    keys: Iterable[str],
+    options: JobOptions,
+    s3_factory: Callable[[], Any] = make_s3_client,
+    embedder_factory: Callable[[str], Any] = get_embedder,
+    sink_factory: Callable[[JobOptions], Any] = PineconeSink.from_options,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Ingest a partition of documents.
+
+    The S3 client and vector sink are created once per partition and the
+    embedding model once per worker. Chunks from consecutive documents share
+    embedding batches and upsert batches. Per-document results are yielded
+    once their vectors have been handed to the sink, so nothing accumulates.
+    Documents are read through ranged GETs and parsed page by page straight
+    into the chunker, so no object is ever fully in memory or on disk.
+    Documents that cannot be read or parsed are reported as failed; embedding
+    or upsert errors fail the task so Spark retries it (upserts are
+    idempotent by chunk ID).
+
+    Args:
+        keys: Document keys in this partition
+        options: Job settings
+        s3_factory: Creates the S3 client
+        embedder_factory: Loads the embedding model by name
+        sink_factory: Creates the vector sink
+
+    Yields:
+        Processing result per document
+    """
+    s3_client = s3_factory()
+    embedder = embedder_factory(options.embedding_model)
+    sink = sink_factory(options)
+    chunker = Chunker()
+
+    pending_chunks: List[Tuple[str, Dict[str, Any]]] = []
+    pending_results: List[Dict[str, Any]] = []
+
+    def flush() -> Iterator[Dict[str, Any]]:
+        if pending_chunks:
+            vectors = embedder.encode(
+                [item['metadata']['content'] for _, item in pending_chunks],
+                batch_size=options.embedding_batch_size,
+                normalize_embeddings=True,
+            )
+            for (namespace, item), vector in zip(pending_chunks, vectors, strict=True):
+                sink.add(namespace, [{**item, 'values': [float(v) for v in vector]}])
+            pending_chunks.clear()
+        yield from pending_results
+        pending_results.clear()
+
+    for key in keys:
+        namespace, document_id = document_location(key, options.prefix)
+        source = f"s3://{options.bucket}/{key}"
+        try:
+            document = S3RangeFile(s3_client, options.bucket, key)
+            offsets = PageOffsets()
+            pages = offsets.wrap(iter_document(document, document_type(key, document.content_type)))
+            chunks = [
+                (namespace, {
+                    'id': f"{document_id}:{chunk.index}",
+                    'metadata': {
+                        'document_id': document_id,
+                        'chunk_index': chunk.index,
+                        'source': source,
+                        'content': chunk.text,
+                        **offsets.pages(chunk.start, chunk.text),
+                    },
+                })
+                for chunk in chunker.chunks(pages)
+            ]
+        except Exception as e:
+            print(f"Failed to process {source}: {e}")
+            pending_results.append({
+                'key': key,
+                'document_path': source,
+                'status': 'failed',
+                'error': str(e),
+            })
+            continue
+
+        pending_chunks.extend(chunks)
+        pending_results.append({
+            'key': key,
+            'document_path': source,
+            'status': 'processed',
+            'chunks_count': len(chunks),
+        })
+        if len(pending_chunks) >= options.embedding_batch_size:
+            yield from flush()
+
+    yield from flush()
+    sink.flush()
+
+
+def run(
+    sc: Any,
+    options: JobOptions,
+    results_path: str,
+    manifest_root: str,
+    num_partitions: Optional[int] = None,
+    s3_factory: Callable[[], Any] = make_s3_client,
+    embedder_factory: Callable[[str], Any] = get_embedder,
+    sink_factory: Callable[[JobOptions], Any] = PineconeSink.from_options,
+) -> Dict[str, int]:
+    """
+    Ingest the documents under the job's prefix that changed since the last run.
+
+    The driver only lists the top-level tenant prefixes; executors list
+    each prefix's objects. The listing is joined with the last run's Parquet
+    manifest of keys, ETags, sizes and modification times, and only new or
+    changed documents are processed. Keys missing from the listing are
+    written to ``results_path/deleted`` for vector store cleanup, and changed
+    documents processed successfully to ``results_path/changed`` with their
+    new ``chunks_count``: chunk IDs are positional, so chunks of the previous
+    revision from ``chunk_index`` ``chunks_count`` onwards are stale. Executors
+    write every result themselves, so nothing is collected on the driver.
+
+    The next manifest carries over unchanged rows plus the documents
+    processed successfully, so failures are retried on the next run. It is
+    written under ``manifest_root`` and only referenced from
+    ``options.manifest_key`` once complete, so a failed run leaves the
+    previous manifest in place.
+
+    Args:
+        sc: SparkContext
+        options: Job settings
+        results_path: Directory the processed, changed and deleted results are written to
+        manifest_root: Directory URI under which each run's manifest is written
+        num_partitions: Processing partitions (defaults to 4x parallelism)
+
+    Returns:
+        Counts of processed, failed, unchanged and deleted documents and indexed chunks
+    """
+    from pyspark import StorageLevel
+    from pyspark.sql import SparkSession
+    from pyspark.sql.types import LongType, StringType, StructField, StructType
+
+    spark = SparkSession.builder.getOrCreate()
+    s3_client = s3_factory()
+    prefixes, top_level = list_prefixes(s3_client, options.bucket, options.prefix)
+    print(f"Processing documents from s3://{options.bucket}/{options.prefix} ({len(prefixes)} prefixes)")
+
+    current = sc.parallelize(prefixes, max(len(prefixes), 1)).mapPartitions(
+        partial(list_partition_objects, bucket=options.bucket, s3_factory=s3_factory)
+    )
+    if top_level:
+        current = current.union(sc.parallelize(top_level))
+
+    manifest_path = read_manifest_path(s3_client, options)
+    if manifest_path is None:
+        previous = sc.emptyRDD()
+    else:
+        previous = spark.read.parquet(manifest_path).rdd.map(tuple)
+
+    diff = current.keyBy(lambda entry: entry[0]).fullOuterJoin(previous.keyBy(lambda entry: entry[0])).map(
+        lambda item: (classify(*item[1]), item[1])
+    )
+    diff.persist(StorageLevel.MEMORY_AND_DISK)
+    changed = diff.filter(lambda d: d[0] in (NEW, CHANGED)).map(lambda d: d[1][0])
+    unchanged = diff.filter(lambda d: d[0] == UNCHANGED).map(lambda d: d[1][0])
+
+    results = changed.map(lambda entry: entry[0]).repartition(
+        num_partitions or sc.defaultParallelism * 4
+    ).mapPartitions(partial(
+        process_partition,
+        options=options,
+        s3_factory=s3_factory,
+        embedder_factory=embedder_factory,
+        sink_factory=sink_factory,
+    ))
+    results.persist(StorageLevel.MEMORY_AND_DISK)
+    results.map(json.dumps).saveAsTextFile(f"{results_path}/processed")
+
+    prefix = options.prefix
+    deleted = diff.filter(lambda d: d[0] == DELETED).map(lambda d: d[1][1][0])
+    deleted.map(lambda key: cleanup_entry(key, prefix)).saveAsTextFile(f"{results_path}/deleted")
+
+    processed = results.filter(lambda r: r['status'] == 'processed')
+    replaced = diff.filter(lambda d: d[0] == CHANGED).map(lambda d: (d[1][0][0], None))
+    processed.keyBy(lambda r: r['key']).join(replaced).map(
+        lambda item: cleanup_entry(item[0], prefix, chunks_count=item[1][0]['chunks_count'])
+    ).saveAsTextFile(f"{results_path}/changed")
+
+    succeeded = processed.map(lambda r: (r['key'], None))
+    manifest = changed.keyBy(lambda entry: entry[0]).join(succeeded).map(lambda item: item[1][0]).union(unchanged)
+    next_manifest_path = f"{manifest_root}/run={uuid.uuid4().hex}"
+    schema = StructType([
+        StructField(name, StringType() if name in ('key', 'etag') else LongType(), False)
+        for name in MANIFEST_COLUMNS
+    ])
+    spark.createDataFrame(manifest, schema).write.parquet(next_manifest_path)
+    commit_manifest_path(s3_client, options, next_manifest_path)
+
+    # Counted from the results themselves, which stay exact when Spark recomputes a partition
+    statuses = results.map(lambda r: r['status']).countByValue()
+    summary = {
+        'processed': statuses.get('processed', 0),
+        'failed': statuses.get('failed', 0),
+        'chunks': processed.map(lambda r: r['chunks_count']).sum(),
+    }
+    summary['unchanged'] = unchanged.count()
+    summary['deleted'] = deleted.count()
+    diff.unpersist()
+    results.unpersist()
+    print(
+        f"Processed {summary['processed']} documents ({summary['chunks']} chunks), "
+        f"{summary['failed']} failed, {summary['unchanged']} unchanged, {summary['deleted']} deleted"
+    )
+    return summary
+
+
+def main():
+    """Main Glue job execution."""
+    from awsglue.context import GlueContext
+    from awsglue.job import Job
+    from awsglue.utils import getResolvedOptions
+    from pyspark.context import SparkContext
+
+    args = getResolvedOptions(sys.argv, ['JOB_NAME', 'S3_BUCKET', 'PINECONE_API_KEY'])
+    sc = SparkContext()
+    glue_context = GlueContext(sc)
+    job = Job(glue_context)
+    job.init(args['JOB_NAME'], args)
+
+    options = JobOptions(bucket=args['S3_BUCKET'], pinecone_api_key=args['PINECONE_API_KEY'])
+    run_id = uuid.uuid4().hex
+    run(
+        sc,
+        options,
+        results_path=f"s3://{options.bucket}/processing-results/{run_id}",
+        manifest_root=f"s3://{options.bucket}/manifests/document-ingestion",
+    )
 
     print("Job completed successfully")
+    job.commit()
 
 
 if __name__ == '__main__':
     main()
-    job.commit()
-
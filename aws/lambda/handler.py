@@ -1,20 +1,128 @@
 """
 AWS Lambda Handler
 Handles document processing and ingestion.
+
+Deployed with the service package so documents are parsed and chunked
+exactly as the API ingests them.
+
+Only lightweight modules are imported at load time. AWS clients, settings,
+the embedding model and the vector index are created on first use and
+cached for the life of the execution environment, so warm invocations
+reuse them and cold starts only pay for what their code path needs.
 """
 
+import asyncio
 import json
 import logging
-import boto3
-from typing import Dict, Any
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+from urllib.parse import unquote_plus
+
+# Times the service imports; the standard library is already loaded by the runtime
+_IMPORT_STARTED = time.perf_counter()
+
+from app.services.document.parser import (  # noqa: E402
+    DOCX,
+    HTML,
+    MARKDOWN,
+    PDF,
+    PPTX,
+    TEXT,
+    iter_pages,
+)
+from app.services.document.range_file import S3RangeFile  # noqa: E402
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# AWS clients
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+DOCUMENT_TYPES = {
+    '.pdf': PDF,
+    '.txt': TEXT,
+    '.docx': DOCX,
+    '.pptx': PPTX,
+    '.html': HTML,
+    '.htm': HTML,
+    '.md': MARKDOWN,
+}
+
+METRICS_NAMESPACE = 'LLMRetrievalService/Lambda'
+
+
+@dataclass(frozen=True)
+class HandlerConfig:
+    """Settings read from the environment once per execution environment."""
+
+    documents_prefix: str
+    embedding_model: str
+    embedding_batch_size: int
+    upsert_batch_size: int
+    max_concurrent_downloads: int
+    pinecone_index_name: str
+
+    @classmethod
+    def from_env(cls) -> 'HandlerConfig':
+        return cls(
+            documents_prefix=os.environ.get('DOCUMENTS_PREFIX', 'documents/'),
+            embedding_model=os.environ.get('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2'),
+            embedding_batch_size=int(os.environ.get('EMBEDDING_BATCH_SIZE', '256')),
+            upsert_batch_size=int(os.environ.get('UPSERT_BATCH_SIZE', '100')),
+            max_concurrent_downloads=int(os.environ.get('MAX_CONCURRENT_DOWNLOADS', '8')),
+            pinecone_index_name=os.environ.get('PINECONE_INDEX_NAME', 'llm-retrieval'),
+        )
+
+
+# Warm-container cache: resources created by earlier invocations of this environment
+_resources: Dict[str, Any] = {}
+_cold_start = True
+_init_seconds = 0.0
+
+
+def cached(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Get a resource from the warm-container cache, creating it on first use.
+
+    Creation time is added to the cold-start init duration.
+
+    Args:
+        name: Cache key
+        factory: Creates the resource
+
+    Returns:
+        The cached resource
+    """
+    global _init_seconds
+    if name not in _resources:
+        started = time.perf_counter()
+        _resources[name] = factory()
+        _init_seconds += time.perf_counter() - started
+    return _resources[name]
+
+
+def get_config() -> HandlerConfig:
+    """Parsed handler settings."""
+    return cached('config', HandlerConfig.from_env)
+
+
+def get_s3_client() -> Any:
+    """Synchronous S3 client."""
+    def create() -> Any:
+        import boto3
+
+        return boto3.client('s3')
+
+    return cached('s3', create)
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop kept across invocations so async clients stay connected."""
+    loop = cached('event_loop', asyncio.new_event_loop)
+    if loop.is_closed():
+        del _resources['event_loop']
+        loop = cached('event_loop', asyncio.new_event_loop)
+    return loop
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -25,15 +133,39 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         event: Lambda event data
         context: Lambda context
 
+    Returns:
+        Response dictionary
+    """
+    global _cold_start
+    try:
+        return route_event(event)
+    finally:
+        if _cold_start:
+            _cold_start = False
+            emit_cold_start_metric(context)
+
+
+def route_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Dispatch an event to the handler for its source.
+
+    Args:
+        event: Lambda event data
+
     Returns:
         Response dictionary
     """
     logger.info(f"Received event: {json.dumps(event)}")
 
+    # SQS batches report failures per message instead of failing the invocation
+    records = event.get('Records') or []
+    if records and records[0].get('eventSource') == 'aws:sqs':
+        return run_async(process_sqs_batch(records))
+
     try:
         # Handle S3 events
-        if 'Records' in event:
-            for record in event['Records']:
+        if records:
+            for record in records:
                 if record.get('eventSource') == 'aws:s3':
                     process_s3_event(record)
 
@@ -41,11 +173,6 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         elif 'httpMethod' in event:
             return handle_api_request(event)
 
-        # Handle SQS events
-        elif 'Records' in event and event['Records'][0].get('eventSource') == 'aws:sqs':
-            for record in event['Records']:
-                process_sqs_message(record)
-
         return {
             'statusCode': 200,
             'body': json.dumps({'message': 'Processing completed successfully'})
@@ -66,15 +193,29 @@ def process_s3_event(record: Dict[str, Any]) -> None:
     Args:
         record: S3 event record
     """
+    from app.services.document.chunker import Chunker
+
     bucket = record['s3']['bucket']['name']
-    key = record['s3']['object']['key']
+    key = unquote_plus(record['s3']['object']['key'])
 
     logger.info(f"Processing S3 object: s3://{bucket}/{key}")
 
-    # TODO: Download document from S3
-    # TODO: Extract text content
-    # TODO: Generate embeddings
-    # TODO: Store in vector database
+    config = get_config()
+    namespace, document_id = document_location(key)
+    source = f"s3://{bucket}/{key}"
+    # Embed and upsert each batch as the chunker produces it, so chunks never pile up
+    chunks = 0
+    for batch in batched(read_chunks(get_s3_client(), bucket, key, Chunker()), config.embedding_batch_size):
+        vectors = embed([text for _, text in batch])
+        items = [
+            vector_item(chunk_id, vector, document_id, chunks + i, source, text)
+            for i, ((chunk_id, text), vector) in enumerate(zip(batch, vectors, strict=True))
+        ]
+        for offset in range(0, len(items), config.upsert_batch_size):
+            upsert(namespace, items[offset:offset + config.upsert_batch_size])
+        chunks += len(batch)
+
+    logger.info(f"Ingested {source} as {chunks} chunks")
     # TODO: Update metadata in DynamoDB
 
 
@@ -121,15 +262,290 @@ def process_document_request(event: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def process_sqs_message(record: Dict[str, Any]) -> None:
+def run_async(coroutine: Any) -> Any:
+    """Run a coroutine on the execution environment's event loop."""
+    return get_event_loop().run_until_complete(coroutine)
+
+
+def emit_cold_start_metric(context: Any) -> None:
+    """
+    Log the cold start's import and lazy-init durations as a CloudWatch
+    embedded metric, so every deploy's init cost is tracked.
+    """
+    function_name = getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['function_name']],
+                'Metrics': [
+                    {'Name': 'ColdStart', 'Unit': 'Count'},
+                    {'Name': 'ImportDuration', 'Unit': 'Milliseconds'},
+                    {'Name': 'InitDuration', 'Unit': 'Milliseconds'},
+                ],
+            }],
+        },
+        'function_name': function_name,
+        'function_version': getattr(context, 'function_version', None),
+        'ColdStart': 1,
+        'ImportDuration': round(IMPORT_SECONDS * 1000, 3),
+        'InitDuration': round(_init_seconds * 1000, 3),
+    }))
+
+
+@dataclass
+class QueuedDocument:
+    """A document referenced by an SQS message."""
+
+    message_id: str
+    bucket: str
+    key: str
+
+
+def parse_sqs_message(record: Dict[str, Any]) -> List[Tuple[str, str]]:
     """
-    Process SQS message.
+    Extract the S3 objects an SQS message refers to.
+
+    Accepts S3 event notifications delivered through SQS as well as plain
+    ``{"bucket": ..., "key": ...}`` messages.
 
     Args:
         record: SQS message record
+
+    Returns:
+        (bucket, key) pairs; empty for S3 test events
     """
     body = json.loads(record['body'])
-    logger.info(f"Processing SQS message: {body}")
+    if 'Records' in body:
+        return [
+            (r['s3']['bucket']['name'], unquote_plus(r['s3']['object']['key']))
+            for r in body['Records']
+            if r.get('eventSource') == 'aws:s3'
+        ]
+    if body.get('Event') == 's3:TestEvent':
+        return []
+    return [(body['bucket'], body['key'])]
+
+
+def document_location(key: str) -> Tuple[str, str]:
+    """Vector namespace (tenant directory) and document ID of a key."""
+    prefix = get_config().documents_prefix
+    parts = key[len(prefix):].split('/') if key.startswith(prefix) else [key]
+    namespace = parts[0] if len(parts) > 1 else 'default'
+    return namespace, os.path.splitext(parts[-1])[0]
+
+
+def get_embedder() -> Any:
+    """Embedding model, loaded once per execution environment."""
+    def create() -> Any:
+        from sentence_transformers import SentenceTransformer
 
-    # TODO: Process message
+        return SentenceTransformer(get_config().embedding_model)
 
+    return cached('embedder', create)
+
+
+def get_index() -> Any:
+    """Pinecone index handle."""
+    def create() -> Any:
+        from pinecone import Pinecone
+
+        return Pinecone(api_key=os.environ['PINECONE_API_KEY']).Index(get_config().pinecone_index_name)
+
+    return cached('index', create)
+
+
+def embed(texts: List[str]) -> Any:
+    """Embed texts as a float matrix, one row per text."""
+    return get_embedder().encode(texts, batch_size=get_config().embedding_batch_size, normalize_embeddings=True)
+
+
+def upsert(namespace: str, vectors: List[Dict[str, Any]]) -> None:
+    """Upsert vectors into the Pinecone index."""
+    get_index().upsert(vectors=vectors, namespace=namespace)
+
+
+def vector_item(chunk_id: str, vector: Any, document_id: str, chunk_index: int, source: str, text: str) -> Dict[str, Any]:
+    """Pinecone upsert item for one embedded chunk."""
+    return {
+        'id': chunk_id,
+        'values': [float(v) for v in vector],
+        'metadata': {
+            'document_id': document_id,
+            'chunk_index': chunk_index,
+            'source': source,
+            'content': text,
+        },
+    }
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group items into lists of ``size``, the last one possibly shorter."""
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_chunks(client: Any, bucket: str, key: str, chunker: Any) -> Iterator[Tuple[str, str]]:
+    """
+    Stream a document from S3 into the chunker.
+
+    The object is read through ranged GETs and parsed page by page, and
+    chunks are yielded as the chunker produces them, so neither memory nor
+    /tmp has to hold the whole document or its chunks.
+
+    Args:
+        client: Synchronous S3 client
+        bucket: Bucket name
+        key: Object key
+        chunker: Chunker to split the text with
+
+    Yields:
+        Chunk ID and chunk text, in order
+    """
+    _, document_id = document_location(key)
+    document = S3RangeFile(client, bucket, key)
+    extension = os.path.splitext(key)[1].lower()
+    content_type = DOCUMENT_TYPES.get(extension) or document.content_type or TEXT
+    for chunk in chunker.chunks(iter_pages(document, content_type)):
+        yield f"{document_id}:{chunk.index}", chunk.text
+    logger.info(f"Read s3://{bucket}/{key} with {document.requests} range requests ({document.bytes_fetched} bytes)")
+
+
+# Ends a document's chunk queue once the document has been read
+_END = object()
+
+
+async def stream_chunks(client: Any, document: QueuedDocument, chunker: Any, chunks: asyncio.Queue) -> None:
+    """
+    Read a document's chunks in a worker thread onto a bounded queue.
+
+    The queue ends with ``_END``, or with the exception that stopped reading.
+    """
+    try:
+        reader = read_chunks(client, document.bucket, document.key, chunker)
+        while (chunk := await asyncio.to_thread(next, reader, None)) is not None:
+            await chunks.put(chunk)
+    except Exception as e:
+        await chunks.put(e)
+        return
+    await chunks.put(_END)
+
+
+async def process_sqs_batch(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Ingest the documents referenced by a batch of SQS messages.
+
+    Up to ``max_concurrent_downloads`` documents are streamed and chunked
+    ahead concurrently. Their chunks are taken in document order and
+    embedded ``embedding_batch_size`` at a time as they arrive, so batches
+    are shared across documents and no document's chunks are held in full.
+    Vectors are upserted per document after each batch. A message fails only
+    if one of its own documents fails, and only failed messages are reported
+    back for redelivery; vectors already upserted for them are overwritten
+    with identical ones when they are retried.
+
+    Args:
+        records: SQS message records
+
+    Returns:
+        Partial batch response with the IDs of the failed messages
+    """
+    from app.services.document.chunker import Chunker
+
+    config = get_config()
+    failed: Dict[str, str] = {}
+    documents: List[QueuedDocument] = []
+    for record in records:
+        try:
+            documents.extend(
+                QueuedDocument(record['messageId'], bucket, key) for bucket, key in parse_sqs_message(record)
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            failed[record['messageId']] = f"Malformed message: {e}"
+
+    def fail(document: QueuedDocument, error: BaseException) -> None:
+        logger.error(f"Failed to ingest s3://{document.bucket}/{document.key}: {error}")
+        failed.setdefault(document.message_id, str(error))
+
+    async def store(namespace: str, items: List[Dict[str, Any]]) -> None:
+        for start in range(0, len(items), config.upsert_batch_size):
+            await asyncio.to_thread(upsert, namespace, items[start:start + config.upsert_batch_size])
+
+    # Pending chunks as (document, chunk index, chunk ID, text)
+    batch: List[Tuple[QueuedDocument, int, str, str]] = []
+
+    async def flush() -> None:
+        pending = [chunk for chunk in batch if chunk[0].message_id not in failed]
+        batch.clear()
+        if not pending:
+            return
+        try:
+            vectors = await asyncio.to_thread(embed, [text for *_, text in pending])
+        except Exception as e:
+            for document in {id(doc): doc for doc, *_ in pending}.values():
+                fail(document, e)
+            return
+
+        # Upsert per document so failures stay attributable to one message
+        owners: Dict[int, Tuple[QueuedDocument, List[Dict[str, Any]]]] = {}
+        for (document, index, chunk_id, text), vector in zip(pending, vectors, strict=True):
+            _, document_id = document_location(document.key)
+            source = f"s3://{document.bucket}/{document.key}"
+            item = vector_item(chunk_id, vector, document_id, index, source, text)
+            owners.setdefault(id(document), (document, []))[1].append(item)
+        groups = list(owners.values())
+        outcomes = await asyncio.gather(
+            *(store(document_location(document.key)[0], items) for document, items in groups),
+            return_exceptions=True,
+        )
+        for (document, _), outcome in zip(groups, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                fail(document, outcome)
+
+    chunker = Chunker()
+    client = get_s3_client()
+    window = config.max_concurrent_downloads
+    queues = [asyncio.Queue(maxsize=config.embedding_batch_size) for _ in documents]
+    readers: List[asyncio.Task] = []
+
+    def start_reader(position: int) -> None:
+        if position < len(documents):
+            readers.append(asyncio.create_task(stream_chunks(client, documents[position], chunker, queues[position])))
+
+    try:
+        for position in range(window):
+            start_reader(position)
+        for position, document in enumerate(documents):
+            index = 0
+            # A document whose message already failed is not read any further
+            while document.message_id not in failed:
+                chunk = await queues[position].get()
+                if chunk is _END:
+                    break
+                if isinstance(chunk, Exception):
+                    fail(document, chunk)
+                    break
+                batch.append((document, index, *chunk))
+                index += 1
+                if len(batch) >= config.embedding_batch_size:
+                    await flush()
+            start_reader(position + window)
+        await flush()
+    finally:
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+    ingested = sum(1 for document in documents if document.message_id not in failed)
+    logger.info(f"Ingested {ingested} documents from {len(records)} messages, {len(failed)} messages failed")
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed]}
+
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
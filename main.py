@@ -16,6 +16,7 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import make_asgi_app
 import uvicorn
 import time
 import logging
@@ -23,6 +24,24 @@ import logging
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.api.v1.router import api_router
+from app.services.document.jobs import close_job_queue, init_job_queue
+from app.services.document.worker import close_ingestion_workers, init_ingestion_workers
+from app.services.llm.batcher import close_embedding_batcher, init_embedding_batcher
+from app.services.llm.chunk_embeddings import (
+    close_chunk_embedding_store,
+    init_chunk_embedding_store,
+)
+from app.services.llm.embedding_cache import close_embedding_cache, init_embedding_cache
+from app.services.llm.embeddings import embed_with_provider
+from app.services.rag.partitions import (
+    close_compactor,
+    close_partitions,
+    init_compactor,
+    init_partitions,
+)
+from app.services.rag.result_cache import close_result_cache, init_result_cache
+from app.services.rag.semantic_cache import close_semantic_cache, init_semantic_cache
+from app.utils.cache import close_redis, init_redis
 
 # Setup logging
 setup_logging()
@@ -41,8 +60,19 @@ async def lifespan(app: FastAPI):
 
     # Initialize services
     # await init_db()
-    # await init_vector_store()
-    # await init_redis()
+    # Tenant partitions load on first use and check for newer snapshots lazily
+    init_partitions()
+    # Deleted chunks are tombstoned; segments are merged and purged in the background
+    init_compactor()
+    redis_client = await init_redis()
+    init_embedding_cache(redis_client)
+    init_chunk_embedding_store(redis_client)
+    # Retrieval, chat and ingestion share batched embedding calls
+    init_embedding_batcher(embed_with_provider)
+    init_result_cache(redis_client)
+    init_semantic_cache()
+    # Uploads are parsed, embedded and indexed in the background
+    init_ingestion_workers(init_job_queue(redis_client))
 
     logger.info("✅ Application startup complete")
 
@@ -51,6 +81,16 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🛑 Shutting down LLM Retrieval Service...")
     # Cleanup resources
+    await close_ingestion_workers()
+    close_job_queue()
+    await close_embedding_batcher()
+    await close_compactor()
+    await close_partitions()
+    close_embedding_cache()
+    close_chunk_embedding_store()
+    close_semantic_cache()
+    close_result_cache()
+    await close_redis()
     logger.info("✅ Application shutdown complete")
 
 
@@ -77,6 +117,10 @@ app.add_middleware(
 # GZip Middleware for response compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Prometheus metrics
+if settings.ENABLE_METRICS:
+    app.mount("/metrics", make_asgi_app())
+
 
 # Custom middleware for request tracking
 @app.middleware("http")
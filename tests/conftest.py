@@ -3,12 +3,134 @@ Test configuration and fixtures.
 """
 
 import pytest
-from typing import Generator, AsyncGenerator
+from typing import Any, Dict, Generator, AsyncGenerator, List
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 import asyncio
+import hashlib
+import io
+from contextlib import asynccontextmanager
+
+import numpy as np
 
 from main import app
+from app.core.config import settings
+from app.services.llm.embeddings import EmbeddingProvider, set_embedding_provider
+
+TEST_EMBEDDING_DIMENSION = 64
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """Deterministic bag-of-words embeddings so tests never call a remote API."""
+
+    def __init__(self, dimension: int = TEST_EMBEDDING_DIMENSION):
+        super().__init__(model="fake-embedding-model", dimension=dimension)
+        self.calls = 0
+
+    def vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimension] += 1.0
+        return vector
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        self.calls += 1
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.stack([self.vector(text) for text in texts])
+
+
+class FakeS3Body:
+    """Streaming body of a fake S3 object."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._offset = 0
+
+    async def __aenter__(self) -> "FakeS3Body":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    async def read(self, size: int = -1) -> bytes:
+        end = len(self._data) if size < 0 else self._offset + size
+        block = self._data[self._offset : end]
+        self._offset += len(block)
+        return block
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the aioboto3 S3 client the service uses."""
+
+    def __init__(self):
+        self.objects: Dict[str, bytes] = {}
+        self.uploads: Dict[str, List[bytes]] = {}
+        self.aborted: List[str] = []
+        self.part_sizes: List[int] = []
+        self.fail_on_part = 0
+
+    async def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs: Any) -> Dict[str, Any]:
+        self.objects[Key] = Body
+        return {}
+
+    async def get_object(self, Bucket: str, Key: str, **kwargs: Any) -> Dict[str, Any]:
+        return {"Body": FakeS3Body(self.objects[Key]), "ContentLength": len(self.objects[Key])}
+
+    async def create_multipart_upload(self, Bucket: str, Key: str, **kwargs: Any) -> Dict[str, Any]:
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = []
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> Dict[str, Any]:
+        if PartNumber == self.fail_on_part:
+            raise ConnectionError("connection reset")
+        self.part_sizes.append(len(Body))
+        self.uploads[UploadId].append(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    async def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict) -> Dict:
+        assert [p["PartNumber"] for p in MultipartUpload["Parts"]] == list(range(1, len(self.uploads[UploadId]) + 1))
+        self.objects[Key] = b"".join(self.uploads.pop(UploadId))
+        return {}
+
+    async def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> Dict:
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId, None)
+        return {}
+
+    @asynccontextmanager
+    async def session(self):
+        """Use as a drop-in for ``s3_client``."""
+        yield self
+
+    def sync(self) -> "FakeSyncS3Client":
+        """Synchronous (boto3-style) view of the same objects."""
+        return FakeSyncS3Client(self.objects)
+
+
+class FakeSyncS3Client:
+    """In-memory stand-in for the ranged reads made through a boto3 S3 client."""
+
+    def __init__(self, objects: Dict[str, bytes]):
+        self.objects = objects
+        self.ranges: List[str] = []
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        from botocore.exceptions import ClientError
+
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[Key]), "ContentType": "binary/octet-stream"}
+
+    def get_object(self, Bucket: str, Key: str, Range: str = "") -> Dict[str, Any]:
+        data = self.objects[Key]
+        if Range:
+            self.ranges.append(Range)
+            start, end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start) : int(end) + 1]
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
 
 
 @pytest.fixture(scope="session")
@@ -19,6 +141,35 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def isolated_vector_store(tmp_path, monkeypatch):
+    """Keep the vector store out of the working tree and sized for fake embeddings."""
+    monkeypatch.setattr(settings, "VECTOR_STORE_PATH", str(tmp_path / "vector_store"))
+    monkeypatch.setattr(settings, "CHUNK_EMBEDDING_STORE_PATH", str(tmp_path / "chunk_embeddings.sqlite3"))
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", TEST_EMBEDDING_DIMENSION)
+    # Tests drive ingestion workers explicitly rather than from the app lifespan
+    monkeypatch.setattr(settings, "INGESTION_WORKERS", 0)
+
+
+@pytest.fixture
+def fake_s3(monkeypatch) -> FakeS3Client:
+    """Route the service's S3 calls to an in-memory client."""
+    from app.api.v1.endpoints import documents
+
+    s3 = FakeS3Client()
+    monkeypatch.setattr(documents, "s3_client", s3.session)
+    return s3
+
+
+@pytest.fixture
+def fake_embeddings() -> Generator:
+    """Install a deterministic embedding provider for the duration of a test."""
+    provider = FakeEmbeddingProvider()
+    set_embedding_provider(provider)
+    yield provider
+    set_embedding_provider(None)
+
+
 @pytest.fixture
 def client() -> Generator:
     """
@@ -62,12 +213,18 @@ def mock_openai_response():
 
 
 @pytest.fixture
-def sample_jwt_token():
+def tenant_id() -> str:
+    """Tenant of the test user (their ``sub`` claim)."""
+    return "test@example.com"
+
+
+@pytest.fixture
+def sample_jwt_token(tenant_id):
     """Generate a sample JWT token for testing."""
     from app.core.security import create_access_token
 
     return create_access_token(
-        data={"sub": "test@example.com", "role": "user"}
+        data={"sub": tenant_id, "role": "user"}
     )
 
 
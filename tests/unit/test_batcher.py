@@ -0,0 +1,130 @@
+"""
+Unit tests for the micro-batching embedding service.
+"""
+
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.llm.batcher import (
+    API_BATCH_WORKERS,
+    EmbeddingBatcher,
+    close_embedding_batcher,
+    init_embedding_batcher,
+)
+
+
+class RecordingEmbedder:
+    """Embeds each text as [len(text)] and records the size of every batch."""
+
+    def __init__(self, fail: bool = False):
+        self.batches: List[int] = []
+        self.fail = fail
+
+    async def __call__(self, texts: List[str]) -> np.ndarray:
+        self.batches.append(len(texts))
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    """Test that single-text requests arriving together are embedded in one call."""
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch_size=32, max_wait_ms=50)
+    batcher.start()
+    try:
+        texts = ["a" * i for i in range(1, 11)]
+        results = await asyncio.gather(*(batcher.embed([text]) for text in texts))
+    finally:
+        await batcher.stop()
+
+    assert embedder.batches == [10]
+    assert [float(r[0, 0]) for r in results] == [float(i) for i in range(1, 11)]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_batches_are_capped_and_flushed_on_timeout():
+    """Test that a full batch flushes at once and a lone request waits at most max_wait."""
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch_size=4, max_wait_ms=20)
+    batcher.start()
+    try:
+        vectors = await batcher.embed(["x" * i for i in range(1, 11)])
+        single = await asyncio.wait_for(batcher.embed(["solo"]), timeout=1.0)
+    finally:
+        await batcher.stop()
+
+    assert embedder.batches == [4, 4, 2, 1]
+    assert vectors[:, 0].tolist() == [float(i) for i in range(1, 11)]
+    assert single.tolist() == [[4.0]]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failures_reach_every_caller_in_the_batch():
+    """Test that a failed batch raises in each waiting request and the worker keeps running."""
+    embedder = RecordingEmbedder(fail=True)
+    batcher = EmbeddingBatcher(embedder, max_batch_size=8, max_wait_ms=20)
+    batcher.start()
+    try:
+        results = await asyncio.gather(
+            batcher.embed(["x"]), batcher.embed(["y"]), return_exceptions=True
+        )
+        embedder.fail = False
+        recovered = await batcher.embed(["zz"])
+    finally:
+        await batcher.stop()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert recovered.tolist() == [[2.0]]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_short_provider_response_fails_the_batch():
+    """Test that a provider returning too few rows fails every caller instead of hanging."""
+
+    async def short(texts: List[str]) -> np.ndarray:
+        return np.ones((len(texts) - 1, 1), dtype=np.float32)
+
+    batcher = EmbeddingBatcher(short, max_batch_size=8, max_wait_ms=20)
+    batcher.start()
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.embed(["x"]), batcher.embed(["y"]), return_exceptions=True),
+            timeout=1.0,
+        )
+    finally:
+        await batcher.stop()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "provider, expected", [("openai", None), ("sentence_transformers", (64, 1))]
+)
+async def test_batching_defaults_depend_on_the_provider(monkeypatch, provider, expected):
+    """Test that API providers embed directly unless batching is configured explicitly."""
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", provider)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_BATCH_SIZE", None)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_WORKERS", None)
+    batcher = init_embedding_batcher(RecordingEmbedder())
+    try:
+        assert (batcher and (batcher.max_batch_size, batcher.workers)) == expected
+
+        monkeypatch.setattr(settings, "EMBEDDING_MAX_BATCH_SIZE", 16)
+        await close_embedding_batcher()
+        batcher = init_embedding_batcher(RecordingEmbedder())
+        assert batcher.workers == (API_BATCH_WORKERS if provider == "openai" else 1)
+    finally:
+        await close_embedding_batcher()
@@ -0,0 +1,144 @@
+"""
+Unit tests for content-hash chunk embedding deduplication.
+"""
+
+import pytest
+
+from app.core.config import settings
+from app.services.document.ingestion import ingest_text
+from app.services.llm.batcher import close_embedding_batcher, init_embedding_batcher
+from app.services.llm.chunk_embeddings import (
+    ChunkEmbeddingStore,
+    chunk_hash,
+    close_chunk_embedding_store,
+    embed_chunks,
+    init_chunk_embedding_store,
+)
+from app.services.llm.embeddings import embed_with_provider
+from app.services.rag.partitions import close_partitions, get_partitions, init_partitions
+
+
+@pytest.fixture
+def chunk_store():
+    store = init_chunk_embedding_store()
+    yield store
+    close_chunk_embedding_store()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_known_chunks_are_not_re_embedded(chunk_store, fake_embeddings):
+    """Test that repeats within a batch and across runs reuse stored vectors."""
+    texts = ["alpha beta", "gamma delta", "alpha  beta", "epsilon"]
+
+    first, report = await embed_chunks(texts, batch_size=2)
+    assert report.embedded == 3 and report.deduplicated == 1
+    assert report.embedding_calls == 2 and report.embedding_calls_saved == 0
+    assert (first[0] == first[2]).all()
+
+    calls = fake_embeddings.calls
+    second, report = await embed_chunks(texts + ["zeta"], batch_size=2)
+    assert fake_embeddings.calls == calls + 1
+    assert report.embedded == 1 and report.deduplicated == 4
+    assert report.embedding_calls_saved == 2
+    assert (second[:4] == first).all()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_ingestion_uses_the_batcher_only_when_enabled(
+    chunk_store, fake_embeddings, monkeypatch
+):
+    """Test that chunk embeddings bypass the micro-batcher unless ingestion batching is on."""
+    batched = []
+
+    async def embed(texts):
+        batched.append(len(texts))
+        return await embed_with_provider(texts)
+
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_BATCH_SIZE", 8)
+    init_embedding_batcher(embed)
+    try:
+        await embed_chunks(["one", "two", "three"], batch_size=2)
+        assert batched == []
+
+        monkeypatch.setattr(settings, "EMBEDDING_BATCH_INGESTION", True)
+        vectors, report = await embed_chunks(["four", "five", "six"], batch_size=2)
+        assert sum(batched) == 3 and report.embedded == 3
+        assert vectors.shape[0] == 3
+    finally:
+        await close_embedding_batcher()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_local_tier_persists(tmp_path):
+    """Test that vectors written by one store instance are found by the next."""
+    path = str(tmp_path / "emb.sqlite3")
+    digest = chunk_hash("some text", "model")
+    store = ChunkEmbeddingStore(path)
+    await store.set_many([digest], [[1.0, 2.0, 3.0]])
+    store.close()
+
+    reopened = ChunkEmbeddingStore(path)
+    found = await reopened.get_many([digest, "missing"])
+    reopened.close()
+
+    assert list(found) == [digest]
+    assert found[digest].tolist() == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reingesting_a_revision_only_embeds_changed_chunks(
+    chunk_store, fake_embeddings, monkeypatch
+):
+    """Test that a revised upload only embeds its new chunks and reports the saving."""
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 60)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    paragraphs = [f"Paragraph {i} explains topic {i} in a sentence." for i in range(10)]
+    init_partitions()
+    try:
+        original = await ingest_text("acme", "doc", ["\n\n".join(paragraphs)])
+        paragraphs[4] = "Paragraph 4 was rewritten for the second revision."
+        revised = await ingest_text("acme", "doc-v2", ["\n\n".join(paragraphs)])
+
+        assert original.chunks == 10 and original.embedding.embedded == 10
+        assert revised.embedding.embedded == 1 and revised.embedding.deduplicated == 9
+        partition = get_partitions().get("acme")
+        assert partition.store.ntotal == 20
+        assert partition.store.records[13].metadata["chunk_index"] == 3
+    finally:
+        await close_partitions()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_reingestion_keeps_the_previous_chunks(
+    chunk_store, fake_embeddings, monkeypatch
+):
+    """Test that a re-ingestion failing part way leaves the document as it was before."""
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 60)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 2)
+    paragraphs = [f"Paragraph {i} explains topic {i} in a sentence.\n\n" for i in range(10)]
+
+    def failing_revision():
+        yield "".join(paragraphs[:6]).replace("explains", "revises")
+        raise OSError("connection reset while reading the upload")
+
+    init_partitions()
+    try:
+        await ingest_text("acme", "doc", paragraphs)
+        with pytest.raises(OSError):
+            await ingest_text("acme", "doc", failing_revision())
+
+        partition = get_partitions().get("acme")
+        contents = sorted(record.content for record in partition.store.records)
+        assert not partition.dirty
+        assert (
+            partition.store.ntotal == partition.keywords.ntotal == partition.documents.nchunks == 10
+        )
+        assert all("explains" in content for content in contents)
+    finally:
+        await close_partitions()
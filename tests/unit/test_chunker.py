@@ -0,0 +1,102 @@
+"""
+Unit tests for the streaming text chunker.
+"""
+
+import itertools
+import tracemalloc
+from typing import List
+
+import pytest
+
+from app.services.document.chunker import Chunker, chunk_text
+
+SENTENCES = [f"Sentence number {i} talks about topic {i % 7}." for i in range(200)]
+TEXT = " ".join(SENTENCES[:100]) + "\n\n" + " ".join(SENTENCES[100:])
+
+
+class WordTokenizer:
+    """One token per whitespace-separated word."""
+
+    def __init__(self):
+        self.vocabulary: List[str] = []
+
+    def encode(self, text: str) -> List[int]:
+        ids = []
+        for word in text.split():
+            self.vocabulary.append(word)
+            ids.append(len(self.vocabulary) - 1)
+        return ids
+
+    def decode(self, tokens: List[int]) -> str:
+        return " ".join(self.vocabulary[t] for t in tokens) + " "
+
+
+def pieces(text: str, size: int):
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+@pytest.mark.unit
+def test_chunks_end_on_sentences_and_overlap():
+    """Test that chunks fit the size, end at sentence ends and repeat trailing sentences."""
+    chunks = list(chunk_text([TEXT], chunk_size=300, chunk_overlap=100, unit="chars"))
+
+    assert len(chunks) > 10
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    for previous, chunk in itertools.pairwise(chunks):
+        assert len(chunk.text) <= 300
+        assert previous.text.endswith(".")
+        last_sentence = previous.text.rsplit(". ", 1)[-1]
+        assert last_sentence in chunk.text
+        assert TEXT[chunk.start : chunk.start + len(chunk.text)] == chunk.text
+    assert "Sentence number 199" in chunks[-1].text
+
+
+@pytest.mark.unit
+def test_output_does_not_depend_on_how_the_stream_is_split():
+    """Test that feeding the text in tiny pieces gives the same chunks as one string."""
+    whole = [c.text for c in chunk_text([TEXT], chunk_size=250, chunk_overlap=50, unit="chars")]
+    streamed = [
+        c.text for c in chunk_text(pieces(TEXT, 7), chunk_size=250, chunk_overlap=50, unit="chars")
+    ]
+
+    assert streamed == whole
+
+
+@pytest.mark.unit
+def test_paragraph_break_closes_a_half_full_chunk():
+    """Test that a paragraph boundary ends the chunk instead of mixing paragraphs."""
+    text = "First paragraph sentence one. Sentence two.\n\nSecond paragraph starts here."
+    chunks = list(chunk_text([text], chunk_size=80, chunk_overlap=0, unit="chars"))
+
+    assert [c.text for c in chunks] == [
+        "First paragraph sentence one. Sentence two.",
+        "Second paragraph starts here.",
+    ]
+
+
+@pytest.mark.unit
+def test_token_sizing_and_unbroken_text():
+    """Test token-sized chunks, including a run of text with no sentence boundary."""
+    chunker = Chunker(chunk_size=20, chunk_overlap=5, unit="tokens", tokenizer=WordTokenizer())
+    text = TEXT + " " + "word " * 100
+
+    chunks = list(chunker.chunks(pieces(text, 1000)))
+
+    assert all(len(c.text.split()) <= 20 for c in chunks)
+    assert chunks[-1].text.endswith("word")
+
+
+@pytest.mark.unit
+def test_memory_stays_flat_on_a_large_stream():
+    """Test that peak memory does not grow with the size of the streamed text."""
+    block = " ".join(SENTENCES) + "\n\n"
+    stream = itertools.repeat(block, 300)  # ~2.6 MB of text
+
+    tracemalloc.start()
+    count = sum(1 for _ in chunk_text(stream, chunk_size=1000, chunk_overlap=200, unit="chars"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count > 1500
+    assert peak < 256 * 1024
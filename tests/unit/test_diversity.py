@@ -0,0 +1,83 @@
+"""
+Unit tests for MMR diversification and adjacent-chunk merging.
+"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.rag.diversity import maximal_marginal_relevance, merge_adjacent
+from app.services.rag.indexer import add_chunks
+from app.services.vector import ChunkRecord, SearchHit
+
+
+def hit(chunk_id: str, document_id: str, index, content: str, score: float) -> SearchHit:
+    metadata = {} if index is None else {"chunk_index": index}
+    return SearchHit(
+        record=ChunkRecord(
+            chunk_id=chunk_id, document_id=document_id, content=content, metadata=metadata
+        ),
+        score=score,
+    )
+
+
+@pytest.mark.unit
+def test_mmr_skips_near_duplicates():
+    """Test that MMR prefers a distinct candidate over a copy of one already chosen."""
+    query = np.array([1.0, 1.0, 0.0], dtype=np.float32)
+    candidates = np.array([[1.0, 0.9, 0.0], [1.0, 0.9, 0.01], [0.2, 1.0, 0.3]], dtype=np.float32)
+
+    assert maximal_marginal_relevance(query, candidates, top_k=2, lambda_mult=1.0) == [0, 1]
+    assert maximal_marginal_relevance(query, candidates, top_k=2, lambda_mult=0.5) == [0, 2]
+    assert maximal_marginal_relevance(query, candidates, top_k=10) == [0, 2, 1]
+
+
+@pytest.mark.unit
+def test_adjacent_chunks_merge_without_repeating_overlap():
+    """Test that consecutive chunks of a document become one passage at the best rank."""
+    hits = [
+        hit("a1", "a", 1, "brown fox jumps over", 0.9),
+        hit("b0", "b", 0, "unrelated passage", 0.8),
+        hit("a0", "a", 0, "the quick brown fox", 0.7),
+        hit("a3", "a", 3, "far away chunk", 0.6),
+        hit("x", "a", None, "no position", 0.5),
+    ]
+
+    merged = merge_adjacent(hits, max_overlap=200)
+
+    assert [h.record.chunk_id for h in merged] == ["a0", "b0", "a3", "x"]
+    assert merged[0].record.content == "the quick brown fox jumps over"
+    assert merged[0].record.metadata["chunk_ids"] == ["a0", "a1"]
+    assert merged[0].score == pytest.approx(0.9)
+
+
+@pytest.mark.unit
+def test_query_endpoint_diversifies_and_merges(
+    client: TestClient, auth_headers, fake_embeddings, tenant_id
+):
+    """Test that MMR drops a duplicate chunk and merging joins neighbours."""
+    texts = [
+        ("a", 0, "vector search with faiss"),
+        ("a", 1, "vector search with faiss indexes"),
+        ("b", 0, "vector search with faiss"),
+        ("c", 0, "keyword search ranks vector terms"),
+    ]
+    records = [
+        ChunkRecord(
+            chunk_id=f"{doc}{i}", document_id=doc, content=text, metadata={"chunk_index": i}
+        )
+        for doc, i, text in texts
+    ]
+    add_chunks(tenant_id, records, [fake_embeddings.vector(text) for _, _, text in texts])
+    query = {"query": "vector search with faiss", "top_k": 3, "similarity_threshold": 0.0}
+
+    plain = client.post("/api/v1/retrieval/query", json=query, headers=auth_headers).json()
+    diverse = client.post(
+        "/api/v1/retrieval/query",
+        json={**query, "mmr": True, "mmr_lambda": 0.3, "merge_adjacent": True},
+        headers=auth_headers,
+    ).json()
+
+    assert {chunk["chunk_id"] for chunk in plain["results"]} == {"a0", "a1", "b0"}
+    assert "c0" in {chunk["chunk_id"] for chunk in diverse["results"]}
+    assert len({chunk["content"] for chunk in diverse["results"]}) == diverse["total_results"]
@@ -0,0 +1,120 @@
+"""
+Unit tests for the document-level neighbour graph.
+"""
+
+import numpy as np
+import pytest
+
+from app.services.vector import ChunkRecord, DocumentIndex, FaissVectorStore
+
+
+def make_batch(rng, document_ids, dimension=16):
+    records = [
+        ChunkRecord(chunk_id=f"{doc}-{i}-{rng.integers(1 << 30)}", document_id=doc, content="")
+        for i, doc in enumerate(document_ids)
+    ]
+    return records, rng.standard_normal((len(records), dimension)).astype(np.float32)
+
+
+def exact_neighbors(index: DocumentIndex, document_id: str, k: int):
+    scores = index._similarities(index._positions[document_id])
+    return [doc for doc, _ in index._top_neighbors(scores, k)]
+
+
+@pytest.mark.unit
+def test_incremental_graph_matches_exact_neighbours():
+    """Test that lookups after many incremental additions equal an exact scan."""
+    rng = np.random.default_rng(7)
+    index = DocumentIndex(dimension=16, graph_k=5)
+    for _ in range(30):
+        doc_ids = [f"doc-{j}" for j in rng.integers(0, 40, size=4)]
+        index.add(*make_batch(rng, doc_ids))
+
+    for document_id in list(index._positions):
+        got = [doc for doc, _ in index.similar(document_id, 5)]
+        assert got == exact_neighbors(index, document_id, 5)
+
+
+@pytest.mark.unit
+def test_similar_excludes_self_and_unknown_documents():
+    """Test that a document is not its own neighbour and unknown ids return None."""
+    rng = np.random.default_rng(1)
+    index = DocumentIndex(dimension=16, graph_k=3)
+    index.add(*make_batch(rng, ["a", "a", "b", "c"]))
+
+    neighbors = index.similar("a", 3)
+    assert [doc for doc, _ in neighbors] and "a" not in [doc for doc, _ in neighbors]
+    assert len(neighbors) == 2
+    assert index.similar("missing", 3) is None
+
+
+@pytest.mark.unit
+def test_top_k_beyond_the_graph_is_computed_exactly():
+    """Test that asking for more neighbours than the graph keeps is not truncated."""
+    rng = np.random.default_rng(9)
+    index = DocumentIndex(dimension=16, graph_k=3)
+    index.add(*make_batch(rng, [f"doc-{i}" for i in range(12)]))
+
+    got = [doc for doc, _ in index.similar("doc-0", 8)]
+    assert len(got) == 8 and got == exact_neighbors(index, "doc-0", 8)
+    assert len(index.similar("doc-0", 50)) == 11
+
+
+@pytest.mark.unit
+def test_remove_drops_document_from_neighbour_lists():
+    """Test that a removed document disappears from every other document's list."""
+    rng = np.random.default_rng(3)
+    index = DocumentIndex(dimension=16, graph_k=4)
+    index.add(*make_batch(rng, [f"doc-{i}" for i in range(10)]))
+
+    index.remove("doc-4")
+
+    assert "doc-4" not in index
+    for document_id in [f"doc-{i}" for i in range(10) if i != 4]:
+        got = [doc for doc, _ in index.similar(document_id, 4)]
+        assert "doc-4" not in got
+        assert got == exact_neighbors(index, document_id, 4)
+
+
+@pytest.mark.unit
+def test_save_load_and_build_from_store(tmp_path):
+    """Test that document vectors survive a round trip and can be rebuilt from the store."""
+    rng = np.random.default_rng(5)
+    records, vectors = make_batch(rng, [f"doc-{i % 6}" for i in range(30)])
+    index = DocumentIndex(dimension=16, graph_k=3)
+    index.add(records, vectors)
+    expected = index.similar("doc-2", 3)
+
+    index.save(str(tmp_path))
+    loaded = DocumentIndex.load(str(tmp_path), graph_k=3)
+    assert loaded.nchunks == 30
+    assert [doc for doc, _ in loaded.similar("doc-2", 3)] == [doc for doc, _ in expected]
+
+    store = FaissVectorStore(dimension=16)
+    store.add(records, vectors)
+    built = DocumentIndex.build(store, graph_k=3)
+    assert [doc for doc, _ in built.similar("doc-2", 3)] == [doc for doc, _ in expected]
+
+
+@pytest.mark.unit
+def test_saves_append_changes_to_a_delta_log(tmp_path):
+    """Test that small saves leave the snapshot alone and loading replays the log."""
+    rng = np.random.default_rng(9)
+    index = DocumentIndex(dimension=16, graph_k=3)
+    index.add(*make_batch(rng, [f"doc-{i % 8}" for i in range(80)]))
+    index.save(str(tmp_path))
+    snapshot = (tmp_path / DocumentIndex.FILE).read_bytes()
+
+    index.add(*make_batch(rng, ["doc-1", "doc-9", "doc-9"]))
+    index.remove("doc-3")
+    index.save(str(tmp_path))
+    assert (tmp_path / DocumentIndex.FILE).read_bytes() == snapshot
+
+    loaded = DocumentIndex.load(str(tmp_path), graph_k=3)
+    assert loaded.nchunks == index.nchunks
+    assert "doc-3" not in loaded and "doc-9" in loaded
+    assert loaded.similar("doc-1", 3) == pytest.approx(index.similar("doc-1", 3))
+
+    loaded.save(str(tmp_path), fold=True)
+    assert (tmp_path / DocumentIndex.FILE).read_bytes() != snapshot
+    assert DocumentIndex.load(str(tmp_path), graph_k=3).nchunks == index.nchunks
@@ -0,0 +1,112 @@
+"""
+Unit tests for the query embedding cache.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from app.services.llm.embedding_cache import (
+    EmbeddingCache,
+    close_embedding_cache,
+    init_embedding_cache,
+)
+from app.services.llm.embeddings import embed_queries
+from app.utils.cache import LRUCache
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis commands the cache uses."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.pending.append((key, value))
+
+    async def execute(self):
+        self.redis.store.update(self.pending)
+
+
+@pytest.mark.unit
+def test_lru_cache_evicts_least_recently_used():
+    """Test that the LRU respects its size cap and recency."""
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+@pytest.mark.unit
+def test_lru_cache_expires_entries():
+    """Test that entries expire after their TTL."""
+    cache = LRUCache(max_entries=10, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+
+
+@pytest.mark.unit
+def test_key_normalizes_query_and_includes_model():
+    """Test that whitespace/case variants share a key but models do not."""
+    assert EmbeddingCache.key("  Hello   World ", "m1") == EmbeddingCache.key("hello world", "m1")
+    assert EmbeddingCache.key("hello world", "m1") != EmbeddingCache.key("hello world", "m2")
+
+
+@pytest.mark.unit
+async def test_redis_tier_is_promoted_to_local():
+    """Test that a Redis hit is served and promoted into the local tier."""
+    redis = FakeRedis()
+    writer = EmbeddingCache(max_entries=10, ttl_seconds=60, redis_client=redis)
+    await writer.set_many(["query"], np.ones((1, 4), dtype=np.float32), "m")
+
+    reader = EmbeddingCache(max_entries=10, ttl_seconds=60, redis_client=redis)
+    first = await reader.get_many(["query", "other"], "m")
+    second = await reader.get_many(["query"], "m")
+
+    np.testing.assert_array_equal(first[0], np.ones(4, dtype=np.float32))
+    assert first[1] is None
+    assert second[0] is not None
+    assert reader.stats() == {"local_hits": 1, "redis_hits": 1, "misses": 1, "local_entries": 1}
+
+
+@pytest.mark.unit
+async def test_embed_queries_only_embeds_misses(fake_embeddings):
+    """Test that repeated queries skip the embedding provider."""
+    init_embedding_cache()
+    try:
+        first = await embed_queries(["what is faiss", "What  is FAISS", "bm25"])
+        calls = fake_embeddings.calls
+        second = await embed_queries(["what is faiss", "bm25"])
+    finally:
+        close_embedding_cache()
+
+    assert calls == 1
+    assert fake_embeddings.calls == 1
+    np.testing.assert_array_equal(first[0], first[1])
+    np.testing.assert_array_equal(second[1], first[2])
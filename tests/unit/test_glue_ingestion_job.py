@@ -0,0 +1,281 @@
+"""
+Unit tests for the Glue document ingestion job.
+"""
+
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+GLUE_DIR = Path(__file__).resolve().parents[2] / "aws" / "glue"
+REPO_ROOT = GLUE_DIR.parents[1]
+
+
+@pytest.fixture
+def glue_job(monkeypatch):
+    monkeypatch.syspath_prepend(str(GLUE_DIR))
+    import document_ingestion_job
+
+    return document_ingestion_job
+
+
+class DirectoryS3:
+    """S3 stand-in backed by a local directory, usable from Spark executors."""
+
+    PAGE_SIZE = 2
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.list_calls = 0
+
+    def put(self, bucket: str, key: str, body: bytes) -> None:
+        path = self.root / bucket / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+
+    def get_paginator(self, operation: str) -> "DirectoryS3":
+        assert operation == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket: str, Prefix: str, Delimiter: Optional[str] = None):
+        base = self.root / Bucket
+        keys = sorted(str(p.relative_to(base)) for p in base.rglob("*") if p.is_file())
+        entries: List[Dict[str, Any]] = []
+        seen = set()
+        for key in keys:
+            if not key.startswith(Prefix):
+                continue
+            rest = key[len(Prefix) :]
+            if Delimiter and Delimiter in rest:
+                prefix = Prefix + rest.split(Delimiter)[0] + Delimiter
+                if prefix not in seen:
+                    seen.add(prefix)
+                    entries.append({"Prefix": prefix})
+            else:
+                path = base / key
+                entries.append(
+                    {
+                        "Key": key,
+                        "ETag": f'"{hashlib.md5(path.read_bytes()).hexdigest()}"',
+                        "Size": path.stat().st_size,
+                        "LastModified": datetime.fromtimestamp(
+                            path.stat().st_mtime, tz=timezone.utc
+                        ),
+                    }
+                )
+        for start in range(0, len(entries), self.PAGE_SIZE):
+            self.list_calls += 1
+            page = entries[start : start + self.PAGE_SIZE]
+            yield {
+                "Contents": [e for e in page if "Key" in e],
+                "CommonPrefixes": [e for e in page if "Prefix" in e],
+            }
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        path = self.root / Bucket / Key
+        if not path.is_file():
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": path.stat().st_size, "ContentType": "text/plain"}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None) -> Dict[str, Any]:
+        path = self.root / Bucket / Key
+        if not path.is_file():
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body = path.read_bytes()
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            body = body[int(start) : int(end) + 1]
+        return {"Body": io.BytesIO(body), "ContentType": "text/plain"}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs: Any) -> Dict[str, Any]:
+        self.put(Bucket, Key, Body)
+        return {}
+
+
+class LengthEmbedder:
+    """Embeds each text as [len(text), 1] and records batch sizes."""
+
+    def __init__(self):
+        self.batches: List[int] = []
+
+    def encode(self, texts: List[str], batch_size: int, normalize_embeddings: bool) -> np.ndarray:
+        self.batches.append(len(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+class RecordingIndex:
+    """Pinecone index stand-in that records upserts, optionally to a directory."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.upserts: List[Dict[str, Any]] = []
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str) -> None:
+        self.upserts.append({"namespace": namespace, "ids": [v["id"] for v in vectors]})
+        if self.directory:
+            with open(os.path.join(self.directory, f"upserts-{os.getpid()}.jsonl"), "a") as f:
+                f.write(json.dumps(self.upserts[-1]) + "\n")
+
+
+def make_embedder(model_name: str) -> LengthEmbedder:
+    return LengthEmbedder()
+
+
+def make_sink(glue_job: Any, directory: str, options: Any) -> Any:
+    return glue_job.PineconeSink(RecordingIndex(directory), options.upsert_batch_size)
+
+
+def seed(s3: DirectoryS3, tenants: int, documents: int) -> None:
+    for t in range(tenants):
+        for d in range(documents):
+            s3.put(
+                "bucket",
+                f"documents/tenant-{t}/doc-{d}",
+                f"Document {d} of tenant {t}. It has two sentences.".encode(),
+            )
+    s3.put("bucket", "documents/tenant-0/notes.bin", b"\x00")
+
+
+@pytest.mark.unit
+def test_listing_follows_every_page(glue_job, tmp_path):
+    """Test that listing returns every key past the first page and skips non-documents."""
+    s3 = DirectoryS3(str(tmp_path))
+    seed(s3, tenants=3, documents=5)
+
+    prefixes, top_level = glue_job.list_prefixes(s3, "bucket", "documents/")
+    entries = list(glue_job.list_partition_objects(prefixes, "bucket", s3_factory=lambda: s3))
+    keys = [entry[0] for entry in entries]
+
+    assert prefixes == ["documents/tenant-0/", "documents/tenant-1/", "documents/tenant-2/"]
+    assert top_level == []
+    assert len(keys) == 15 and "documents/tenant-0/notes.bin" not in keys
+    assert s3.list_calls > 4
+    assert (
+        entries[0][1] == hashlib.md5(b"Document 0 of tenant 0. It has two sentences.").hexdigest()
+    )
+
+
+@pytest.mark.unit
+def test_manifest_diff_classification(glue_job):
+    """Test that only new and changed documents are selected and missing ones are deleted."""
+    before = ("documents/t/doc", "etag-1", 10, 1000)
+
+    assert glue_job.classify(before, None) == glue_job.NEW
+    assert glue_job.classify(before, before) == glue_job.UNCHANGED
+    assert glue_job.classify(("documents/t/doc", "etag-1", 10, 2000), before) == glue_job.UNCHANGED
+    assert glue_job.classify(("documents/t/doc", "etag-2", 10, 2000), before) == glue_job.CHANGED
+    assert glue_job.classify(None, before) == glue_job.DELETED
+    assert glue_job.document_location("documents/t/doc.pdf", "documents/") == ("t", "doc")
+    assert json.loads(
+        glue_job.cleanup_entry("documents/t/doc.pdf", "documents/", chunks_count=3)
+    ) == {"key": "documents/t/doc.pdf", "namespace": "t", "document_id": "doc", "chunks_count": 3}
+
+
+@pytest.mark.unit
+def test_partition_reuses_clients_and_batches_work(glue_job, tmp_path, monkeypatch):
+    """Test that a partition creates its clients once and batches embeddings and upserts."""
+    s3 = DirectoryS3(str(tmp_path))
+    seed(s3, tenants=2, documents=3)
+    s3.put("bucket", "documents/tenant-1/broken.pdf", b"not a pdf")
+    keys = sorted(entry[0] for entry in glue_job.list_objects(s3, "bucket", "documents/"))
+    created = {"s3": 0, "embedder": 0, "sink": 0}
+    embedder = LengthEmbedder()
+    index = RecordingIndex()
+
+    def count(name, value):
+        created[name] += 1
+        return value
+
+    options = glue_job.JobOptions(bucket="bucket", embedding_batch_size=4, upsert_batch_size=3)
+    results = list(
+        glue_job.process_partition(
+            keys,
+            options,
+            s3_factory=lambda: count("s3", s3),
+            embedder_factory=lambda name: count("embedder", embedder),
+            sink_factory=lambda options: count(
+                "sink", glue_job.PineconeSink(index, options.upsert_batch_size)
+            ),
+        )
+    )
+
+    assert created == {"s3": 1, "embedder": 1, "sink": 1}
+    assert embedder.batches == [4, 2]
+    assert [len(u["ids"]) for u in index.upserts if u["namespace"] == "tenant-0"] == [3]
+    assert {u["namespace"] for u in index.upserts} == {"tenant-0", "tenant-1"}
+    assert [r["status"] for r in results].count("processed") == 6
+    failed = [r for r in results if r["status"] == "failed"]
+    assert len(failed) == 1 and failed[0]["document_path"].endswith("broken.pdf")
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_job_runs_incrementally_on_local_spark(glue_job, tmp_path, monkeypatch):
+    """Test the job on a local Spark master: a second run only processes the change set."""
+    pyspark = pytest.importorskip("pyspark")
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join([str(REPO_ROOT), str(GLUE_DIR)]))
+    s3 = DirectoryS3(str(tmp_path / "s3"))
+    seed(s3, tenants=4, documents=5)
+    upserts = tmp_path / "upserts"
+    upserts.mkdir()
+    options = glue_job.JobOptions(bucket="bucket", embedding_batch_size=3, upsert_batch_size=2)
+
+    sc = pyspark.SparkContext("local[2]", "document-ingestion-test")
+
+    def run(name):
+        return glue_job.run(
+            sc,
+            options,
+            results_path=str(tmp_path / name),
+            manifest_root=str(tmp_path / "manifests"),
+            num_partitions=3,
+            s3_factory=partial(DirectoryS3, str(tmp_path / "s3")),
+            embedder_factory=make_embedder,
+            sink_factory=partial(make_sink, glue_job, str(upserts)),
+        )
+
+    def lines(directory):
+        return [line for part in directory.glob("part-*") for line in part.read_text().splitlines()]
+
+    try:
+        first = run("first")
+        s3.put("bucket", "documents/tenant-0/doc-0", b"Rewritten document.")
+        s3.put("bucket", "documents/tenant-3/doc-9", b"A brand new document.")
+        (tmp_path / "s3" / "bucket" / "documents" / "tenant-1" / "doc-2").unlink()
+        second = run("second")
+    finally:
+        sc.stop()
+
+    assert first == {"processed": 20, "failed": 0, "chunks": 20, "unchanged": 0, "deleted": 0}
+    assert len(lines(tmp_path / "first" / "processed")) == 20
+    ids = [
+        i
+        for f in upserts.iterdir()
+        for line in f.read_text().splitlines()
+        for i in json.loads(line)["ids"]
+    ]
+    assert len(ids) == 22
+
+    assert second == {"processed": 2, "failed": 0, "chunks": 2, "unchanged": 18, "deleted": 1}
+    deleted = [json.loads(line) for line in lines(tmp_path / "second" / "deleted")]
+    assert deleted == [
+        {"key": "documents/tenant-1/doc-2", "namespace": "tenant-1", "document_id": "doc-2"}
+    ]
+    changed = [json.loads(line) for line in lines(tmp_path / "second" / "changed")]
+    assert changed == [
+        {
+            "key": "documents/tenant-0/doc-0",
+            "namespace": "tenant-0",
+            "document_id": "doc-0",
+            "chunks_count": 1,
+        }
+    ]
+    assert lines(tmp_path / "first" / "changed") == []
@@ -0,0 +1,197 @@
+"""
+Unit tests for background document ingestion jobs.
+"""
+
+import asyncio
+
+import pytest
+
+import app.services.document.worker as worker_module
+from app.core.config import settings
+from app.services.document.ingestion import IngestionReport
+from app.services.document.jobs import (
+    CANCELLED,
+    COMPLETED,
+    FAILED,
+    IngestionJob,
+    close_job_queue,
+    get_job_queue,
+    init_job_queue,
+)
+from app.services.document.parser import extract_text
+from app.services.document.storage import DOCX, TEXT
+from app.services.document.worker import IngestionWorkerPool
+from app.services.rag.partitions import close_partitions, get_partitions, init_partitions
+
+
+@pytest.fixture
+async def worker_pool(fake_s3, fake_embeddings):
+    init_partitions()
+    queue = init_job_queue()
+    pool = IngestionWorkerPool(
+        queue, workers=1, processes=1, lease_seconds=60, client_factory=fake_s3.session
+    )
+    yield pool
+    await pool.stop()
+    close_job_queue()
+    await close_partitions()
+
+
+def text_job(fake_s3, document_id: str, body: bytes) -> IngestionJob:
+    fake_s3.objects[document_id] = body
+    return IngestionJob(
+        document_id=document_id,
+        tenant_id="acme",
+        bucket="bucket",
+        key=document_id,
+        content_type=TEXT,
+        filename=f"{document_id}.txt",
+    )
+
+
+@pytest.mark.unit
+def test_extract_docx_paragraphs(tmp_path):
+    """Test that DOCX paragraphs come back in order as separate pieces."""
+    import docx
+
+    document = docx.Document()
+    document.add_paragraph("First paragraph.")
+    document.add_paragraph("Second paragraph.")
+    path = str(tmp_path / "doc.docx")
+    document.save(path)
+
+    assert extract_text(path, DOCX) == ["First paragraph.\n\n", "Second paragraph.\n\n"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_job_is_parsed_embedded_and_indexed(worker_pool, fake_s3, monkeypatch):
+    """Test that a processed job indexes its chunks and reports monotonic progress."""
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 60)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 3)
+    body = "\n\n".join(
+        f"Paragraph {i} covers topic {i} in one sentence." for i in range(10)
+    ).encode()
+    queue = worker_pool.queue
+    job = text_job(fake_s3, "doc-1", body)
+    await queue.enqueue(job)
+
+    progress = []
+    update = queue.update
+
+    async def record(job, **changes):
+        await update(job, **changes)
+        progress.append(job.progress)
+
+    monkeypatch.setattr(queue, "update", record)
+    await worker_pool.process(await queue.claim(timeout=1.0))
+
+    stored = await queue.get("doc-1")
+    assert stored.status == COMPLETED and stored.error is None
+    assert stored.chunks_count == 10 and stored.attempts == 1
+    assert progress == sorted(progress) and progress[-1] == 1.0
+    assert len(set(progress)) > 3
+    partition = get_partitions().get("acme")
+    assert partition.store.ntotal == 10
+    assert partition.store.records[0].metadata["filename"] == "doc-1.txt"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_job_records_error(worker_pool, fake_s3):
+    """Test that a job whose source is missing is marked failed instead of crashing the worker."""
+    queue = worker_pool.queue
+    job = text_job(fake_s3, "doc-2", b"text")
+    del fake_s3.objects["doc-2"]
+    await queue.enqueue(job)
+
+    await worker_pool.process(await queue.claim(timeout=1.0))
+
+    stored = await queue.get("doc-2")
+    assert stored.status == FAILED
+    assert "doc-2" in stored.error
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_running_job_renews_its_lease(worker_pool, fake_s3, monkeypatch):
+    """Test that a job outliving its lease heartbeats until it finishes."""
+    worker_pool.lease_seconds = 0.3
+    queue = worker_pool.queue
+    await queue.enqueue(text_job(fake_s3, "doc-4", b"text"))
+
+    async def slow_ingest(tenant_id, document_id, *args, **kwargs):
+        await asyncio.sleep(0.5)
+        return IngestionReport(document_id=document_id)
+
+    heartbeats = []
+    heartbeat = queue.heartbeat
+
+    async def record(job):
+        await heartbeat(job)
+        heartbeats.append(job.updated_at)
+
+    monkeypatch.setattr(worker_module, "ingest_text", slow_ingest)
+    monkeypatch.setattr(queue, "heartbeat", record)
+    await worker_pool.process(await queue.claim(timeout=1.0))
+
+    assert len(heartbeats) >= 4
+    assert (await queue.get("doc-4")).status == COMPLETED
+    finished = len(heartbeats)
+    await asyncio.sleep(0.2)
+    assert len(heartbeats) == finished
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_document_deleted_during_ingestion_stays_deleted(worker_pool, fake_s3, monkeypatch):
+    """Test that a job whose document is deleted as it finishes removes what it indexed."""
+    queue = worker_pool.queue
+    await queue.enqueue(text_job(fake_s3, "doc-5", b"Some text worth indexing."))
+    ingest = worker_module.ingest_text
+
+    async def ingest_then_delete(tenant_id, document_id, *args, **kwargs):
+        report = await ingest(tenant_id, document_id, *args, **kwargs)
+        await queue.cancel(await queue.get(document_id))
+        return report
+
+    monkeypatch.setattr(worker_module, "ingest_text", ingest_then_delete)
+    await worker_pool.process(await queue.claim(timeout=1.0))
+
+    assert (await queue.get("doc-5")).status == CANCELLED
+    assert get_partitions().get("acme").store.ntotal == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_cancelled_job_is_not_claimed(worker_pool, fake_s3):
+    """Test that a job cancelled while queued is skipped by workers."""
+    queue = worker_pool.queue
+    job = text_job(fake_s3, "doc-6", b"text")
+    await queue.enqueue(job)
+    await queue.cancel(job)
+
+    assert await queue.claim(timeout=0.1) is None
+
+
+@pytest.mark.unit
+def test_document_status_is_tenant_scoped(client, auth_headers, fake_s3):
+    """Test that an upload is queued and its status is only visible to its tenant."""
+    response = client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("notes.txt", b"some notes", TEXT)},
+        headers=auth_headers,
+    )
+    document_id = response.json()["document_id"]
+    assert response.json()["status"] == "queued"
+
+    status = client.get(f"/api/v1/documents/{document_id}", headers=auth_headers)
+    assert status.status_code == 200
+    assert status.json()["status"] == "queued"
+    assert status.json()["chunks_count"] == 0
+
+    queue = get_job_queue()
+    queue._jobs[document_id].tenant_id = "someone-else"
+    assert client.get(f"/api/v1/documents/{document_id}", headers=auth_headers).status_code == 404
+    assert client.get("/api/v1/documents/unknown", headers=auth_headers).status_code == 404
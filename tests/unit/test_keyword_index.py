@@ -0,0 +1,150 @@
+"""
+Unit tests for the BM25 keyword index and rank fusion.
+"""
+
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from app.services.rag.fusion import reciprocal_rank_fusion
+from app.services.rag.keyword_index import KEYWORD_INDEX_FILE, KeywordIndex, tokenize
+from app.services.vector import ChunkRecord, SearchHit
+
+VOCABULARY = [f"term{i}" for i in range(40)]
+
+
+def make_corpus(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        ChunkRecord(
+            chunk_id=f"chunk-{i}",
+            document_id=f"doc-{i}",
+            content=" ".join(rng.choices(VOCABULARY, k=rng.randint(5, 60))),
+        )
+        for i in range(size)
+    ]
+
+
+def brute_force_bm25(records, query, k1=1.2, b=0.75):
+    docs = [Counter(tokenize(r.content)) for r in records]
+    avg_length = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(1 for d in docs if term in d)
+        if df == 0:
+            continue
+        idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+        for record, d in zip(records, docs, strict=True):
+            tf = d.get(term, 0)
+            if tf:
+                norm = k1 * (1 - b + b * sum(d.values()) / avg_length)
+                scores[record.chunk_id] = scores.get(record.chunk_id, 0.0) + idf * tf * (k1 + 1) / (
+                    tf + norm
+                )
+    return scores
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("query", ["term1 term2", "term3 term17 term29 term39", "term0"])
+def test_maxscore_matches_exhaustive_bm25(query):
+    """Test that early termination returns the exact BM25 top-k."""
+    records = make_corpus(1000)
+    index = KeywordIndex()
+    index.add(records)
+
+    hits = index.search(query, top_k=10)
+    expected = brute_force_bm25(records, query)
+    expected_top = sorted(expected.values(), reverse=True)[:10]
+
+    assert [hit.score for hit in hits] == pytest.approx(expected_top, rel=1e-4)
+    for hit in hits:
+        assert hit.score == pytest.approx(expected[hit.record.chunk_id], rel=1e-4)
+
+
+@pytest.mark.unit
+def test_incremental_adds_and_deletes_match_exhaustive_bm25():
+    """Test that batched adds and tombstones still return the exact BM25 top-k."""
+    records = make_corpus(1000, seed=11)
+    index = KeywordIndex()
+    for start in range(0, len(records), 90):
+        index.add(records[start : start + 90])
+    deleted = {f"doc-{i}" for i in range(0, 1000, 3)}
+    for document_id in deleted:
+        index.delete_document(document_id)
+
+    query = "term4 term8 term15"
+    hits = index.search(query, top_k=10)
+    # Tombstoned chunks still count towards the corpus statistics until compaction
+    expected = {
+        chunk_id: score
+        for chunk_id, score in brute_force_bm25(records, query).items()
+        if f"doc-{chunk_id.split('-')[1]}" not in deleted
+    }
+    expected_top = sorted(expected.values(), reverse=True)[:10]
+
+    assert [hit.score for hit in hits] == pytest.approx(expected_top, rel=1e-4)
+    assert all(hit.record.document_id not in deleted for hit in hits)
+
+
+@pytest.mark.unit
+def test_unknown_terms_return_nothing():
+    """Test that a query with no indexed terms returns no hits."""
+    index = KeywordIndex()
+    index.add(make_corpus(10))
+
+    assert index.search("nonexistent words", top_k=5) == []
+
+
+@pytest.mark.unit
+def test_save_and_load_round_trip(tmp_path):
+    """Test that a saved index answers queries identically after loading."""
+    index = KeywordIndex()
+    index.add(make_corpus(300))
+    index.save(str(tmp_path))
+
+    loaded = KeywordIndex.load(str(tmp_path))
+
+    assert loaded.ntotal == 300
+    assert [h.record.chunk_id for h in loaded.search("term5 term6", 5)] == [
+        h.record.chunk_id for h in index.search("term5 term6", 5)
+    ]
+
+
+@pytest.mark.unit
+def test_saves_append_changes_to_a_delta_log(tmp_path):
+    """Test that small saves leave the snapshot alone until the log is folded."""
+    records = make_corpus(300)
+    index = KeywordIndex()
+    index.add(records[:250])
+    index.save(str(tmp_path))
+    snapshot = (tmp_path / KEYWORD_INDEX_FILE).read_bytes()
+
+    index.add(records[250:])
+    index.delete_document("doc-7")
+    index.save(str(tmp_path))
+    assert (tmp_path / KEYWORD_INDEX_FILE).read_bytes() == snapshot
+
+    loaded = KeywordIndex.load(str(tmp_path))
+    assert loaded.ntotal == 299
+    assert [h.record.chunk_id for h in loaded.search("term5 term6", 5)] == [
+        h.record.chunk_id for h in index.search("term5 term6", 5)
+    ]
+
+    loaded.compact()
+    loaded.save(str(tmp_path))
+    assert (tmp_path / KEYWORD_INDEX_FILE).read_bytes() != snapshot
+    assert KeywordIndex.load(str(tmp_path)).ntotal == 299
+
+
+@pytest.mark.unit
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Test that chunks ranked by both retrievers rise to the top."""
+    records = {name: ChunkRecord(chunk_id=name, document_id=name, content="") for name in "abcd"}
+    semantic = [SearchHit(records[n], 0.9) for n in ["a", "b", "c"]]
+    keyword = [SearchHit(records[n], 12.0) for n in ["c", "d", "b"]]
+
+    fused = reciprocal_rank_fusion([semantic, keyword], top_k=3)
+
+    assert [hit.record.chunk_id for hit in fused] == ["c", "b", "a"]
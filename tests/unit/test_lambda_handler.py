@@ -0,0 +1,281 @@
+"""
+Unit tests for the Lambda SQS ingestion path.
+"""
+
+import dataclasses
+import json
+import subprocess
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+LAMBDA_DIR = Path(__file__).resolve().parents[2] / "aws" / "lambda"
+
+
+@pytest.fixture
+def handler(monkeypatch, fake_s3):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.syspath_prepend(str(LAMBDA_DIR))
+    import handler
+
+    # Every test starts as a fresh execution environment
+    monkeypatch.setattr(handler, "_resources", {})
+    handler._resources["s3"] = fake_s3.sync()
+    monkeypatch.setattr(handler, "_cold_start", True)
+    yield handler
+    loop = handler._resources.get("event_loop")
+    if loop is not None:
+        loop.close()
+
+
+class FakeQueue:
+    """Local SQS stand-in that redelivers only the messages reported as failed."""
+
+    def __init__(self):
+        self._messages: deque = deque()
+        self._next_id = 0
+
+    def send(self, body: Any) -> str:
+        self._next_id += 1
+        message_id = f"msg-{self._next_id}"
+        self._messages.append((message_id, body if isinstance(body, str) else json.dumps(body)))
+        return message_id
+
+    def receive(self, max_messages: int = 10) -> List[Dict[str, Any]]:
+        batch = [self._messages.popleft() for _ in range(min(max_messages, len(self._messages)))]
+        return [{"messageId": mid, "body": body, "eventSource": "aws:sqs"} for mid, body in batch]
+
+    def settle(self, records: List[Dict[str, Any]], response: Dict[str, Any]) -> None:
+        failed = {item["itemIdentifier"] for item in response["batchItemFailures"]}
+        self._messages.extend(
+            (r["messageId"], r["body"]) for r in records if r["messageId"] in failed
+        )
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+
+class Recorder:
+    """Records embedding batches and upserts made by the handler."""
+
+    def __init__(self, fail_on: str = ""):
+        self.embed_batches: List[int] = []
+        self.upserts: Dict[str, List[str]] = {}
+        self.fail_on = fail_on
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self.embed_batches.append(len(texts))
+        if any(self.fail_on and self.fail_on in text for text in texts):
+            raise RuntimeError("embedding failed")
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def upsert(self, namespace: str, vectors: List[Dict[str, Any]]) -> None:
+        self.upserts.setdefault(namespace, []).extend(v["id"] for v in vectors)
+
+
+@pytest.fixture
+def recorder(handler, monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(handler, "embed", recorder.embed)
+    monkeypatch.setattr(handler, "upsert", recorder.upsert)
+    return recorder
+
+
+def s3_notification(bucket: str, key: str) -> Dict[str, Any]:
+    return {
+        "Records": [
+            {"eventSource": "aws:s3", "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+        ]
+    }
+
+
+@pytest.mark.unit
+def test_parse_sqs_message_formats(handler):
+    """Test that S3 notifications, plain messages and S3 test events are all understood."""
+    notification = {"body": json.dumps(s3_notification("bucket", "documents/acme/my+report.pdf"))}
+    assert handler.parse_sqs_message(notification) == [("bucket", "documents/acme/my report.pdf")]
+    assert handler.parse_sqs_message({"body": json.dumps({"bucket": "b", "key": "k"})}) == [
+        ("b", "k")
+    ]
+    assert handler.parse_sqs_message({"body": json.dumps({"Event": "s3:TestEvent"})}) == []
+
+
+@pytest.mark.unit
+def test_poison_messages_are_the_only_failures(handler, recorder, fake_s3):
+    """Test that one SQS batch shares embedding calls and reports only its bad messages."""
+    queue = FakeQueue()
+    for i in range(3):
+        fake_s3.objects[f"documents/acme/doc-{i}"] = f"Document {i} body text.".encode()
+        queue.send(s3_notification("bucket", f"documents/acme/doc-{i}"))
+    poison = queue.send("not json")
+    missing = queue.send({"bucket": "bucket", "key": "documents/acme/missing"})
+
+    records = queue.receive()
+    response = handler.lambda_handler({"Records": records}, None)
+    queue.settle(records, response)
+
+    assert {item["itemIdentifier"] for item in response["batchItemFailures"]} == {poison, missing}
+    assert recorder.embed_batches == [3]
+    assert sorted(recorder.upserts["acme"]) == ["doc-0:0", "doc-1:0", "doc-2:0"]
+    assert len(queue) == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_embedding_failure_only_fails_its_batch(handler, recorder, fake_s3, monkeypatch):
+    """Test that a failed embedding batch fails only the messages whose chunks it held."""
+    monkeypatch.setitem(
+        handler._resources,
+        "config",
+        dataclasses.replace(handler.get_config(), embedding_batch_size=2),
+    )
+    recorder.fail_on = "poisoned"
+    queue = FakeQueue()
+    ids = []
+    for i, text in enumerate(["First text.", "Second text.", "A poisoned text.", "Fourth text."]):
+        fake_s3.objects[f"documents/acme/doc-{i}"] = text.encode()
+        ids.append(queue.send({"bucket": "bucket", "key": f"documents/acme/doc-{i}"}))
+
+    response = await handler.process_sqs_batch(queue.receive())
+
+    assert [item["itemIdentifier"] for item in response["batchItemFailures"]] == ids[2:]
+    assert recorder.embed_batches == [2, 2]
+    assert sorted(recorder.upserts["acme"]) == ["doc-0:0", "doc-1:0"]
+
+
+@pytest.mark.unit
+def test_heavy_modules_are_not_imported_at_load_time():
+    """Test that loading the handler defers AWS SDK, numeric and model imports."""
+    heavy = [
+        "boto3",
+        "aioboto3",
+        "numpy",
+        "sentence_transformers",
+        "pinecone",
+        "app.services.document.chunker",
+    ]
+    script = (
+        f"import sys; sys.path.insert(0, {str(LAMBDA_DIR)!r}); import handler; "
+        f"print([m for m in {heavy!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=LAMBDA_DIR.parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.unit
+def test_cold_start_metric_is_emitted_once(handler, capsys):
+    """Test that only the first invocation logs the embedded cold-start metric."""
+    event = {"httpMethod": "GET", "path": "/unknown"}
+    context = type("Context", (), {"function_name": "ingest", "function_version": "7"})()
+
+    assert handler.lambda_handler(event, context)["statusCode"] == 404
+    assert handler.lambda_handler(event, context)["statusCode"] == 404
+
+    metrics = [
+        json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")
+    ]
+    assert len(metrics) == 1
+    metric = metrics[0]
+    assert metric["function_name"] == "ingest" and metric["ColdStart"] == 1
+    assert metric["ImportDuration"] > 0
+    names = [m["Name"] for m in metric["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+    assert names == ["ColdStart", "ImportDuration", "InitDuration"]
+
+
+@pytest.mark.unit
+def test_resources_are_reused_across_invocations(handler, recorder, fake_s3):
+    """Test that clients, settings and the event loop survive between warm invocations."""
+    assert handler.get_s3_client() is handler.get_s3_client()
+    config = handler.get_config()
+
+    fake_s3.objects["documents/acme/doc"] = b"Some text."
+    event = {
+        "Records": [
+            {
+                "messageId": "m1",
+                "eventSource": "aws:sqs",
+                "body": json.dumps({"bucket": "b", "key": "documents/acme/doc"}),
+            }
+        ]
+    }
+    handler.lambda_handler(event, None)
+    loop = handler._resources["event_loop"]
+    handler.lambda_handler(event, None)
+
+    assert handler._resources["event_loop"] is loop and not loop.is_closed()
+    assert handler.get_config() is config
+
+
+@pytest.mark.unit
+def test_s3_event_streams_document_in_range_reads(handler, recorder, fake_s3, monkeypatch):
+    """Test that a direct S3 notification is read in ranged GETs, embedded and upserted."""
+    monkeypatch.setitem(
+        handler._resources,
+        "config",
+        dataclasses.replace(handler.get_config(), embedding_batch_size=2),
+    )
+    fake_s3.objects["documents/acme/my report.txt"] = " ".join(
+        f"Sentence number {i}." for i in range(400)
+    ).encode()
+
+    response = handler.lambda_handler(
+        s3_notification("bucket", "documents/acme/my+report.txt"), None
+    )
+
+    assert response["statusCode"] == 200
+    chunk_ids = recorder.upserts["acme"]
+    assert len(chunk_ids) > 2 and chunk_ids[0] == "my report:0"
+    assert set(recorder.embed_batches) <= {1, 2}
+    assert handler._resources["s3"].ranges
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("source", ["s3", "sqs"])
+def test_chunks_are_embedded_as_they_are_read(handler, recorder, monkeypatch, source):
+    """Test that embedding starts before a document has been fully chunked."""
+    monkeypatch.setitem(
+        handler._resources,
+        "config",
+        dataclasses.replace(handler.get_config(), embedding_batch_size=2),
+    )
+    events = []
+
+    def read_chunks(client, bucket, key, chunker):
+        for i in range(6):
+            events.append("chunk")
+            yield f"doc:{i}", f"Chunk {i}."
+
+    embed = recorder.embed
+
+    def record_embed(texts):
+        events.append("embed")
+        return embed(texts)
+
+    monkeypatch.setattr(handler, "read_chunks", read_chunks)
+    monkeypatch.setattr(handler, "embed", record_embed)
+    if source == "s3":
+        handler.lambda_handler(s3_notification("bucket", "documents/acme/doc.txt"), None)
+    else:
+        message = {"bucket": "bucket", "key": "documents/acme/doc.txt"}
+        handler.lambda_handler(
+            {
+                "Records": [
+                    {"messageId": "m1", "eventSource": "aws:sqs", "body": json.dumps(message)}
+                ]
+            },
+            None,
+        )
+
+    assert recorder.embed_batches == [2, 2, 2]
+    assert events.index("embed") < len(events) - 1 - events[::-1].index("chunk")
+    assert recorder.upserts["acme"] == [f"doc:{i}" for i in range(6)]
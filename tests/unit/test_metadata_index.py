@@ -0,0 +1,87 @@
+"""
+Unit tests for metadata bitmaps and pre-filtered vector search.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.vector import ChunkRecord, FaissVectorStore
+from app.services.vector.metadata_index import Bitmap, MetadataIndex
+
+
+@pytest.mark.unit
+def test_bitmap_set_operations_match_python_sets():
+    """Test AND/OR across sparse array and dense bitset containers."""
+    rng = np.random.default_rng(0)
+    dense = set(rng.integers(0, 200_000, 60_000).tolist())
+    sparse = set(rng.integers(0, 200_000, 3_000).tolist())
+
+    a, b = Bitmap(dense), Bitmap(sparse)
+
+    assert len(a) == len(dense)
+    assert (a & b).to_array().tolist() == sorted(dense & sparse)
+    assert (a | b).to_array().tolist() == sorted(dense | sparse)
+    assert (a & a).to_array().tolist() == sorted(dense)
+
+
+@pytest.mark.unit
+def test_metadata_filters_and_fields_or_values():
+    """Test that values within a field are OR-ed and fields are AND-ed."""
+    index = MetadataIndex()
+    index.add(0, {"source": "wiki", "tags": ["a", "b"]})
+    index.add(1, {"source": "web", "tags": ["b"]})
+    index.add(2, {"source": "wiki", "tags": ["c"]})
+
+    assert index.select({"source": "wiki"}).to_array().tolist() == [0, 2]
+    assert index.select({"source": ["wiki", "web"], "tags": "b"}).to_array().tolist() == [0, 1]
+    assert len(index.select({"source": "missing"})) == 0
+
+
+@pytest.fixture
+def filtered_store(request, monkeypatch):
+    monkeypatch.setattr(settings, "IVF_NLIST", 32)
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((3000, 16)).astype(np.float32)
+    records = [
+        ChunkRecord(
+            chunk_id=f"chunk-{i}",
+            document_id=f"doc-{i // 10}",
+            content="",
+            metadata={"bucket": i % 50},
+        )
+        for i in range(len(vectors))
+    ]
+    store = FaissVectorStore(dimension=16, index_type=request.param)
+    store.add(records, vectors)
+    return store, vectors
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("filtered_store", ["hnsw", "ivf_flat"], indirect=True)
+@pytest.mark.parametrize("brute_force_max", [0, 100_000])
+def test_filtered_search_fills_top_k_with_matches(filtered_store, brute_force_max, monkeypatch):
+    """Test that a selective filter still returns top_k matching chunks on both paths."""
+    monkeypatch.setattr(settings, "FILTER_BRUTE_FORCE_MAX", brute_force_max)
+    store, vectors = filtered_store
+
+    hits = store.search(vectors[7], top_k=10, similarity_threshold=-1.0, filters={"bucket": 7})
+
+    assert len(hits) == 10
+    assert all(hit.record.metadata["bucket"] == 7 for hit in hits)
+    assert hits[0].record.chunk_id == "chunk-7"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("filtered_store", ["hnsw"], indirect=True)
+def test_document_id_is_filterable(filtered_store):
+    """Test that chunks can be filtered by document_id."""
+    store, vectors = filtered_store
+
+    hits = store.search(
+        vectors[0], top_k=20, similarity_threshold=-1.0, filters={"document_id": "doc-3"}
+    )
+
+    assert sorted(hit.record.chunk_id for hit in hits) == sorted(
+        f"chunk-{i}" for i in range(30, 40)
+    )
@@ -0,0 +1,109 @@
+"""
+Unit tests for multi-format and page-parallel document parsing.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import DOCUMENT_PAGES_PARSED
+from app.services.document.ingestion import ingest_text
+from app.services.document.parallel_parser import parse_document
+from app.services.document.parser import HTML, MARKDOWN, PDF, PPTX, Page, iter_document
+from app.services.llm.chunk_embeddings import (
+    close_chunk_embedding_store,
+    init_chunk_embedding_store,
+)
+from app.services.rag.diversity import merge_adjacent
+from app.services.rag.partitions import close_partitions, get_partitions, init_partitions
+from app.services.vector import SearchHit
+from tests.unit.test_range_file import make_pdf
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_pdf_page_ranges_are_parsed_in_parallel_and_in_order(tmp_path):
+    """Test that a PDF split across worker processes comes back in page order with its throughput."""
+    path = tmp_path / "report.pdf"
+    path.write_bytes(make_pdf(12))
+    before = DOCUMENT_PAGES_PARSED.labels(format="pdf")._value.get()
+
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        report = await parse_document(str(path), PDF, pool, pages_per_task=5)
+
+    assert report.tasks == 3
+    assert [page.number for page in report.pages] == list(range(1, 13))
+    assert all(f"Page {i} text" in page.text for i, page in enumerate(report.pages))
+    assert report.pages_per_second > 0 and report.as_dict()["pages"] == 12
+    assert DOCUMENT_PAGES_PARSED.labels(format="pdf")._value.get() == before + 12
+
+
+@pytest.mark.unit
+def test_slides_html_and_markdown_are_extracted(tmp_path):
+    """Test that PPTX slides are numbered and markup is reduced to its visible text."""
+    from pptx import Presentation
+
+    presentation = Presentation()
+    for title in ("Quarterly results", "Next steps"):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = title
+        slide.placeholders[1].text = f"Details on {title.lower()}"
+    deck = tmp_path / "deck.pptx"
+    presentation.save(str(deck))
+
+    slides = list(iter_document(str(deck), PPTX))
+    assert [slide.number for slide in slides] == [1, 2]
+    assert "Next steps" in slides[1].text and "Details on next steps" in slides[1].text
+
+    page = tmp_path / "page.html"
+    page.write_text(
+        "<html><head><style>p {}</style><script>var x;</script></head>"
+        "<body><h1>Title</h1><p>Body text.</p></body></html>"
+    )
+    (html,) = iter_document(str(page), HTML)
+    assert html.number is None and html.text == "Title\nBody text.\n\n"
+
+    notes = tmp_path / "notes.md"
+    notes.write_text("# Heading\n\nSome *emphasis* and a [link](http://example.com).\n")
+    (markdown,) = iter_document(str(notes), MARKDOWN)
+    assert markdown.text == "Heading\nSome emphasis and a link.\n\n"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_ingested_chunks_carry_page_numbers(fake_embeddings, monkeypatch):
+    """Test that chunks record the pages they span and merged hits keep the last page."""
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 60)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    pages = [
+        Page(number, f"Page {number} covers topic {number} in one sentence.\n\n")
+        for number in (1, 2, 3)
+    ]
+    init_chunk_embedding_store()
+    init_partitions()
+    try:
+        report = await ingest_text("acme", "doc", pages)
+        records = sorted(
+            get_partitions().get("acme").store.records, key=lambda r: r.metadata["chunk_index"]
+        )
+    finally:
+        await close_partitions()
+        close_chunk_embedding_store()
+
+    assert report.chunks == 3
+    assert [(r.metadata["page"], r.metadata["page_end"]) for r in records] == [
+        (1, 1),
+        (2, 2),
+        (3, 3),
+    ]
+
+    hits = [
+        SearchHit(label=i, score=1.0 - i / 10, record=record)
+        for i, record in enumerate(records[1:])
+    ]
+    (merged,) = merge_adjacent(hits, max_overlap=0)
+    assert merged.record.metadata["page"] == 2 and merged.record.metadata["page_end"] == 3
@@ -0,0 +1,213 @@
+"""
+Unit tests for per-tenant partitions.
+"""
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.security import create_access_token, get_tenant_id
+from app.services.rag.indexer import add_chunks
+from app.services.rag.keyword_index import KEYWORD_INDEX_FILE
+from app.services.rag.partitions import PartitionEvictedError, PartitionManager
+from app.services.vector import ChunkRecord, DocumentIndex
+
+DIMENSION = 16
+
+
+def make_records(count: int, prefix: str = "chunk"):
+    return [
+        ChunkRecord(
+            chunk_id=f"{prefix}-{i}",
+            document_id=f"{prefix}-doc-{i % 4}",
+            content=f"{prefix} text {i}",
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    rng = np.random.default_rng(7)
+    return rng.standard_normal((300, DIMENSION)).astype(np.float32)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch) -> PartitionManager:
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", DIMENSION)
+    return PartitionManager(str(tmp_path), max_loaded=2)
+
+
+@pytest.mark.unit
+def test_tenant_claim_falls_back_to_subject(monkeypatch):
+    """Test that the tenant is the configured claim, or the subject without it."""
+    monkeypatch.setattr(settings, "TENANT_CLAIM", "org_id")
+
+    assert get_tenant_id({"sub": "alice", "org_id": "acme"}) == "acme"
+    assert get_tenant_id({"sub": "alice"}) == "alice"
+    with pytest.raises(HTTPException):
+        get_tenant_id({})
+
+
+@pytest.mark.unit
+def test_small_partition_is_exact_then_promoted(manager, monkeypatch, vectors):
+    """Test that a partition searches a flat index until it reaches the ANN threshold."""
+    monkeypatch.setattr(settings, "TENANT_ANN_MIN_VECTORS", 100)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_TYPE", "hnsw")
+    partition = manager.get("acme")
+
+    partition.add(make_records(50), vectors[:50])
+    assert partition.store.index_type == "flat"
+    hits = partition.store.search(vectors[3], top_k=1, similarity_threshold=0.0)
+    assert hits[0].record.chunk_id == "chunk-3"
+
+    partition.add(make_records(150)[50:], vectors[50:150])
+    assert partition.store.index_type == "hnsw"
+    assert partition.store.ntotal == 150
+    hits = partition.store.search(vectors[120], top_k=1, similarity_threshold=0.0)
+    assert hits[0].record.chunk_id == "chunk-120"
+
+
+@pytest.mark.unit
+def test_evicted_partition_is_saved_and_reloaded(manager, vectors):
+    """Test that LRU eviction persists a partition and a later lookup restores it."""
+    first = manager.get("a")
+    first.add(make_records(10, "a"), vectors[:10])
+    manager.get("b")
+    manager.get("c")
+
+    assert len(manager) == 2
+    with pytest.raises(PartitionEvictedError):
+        first.add(make_records(1, "a"), vectors[:1])
+
+    reloaded = manager.get("a")
+    assert reloaded is not first
+    assert reloaded.store.ntotal == 10
+    assert reloaded.keywords.ntotal == 10
+    assert "a-doc-1" in reloaded.documents
+
+
+@pytest.mark.unit
+def test_concurrent_workers_keep_each_others_writes(manager, tmp_path, vectors):
+    """Test that workers writing to one tenant both end up in the published snapshot."""
+    other = PartitionManager(str(tmp_path), max_loaded=2)
+    first = manager.get("acme")
+    second = other.get("acme")
+
+    first.add(make_records(4, "x"), vectors[:4])
+    second.add(make_records(4, "y"), vectors[4:8])
+    first.save()
+    second.remove_document("x-doc-0")
+    second.save()
+
+    # A reader with unpublished writes of its own picks up the other worker's snapshot too
+    first.add(make_records(4, "z"), vectors[8:12])
+    assert manager.get("acme") is first
+    assert first.store.ntotal == first.documents.nchunks == 11
+    first.save()
+
+    latest = PartitionManager(str(tmp_path), max_loaded=2).get("acme")
+    chunk_ids = {record.chunk_id for record in latest.store.records}
+    assert chunk_ids == {
+        "x-1",
+        "x-2",
+        "x-3",
+        "y-0",
+        "y-1",
+        "y-2",
+        "y-3",
+        "z-0",
+        "z-1",
+        "z-2",
+        "z-3",
+    }
+    assert latest.keywords.ntotal == latest.documents.nchunks == 11
+
+
+@pytest.mark.unit
+def test_partition_held_across_a_reload_keeps_its_writes(manager, tmp_path, vectors):
+    """Test that a newer snapshot is loaded into the resident partition rather than a new one."""
+    held = manager.get("acme")
+    held.add(make_records(4, "x"), vectors[:4])
+    held.save()
+    other = PartitionManager(str(tmp_path), max_loaded=2).get("acme")
+    other.add(make_records(4, "y"), vectors[4:8])
+    other.save()
+
+    assert manager.get("acme") is held
+    assert held.store.ntotal == 8
+    held.add(make_records(4, "z"), vectors[8:12])
+    held.save()
+
+    latest = PartitionManager(str(tmp_path), max_loaded=2).get("acme")
+    assert latest.store.ntotal == latest.keywords.ntotal == latest.documents.nchunks == 12
+
+
+@pytest.mark.unit
+def test_compaction_folds_companion_delta_logs(manager, monkeypatch, vectors):
+    """Test that saves append to the companion logs until compaction rewrites the snapshots."""
+    monkeypatch.setattr(settings, "VECTOR_COMPACTION_DEAD_RATIO", 0.2)
+    partition = manager.get("acme")
+    partition.add(make_records(40), vectors[:40])
+    partition.save()
+    snapshots = [partition.path / KEYWORD_INDEX_FILE, partition.path / DocumentIndex.FILE]
+    before = [path.read_bytes() for path in snapshots]
+
+    partition.remove_document("chunk-doc-0")
+    partition.save()
+    assert [path.read_bytes() for path in snapshots] == before
+
+    assert partition.compact()
+    partition.save()
+    assert all(path.read_bytes() != old for path, old in zip(snapshots, before, strict=True))
+    reloaded = PartitionManager(str(manager.root), max_loaded=2).get("acme")
+    assert reloaded.store.ntotal == reloaded.keywords.ntotal == reloaded.documents.nchunks == 30
+
+
+@pytest.mark.unit
+def test_rollback_only_undoes_one_documents_writes(manager, vectors):
+    """Test that rolling back a document keeps other writes made since the checkpoint."""
+    partition = manager.get("acme")
+    partition.add(make_records(4, "x"), vectors[:4])
+    partition.save()
+
+    checkpoint = partition.checkpoint()
+    partition.remove_document("x-doc-1")
+    partition.add(make_records(8, "y"), vectors[4:12])
+    assert partition.rollback(checkpoint, "x-doc-1")
+    assert partition.rollback(checkpoint, "y-doc-2")
+
+    chunk_ids = {record.chunk_id for record in partition.store.records}
+    assert chunk_ids == {"x-0", "x-1", "x-2", "x-3", "y-0", "y-1", "y-3", "y-4", "y-5", "y-7"}
+    partition.save()
+    assert not partition.rollback(checkpoint, "y-doc-0")
+
+
+@pytest.mark.unit
+def test_tenants_only_see_their_own_chunks(
+    client: TestClient, auth_headers, fake_embeddings, tenant_id
+):
+    """Test that a query never returns chunks indexed for another tenant."""
+    text = "quarterly revenue forecast"
+    add_chunks(
+        "other-tenant",
+        [ChunkRecord(chunk_id="theirs", document_id="d-other", content=text)],
+        [fake_embeddings.vector(text)],
+    )
+    add_chunks(
+        tenant_id,
+        [ChunkRecord(chunk_id="mine", document_id="d-mine", content=text)],
+        [fake_embeddings.vector(text)],
+    )
+    query = {"query": text, "top_k": 5, "similarity_threshold": 0.0}
+
+    mine = client.post("/api/v1/retrieval/query", json=query, headers=auth_headers).json()
+    assert [chunk["chunk_id"] for chunk in mine["results"]] == ["mine"]
+
+    token = create_access_token(data={"sub": "bob@example.com", "org_id": "empty-org"})
+    empty = client.post(
+        "/api/v1/retrieval/query", json=query, headers={"Authorization": f"Bearer {token}"}
+    ).json()
+    assert empty["results"] == []
@@ -0,0 +1,93 @@
+"""
+Unit tests for range-read streaming extraction.
+"""
+
+import io
+
+import pytest
+
+from app.services.document.parser import PDF, TEXT, extract_text, iter_pages
+from app.services.document.range_file import S3RangeFile
+
+
+def make_pdf(pages: int, padding: int = 0) -> bytes:
+    """Build a PDF with one line of text per page, padded with incompressible streams."""
+    import os
+
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }
+    )
+    for number in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/Font"): DictionaryObject(
+                    {NameObject("/F1"): writer._add_object(font)}
+                ),
+            }
+        )
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td (Page {number} text) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        if padding:
+            blob = DecodedStreamObject()
+            blob.set_data(os.urandom(padding))
+            page[NameObject("/Padding")] = writer._add_object(blob)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.unit
+def test_range_file_reads_match_the_object(fake_s3):
+    """Test that seeks and reads return the object's bytes through bounded ranged GETs."""
+    data = bytes(range(256)) * 40
+    fake_s3.objects["doc"] = data
+    s3 = fake_s3.sync()
+    file = S3RangeFile(s3, "bucket", "doc", block_size=1000, read_ahead=1, max_blocks=2)
+
+    assert file.size == len(data) and file.content_type == "binary/octet-stream"
+    file.seek(-100, io.SEEK_END)
+    assert file.read() == data[-100:]
+    file.seek(1500)
+    assert file.read(1000) == data[1500:2500]
+    assert file.read(0) == b"" and file.tell() == 2500
+
+    assert s3.ranges == ["bytes=10000-10239", "bytes=1000-2999"]
+    assert file.bytes_fetched == 240 + 2000
+    assert len(file._blocks) <= 2
+
+
+@pytest.mark.unit
+def test_pdf_pages_stream_without_reading_the_whole_object(fake_s3):
+    """Test that a PDF is parsed page by page while only a bounded window is held."""
+    fake_s3.objects["report.pdf"] = make_pdf(pages=12, padding=64 * 1024)
+    file = S3RangeFile(fake_s3.sync(), "bucket", "report.pdf", block_size=16 * 1024, max_blocks=4)
+
+    pages = iter_pages(file, PDF)
+    first = next(pages)
+    assert "Page 0 text" in first
+    assert file.bytes_fetched < file.size
+
+    rest = list(pages)
+    assert len(rest) == 11 and "Page 11 text" in rest[-1]
+    assert len(file._blocks) <= 4
+
+
+@pytest.mark.unit
+def test_text_decodes_across_block_boundaries(tmp_path):
+    """Test that multi-byte characters split between blocks decode intact."""
+    text = "naïve café " * 50
+    path = tmp_path / "notes.txt"
+    path.write_bytes(text.encode())
+
+    assert "".join(iter_pages(str(path), TEXT, block_size=7)) == text
+    assert "".join(extract_text(str(path), TEXT)) == text
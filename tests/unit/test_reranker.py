@@ -0,0 +1,131 @@
+"""
+Unit tests for the cross-encoder rerank stage.
+"""
+
+import asyncio
+import time
+from typing import List
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.rag.indexer import add_chunks
+from app.services.rag.reranker import Reranker, rerank, set_reranker
+from app.services.vector import ChunkRecord, SearchHit
+
+
+class FakeReranker(Reranker):
+    """Scores passages by how many query words they contain."""
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(model="fake-cross-encoder")
+        self.delay = delay
+        self.calls: List[List[str]] = []
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        self.calls.append(passages)
+        time.sleep(self.delay)
+        words = set(query.lower().split())
+        return np.array([len(words & set(p.lower().split())) for p in passages], dtype=np.float32)
+
+
+@pytest.fixture
+def fake_reranker():
+    reranker = FakeReranker()
+    set_reranker(reranker)
+    yield reranker
+    set_reranker(None)
+
+
+def make_hits(*contents: str) -> List[SearchHit]:
+    return [
+        SearchHit(
+            record=ChunkRecord(chunk_id=f"c{i}", document_id=f"d{i}", content=content),
+            score=1.0 - i * 0.1,
+        )
+        for i, content in enumerate(contents)
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rerank_orders_by_score_and_caches_pairs(fake_reranker):
+    """Test that candidates are reordered in one batch and repeat pairs hit the cache."""
+    hits = make_hits("nothing here", "red apples", "red apples and green pears")
+
+    reranked, complete = await rerank("red apples green", hits, top_k=2)
+
+    assert complete
+    assert [hit.record.chunk_id for hit in reranked] == ["c2", "c1"]
+    assert reranked[0].rerank_score == 3.0
+    assert len(fake_reranker.calls) == 1
+
+    await rerank("Red  apples GREEN", hits, top_k=2)
+    assert len(fake_reranker.calls) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rerank_deadline_keeps_ann_order_for_unscored(fake_reranker):
+    """Test that a missed deadline returns promptly and late scores still fill the cache."""
+    hits = make_hits("a", "b b", "query words here")
+    fake_reranker.delay = 0.2
+
+    start = time.perf_counter()
+    reranked, complete = await rerank("query words", hits, top_k=3, timeout=0.01)
+
+    assert time.perf_counter() - start < 0.15
+    assert not complete
+    assert [hit.record.chunk_id for hit in reranked] == ["c0", "c1", "c2"]
+    assert all(hit.rerank_score is None for hit in reranked)
+
+    await asyncio.sleep(0.3)
+    reranked, complete = await rerank("query words", hits, top_k=3, timeout=0.01)
+    assert complete
+    assert reranked[0].record.chunk_id == "c2"
+    assert len(fake_reranker.calls) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_partial_scores_reorder_only_scored_slots(fake_reranker):
+    """Test that cached candidates are reordered among their own positions on a deadline."""
+    hits = make_hits("x", "y", "z match", "w")
+    await rerank("match", [hits[0], hits[2]], top_k=2)
+    fake_reranker.delay = 0.2
+
+    reranked, complete = await rerank("match", hits, top_k=4, timeout=0.01)
+
+    assert not complete
+    assert [hit.record.chunk_id for hit in reranked] == ["c2", "c1", "c0", "c3"]
+    await asyncio.sleep(0.3)
+
+
+@pytest.mark.unit
+def test_query_endpoint_reranks(
+    client: TestClient, auth_headers, fake_embeddings, fake_reranker, tenant_id
+):
+    """Test that /retrieval/query orders chunks by cross-encoder score when asked."""
+    texts = ["vector search engine", "vector search with faiss engine tuning"]
+    records = [
+        ChunkRecord(chunk_id=f"c{i}", document_id=f"d{i}", content=text)
+        for i, text in enumerate(texts)
+    ]
+    add_chunks(tenant_id, records, [fake_embeddings.vector(text) for text in texts])
+
+    response = client.post(
+        "/api/v1/retrieval/query",
+        json={
+            "query": "vector search engine faiss tuning",
+            "top_k": 2,
+            "similarity_threshold": 0.0,
+            "rerank": True,
+        },
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["chunk_id"] for r in results] == ["c1", "c0"]
+    assert results[0]["rerank_score"] == 5.0
@@ -0,0 +1,93 @@
+"""
+Unit tests for the retrieval result cache.
+"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.rag.indexer import add_chunks
+from app.services.rag.partitions import PartitionManager
+from app.services.rag.result_cache import ResultCache
+from app.services.vector import ChunkRecord
+
+QUERY = {"query": "vector similarity search", "top_k": 3, "similarity_threshold": 0.1}
+
+
+@pytest.fixture
+def cached_client(monkeypatch, fake_embeddings, tenant_id):
+    """Client with the result cache enabled (single worker, no Redis)."""
+    monkeypatch.setattr(settings, "WORKERS", 1)
+    monkeypatch.setattr(settings, "REDIS_PORT", 1)
+    from main import app
+
+    with TestClient(app) as client:
+        add_chunks(
+            tenant_id,
+            [ChunkRecord(chunk_id="c1", document_id="d1", content="vector similarity search")],
+            [fake_embeddings.vector("vector similarity search")],
+        )
+        yield client
+
+
+@pytest.mark.unit
+async def test_bump_changes_key():
+    """Test that bumping a namespace generation changes its keys only."""
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    before = await cache.key_for("a", "user", QUERY)
+    other = await cache.key_for("b", "user", QUERY)
+
+    await cache.bump("a")
+
+    assert await cache.key_for("a", "user", QUERY) != before
+    assert await cache.key_for("b", "user", QUERY) == other
+    assert await cache.key_for("a", "someone-else", QUERY) != await cache.key_for(
+        "a", "user", QUERY
+    )
+
+
+@pytest.mark.unit
+async def test_new_generation_forces_a_snapshot_check(tmp_path, monkeypatch):
+    """Test that a worker keying under a new generation searches the snapshot published before it."""
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 16)
+    monkeypatch.setattr(settings, "VECTOR_STORE_RELOAD_SECONDS", 3600)
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    writer = PartitionManager(str(tmp_path), max_loaded=2)
+    reader = PartitionManager(str(tmp_path), max_loaded=2)
+
+    generation = await cache.generation("acme")
+    resident = reader.get("acme", generation)
+    assert reader.peek("acme", generation) is resident and resident.store.ntotal == 0
+
+    partition = writer.get("acme")
+    partition.add(
+        [ChunkRecord(chunk_id="c1", document_id="d1", content="new upload")],
+        np.ones((1, 16), dtype=np.float32),
+    )
+    partition.save()
+    await cache.bump("acme")
+
+    # The reload interval has not passed, but the new generation still forces a check
+    generation = await cache.generation("acme")
+    assert reader.peek("acme", generation) is None
+    assert reader.get("acme", generation) is resident and resident.store.ntotal == 1
+    assert reader.peek("acme", generation) is resident
+
+
+@pytest.mark.unit
+def test_repeat_query_is_served_from_cache(
+    cached_client: TestClient, auth_headers, fake_embeddings
+):
+    """Test that an identical query is a cache hit until the corpus changes."""
+    first = cached_client.post("/api/v1/retrieval/query", json=QUERY, headers=auth_headers).json()
+    second = cached_client.post("/api/v1/retrieval/query", json=QUERY, headers=auth_headers).json()
+
+    assert first["cache_hit"] is False
+    assert second["cache_hit"] is True
+    assert second["results"] == first["results"]
+
+    cached_client.delete("/api/v1/documents/d1", headers=auth_headers)
+    third = cached_client.post("/api/v1/retrieval/query", json=QUERY, headers=auth_headers).json()
+
+    assert third["cache_hit"] is False
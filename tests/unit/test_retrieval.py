@@ -0,0 +1,102 @@
+"""
+Unit tests for retrieval endpoints.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.rag.indexer import add_chunks
+from app.services.vector import ChunkRecord
+
+DOCUMENTS = [
+    ("doc-1", "the quick brown fox jumps over the lazy dog"),
+    ("doc-2", "postgres stores relational data in tables"),
+    ("doc-3", "faiss performs fast vector similarity search"),
+]
+
+
+@pytest.fixture
+def indexed_client(client: TestClient, fake_embeddings, tenant_id):
+    """Client whose vector store holds a few known chunks."""
+    records = [
+        ChunkRecord(chunk_id=f"{doc_id}-0", document_id=doc_id, content=text)
+        for doc_id, text in DOCUMENTS
+    ]
+    vectors = fake_embeddings.vector
+    add_chunks(tenant_id, records, [vectors(text) for _, text in DOCUMENTS])
+    return client
+
+
+@pytest.mark.unit
+def test_retrieve_documents(indexed_client: TestClient, auth_headers):
+    """Test that a query returns the matching chunk with a real score."""
+    response = indexed_client.post(
+        "/api/v1/retrieval/query",
+        json={"query": "fast vector similarity search", "top_k": 2, "similarity_threshold": 0.5},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_results"] == 1
+    assert data["results"][0]["document_id"] == "doc-3"
+    assert 0.5 <= data["results"][0]["score"] <= 1.0
+
+
+@pytest.mark.unit
+def test_hybrid_search(indexed_client: TestClient, auth_headers):
+    """Test that keyword-only hybrid search ranks the exact term match first."""
+    response = indexed_client.post(
+        "/api/v1/retrieval/search",
+        params={"query": "postgres tables", "top_k": 2, "use_semantic": False},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["results"][0]["document_id"] == "doc-2"
+    assert data["search_types"] == {"semantic": False, "keyword": True}
+
+
+@pytest.mark.unit
+def test_retrieve_documents_batch(indexed_client: TestClient, auth_headers, fake_embeddings):
+    """Test that a batch is embedded once and answered per query in order."""
+    calls_before = fake_embeddings.calls
+    response = indexed_client.post(
+        "/api/v1/retrieval/query:batch",
+        json={
+            "queries": [
+                {"query": "postgres relational tables", "top_k": 1, "similarity_threshold": 0.1},
+                {"query": "quick brown fox", "top_k": 2, "similarity_threshold": 0.1},
+            ]
+        },
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_queries"] == 2
+    assert [r["results"][0]["document_id"] for r in data["responses"]] == ["doc-2", "doc-1"]
+    assert len(data["responses"][0]["results"]) == 1
+    assert fake_embeddings.calls == calls_before + 1
+
+
+@pytest.mark.unit
+def test_find_similar_documents(indexed_client: TestClient, auth_headers):
+    """Test that similar documents come from the document graph."""
+    response = indexed_client.get(
+        "/api/v1/retrieval/similar/doc-1", params={"top_k": 5}, headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    similar = response.json()["similar_documents"]
+    assert {doc["document_id"] for doc in similar} == {"doc-2", "doc-3"}
+
+    # Beyond DOCUMENT_GRAPH_K the neighbours are scanned exactly rather than cut short
+    wide = indexed_client.get(
+        "/api/v1/retrieval/similar/doc-1", params={"top_k": 50}, headers=auth_headers
+    )
+    assert wide.json()["similar_documents"] == similar
+
+    missing = indexed_client.get("/api/v1/retrieval/similar/nope", headers=auth_headers)
+    assert missing.status_code == 404
@@ -0,0 +1,208 @@
+"""
+Unit tests for the segmented vector store and document deletes.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.rag.partitions import PartitionManager
+from app.services.vector import ChunkRecord, FaissVectorStore, SegmentedVectorStore
+
+DIMENSION = 16
+
+
+def make_records(start: int, count: int):
+    return [
+        ChunkRecord(
+            chunk_id=f"chunk-{i}", document_id=f"doc-{i // 10}", content=f"topic {i // 10} part {i}"
+        )
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    rng = np.random.default_rng(11)
+    return rng.standard_normal((200, DIMENSION)).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_MEMTABLE_SIZE", 20)
+    monkeypatch.setattr(settings, "VECTOR_MAX_SEGMENTS", 3)
+    monkeypatch.setattr(settings, "TENANT_ANN_MIN_VECTORS", 1000)
+
+
+def fill(store, vectors, start: int, count: int) -> None:
+    """Add chunks ten at a time, as ingestion batches do."""
+    for offset in range(start, start + count, 10):
+        store.add(make_records(offset, 10), vectors[offset : offset + 10])
+
+
+@pytest.mark.unit
+def test_deleted_chunks_are_skipped_in_every_segment(vectors):
+    """Test that tombstoned chunks never surface while top_k is still filled from live ones."""
+    store = SegmentedVectorStore(DIMENSION)
+    fill(store, vectors, 0, 50)
+    assert store.nsegments == 2 and store.ntotal == 50
+
+    # doc-1 is sealed, doc-4 is still in the memtable
+    assert store.delete_document("doc-1") == 10
+    assert store.delete_document("doc-4") == 10
+    assert store.delete_document("doc-4") == 0
+
+    hits = store.search(vectors[12], top_k=30, similarity_threshold=-1.0)
+    assert len(hits) == 30
+    assert not {hit.record.document_id for hit in hits} & {"doc-1", "doc-4"}
+    assert store.ntotal == 30 and len(store.labels()) == 30
+
+    top = store.search(vectors[25], top_k=1)[0]
+    assert top.record.chunk_id == "chunk-25"
+    assert np.allclose(
+        store.vectors([top.label])[0], vectors[25] / np.linalg.norm(vectors[25]), atol=1e-5
+    )
+
+
+@pytest.mark.unit
+def test_compaction_merges_segments_and_drops_dead_chunks(vectors, monkeypatch):
+    """Test that compaction folds small segments, purges tombstones and keeps late deletes."""
+    store = SegmentedVectorStore(DIMENSION)
+    fill(store, vectors, 0, 100)
+    store.delete_document("doc-0")
+    assert store.nsegments == 5
+
+    # A delete that lands while the merged segment is being built
+    original = FaissVectorStore.vectors
+
+    def delete_midway(self, labels):
+        if store._compacting.locked() and "doc-3" in {r.document_id for r in store.records}:
+            store.delete_document("doc-3")
+        return original(self, labels)
+
+    monkeypatch.setattr(FaissVectorStore, "vectors", delete_midway)
+    assert store.compact()
+    monkeypatch.setattr(FaissVectorStore, "vectors", original)
+
+    assert store.nsegments <= settings.VECTOR_MAX_SEGMENTS
+    assert store.ntotal == 80
+    assert {r.document_id for r in store.records} == {f"doc-{i}" for i in range(10)} - {
+        "doc-0",
+        "doc-3",
+    }
+    hits = store.search(vectors[55], top_k=1)
+    assert hits[0].record.chunk_id == "chunk-55"
+
+    # The late delete left the merged segment at the dead ratio, so it is rewritten next
+    assert store.compact() and not store.compact()
+    assert store.ntotal == 80
+
+
+@pytest.mark.unit
+def test_saved_segments_reload_with_tombstones(tmp_path, vectors, monkeypatch):
+    """Test that sealed segments are written once, tombstones persist and unused segments are pruned."""
+    monkeypatch.setattr(settings, "VECTOR_STORE_KEEP_VERSIONS", 1)
+    store = SegmentedVectorStore(DIMENSION, str(tmp_path))
+    fill(store, vectors, 0, 30)
+    store.save()
+    fill(store, vectors, 30, 10)
+    store.delete_document("doc-0")
+    store.save()
+    assert len(list((tmp_path / "segments").iterdir())) == 3
+
+    loaded = SegmentedVectorStore.load(str(tmp_path))
+    assert loaded.version == store.version and loaded.ntotal == 30
+    hits = loaded.search(vectors[3], top_k=40, similarity_threshold=-1.0)
+    assert len(hits) == 30 and "doc-0" not in {hit.record.document_id for hit in hits}
+
+    loaded.compact(full=True)
+    loaded.save()
+    assert len(list((tmp_path / "segments").iterdir())) == 1
+    assert SegmentedVectorStore.load(str(tmp_path)).ntotal == 30
+
+
+@pytest.mark.unit
+def test_loads_store_saved_before_segmentation(tmp_path, vectors):
+    """Test that a plain FAISS store loads as one segment and keeps its labels."""
+    legacy = FaissVectorStore(dimension=DIMENSION)
+    legacy.add(make_records(0, 30), vectors[:30])
+    legacy.save(str(tmp_path))
+
+    store = SegmentedVectorStore.load(str(tmp_path))
+    assert store.ntotal == 30 and store.records[7].chunk_id == "chunk-7"
+    assert store.search(vectors[7], top_k=1)[0].label == 7
+
+    store.delete_document("doc-2")
+    store.save()
+    assert SegmentedVectorStore.load(str(tmp_path)).ntotal == 20
+
+
+@pytest.mark.unit
+def test_partition_delete_reaches_every_index(tmp_path, vectors, monkeypatch):
+    """Test that deleting a document hides it from vector, keyword and document-graph lookups."""
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", DIMENSION)
+    manager = PartitionManager(str(tmp_path), max_loaded=2)
+    partition = manager.get("acme")
+    partition.add(make_records(0, 40), vectors[:40])
+
+    assert partition.remove_document("doc-2") == 10
+    assert "doc-2" not in partition.documents
+    assert not [
+        hit
+        for hit in partition.keywords.search("topic 2", top_k=10)
+        if hit.record.document_id == "doc-2"
+    ]
+    assert partition.keywords.ntotal == 30
+
+    assert manager.compact() == 1
+    assert partition.keywords.dead_ratio == 0.0
+    reloaded = PartitionManager(str(tmp_path), max_loaded=2).get("acme")
+    assert reloaded.store.ntotal == reloaded.keywords.ntotal == reloaded.documents.nchunks == 30
+
+
+@pytest.mark.unit
+def test_compaction_never_publishes_an_outdated_partition(tmp_path, vectors, monkeypatch):
+    """Test that compacting a copy another worker has published past keeps that worker's writes."""
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", DIMENSION)
+    monkeypatch.setattr(settings, "VECTOR_COMPACTION_DEAD_RATIO", 0.2)
+    writer = PartitionManager(str(tmp_path), max_loaded=2)
+    partition = writer.get("acme")
+    partition.add(make_records(0, 40), vectors[:40])
+    partition.remove_document("doc-0")
+    partition.remove_document("doc-1")
+    partition.save()
+
+    compactor = PartitionManager(str(tmp_path), max_loaded=2)
+    stale = compactor.get("acme")
+    partition.add(make_records(40, 10), vectors[40:50])
+    partition.save()
+
+    assert compactor.compact() == 0
+    assert stale.outdated()
+    # Deletes rebase onto the newest snapshot before publishing too
+    stale.remove_document("doc-2")
+    stale.save()
+
+    latest = PartitionManager(str(tmp_path), max_loaded=2).get("acme")
+    documents = {record.document_id for record in latest.store.records}
+    assert documents == {"doc-3", "doc-4"}
+    assert latest.store.ntotal == latest.keywords.ntotal == latest.documents.nchunks == 20
+
+
+@pytest.mark.unit
+def test_prune_keeps_segments_of_saves_in_progress(tmp_path, vectors, monkeypatch):
+    """Test that unreferenced segments are only pruned when older than every kept manifest."""
+    monkeypatch.setattr(settings, "VECTOR_STORE_KEEP_VERSIONS", 1)
+    segments = tmp_path / "segments"
+    abandoned = segments / f"000007-{0:020d}-1"
+    in_progress = segments / f"000008-{2 ** 62:020d}-1"
+    for directory in (abandoned, in_progress):
+        directory.mkdir(parents=True)
+
+    store = SegmentedVectorStore(DIMENSION, str(tmp_path))
+    fill(store, vectors, 0, 10)
+    store.save()
+
+    assert not abandoned.exists()
+    assert in_progress.exists()
+    assert len(list(segments.iterdir())) == 2
@@ -0,0 +1,116 @@
+"""
+Unit tests for the semantic cache.
+"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.rag.indexer import add_chunks
+from app.services.rag.semantic_cache import SemanticCache
+from app.services.vector import ChunkRecord
+
+
+def unit(*values: float) -> np.ndarray:
+    return np.array(values, dtype=np.float32)
+
+
+@pytest.fixture
+def semantic_client(monkeypatch, fake_embeddings, tenant_id):
+    """Client with the result and semantic caches enabled (single worker, no Redis)."""
+    monkeypatch.setattr(settings, "WORKERS", 1)
+    monkeypatch.setattr(settings, "REDIS_PORT", 1)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_MAX_DISTANCE", 0.2)
+    from main import app
+
+    with TestClient(app) as client:
+        add_chunks(
+            tenant_id,
+            [ChunkRecord(chunk_id="c1", document_id="d1", content="vector similarity search")],
+            [fake_embeddings.vector("vector similarity search")],
+        )
+        yield client
+
+
+@pytest.mark.unit
+def test_nearest_query_within_distance_hits():
+    """Test that only queries close enough to a cached one, in the same scope, hit."""
+    cache = SemanticCache(max_entries=10, ttl_seconds=60, max_distance=0.1)
+    cache.set("scope", unit(1, 0, 0), "a")
+    cache.set("scope", unit(0, 1, 0), "b")
+
+    assert cache.get("scope", unit(0.1, 1, 0)) == "b"
+    assert cache.get("scope", unit(1, 1, 0)) is None
+    assert cache.get("other-scope", unit(1, 0, 0)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+@pytest.mark.unit
+def test_entries_are_evicted_by_lru_and_ttl(monkeypatch):
+    """Test that the least recently used entry goes first and expired entries miss."""
+    cache = SemanticCache(max_entries=2, ttl_seconds=60, max_distance=0.01)
+    cache.set("s", unit(1, 0), "a")
+    cache.set("s", unit(0, 1), "b")
+    cache.get("s", unit(1, 0))
+    cache.set("t", unit(1, 0), "c")
+
+    assert len(cache) == 2
+    assert cache.get("s", unit(0, 1)) is None
+    assert cache.get("s", unit(1, 0)) == "a"
+
+    expired = SemanticCache(max_entries=2, ttl_seconds=-1, max_distance=0.01)
+    expired.set("s", unit(1, 0), "a")
+    assert expired.get("s", unit(1, 0)) is None
+    assert len(expired) == 0
+
+
+@pytest.mark.unit
+def test_rephrased_query_is_served_from_semantic_cache(semantic_client: TestClient, auth_headers):
+    """Test that a near-duplicate query hits only when its filters match."""
+    url = "/api/v1/retrieval/query"
+    params = {"top_k": 3, "similarity_threshold": 0.1}
+    first = semantic_client.post(
+        url, json={"query": "fast vector similarity search", **params}, headers=auth_headers
+    )
+    second = semantic_client.post(
+        url, json={"query": "vector similarity search fast", **params}, headers=auth_headers
+    )
+    filtered = semantic_client.post(
+        url,
+        json={"query": "vector similarity search fast", "filters": {"lang": "en"}, **params},
+        headers=auth_headers,
+    )
+
+    assert first.json()["cache_hit"] is False
+    assert second.json()["cache_hit"] is True
+    assert second.json()["results"] == first.json()["results"]
+    assert filtered.json()["cache_hit"] is False
+
+    semantic_client.delete("/api/v1/documents/d1", headers=auth_headers)
+    third = semantic_client.post(
+        url, json={"query": "the fast vector similarity search", **params}, headers=auth_headers
+    )
+    assert third.json()["cache_hit"] is False
+
+
+@pytest.mark.unit
+def test_chat_answers_near_duplicate_from_cache(
+    semantic_client: TestClient, auth_headers, fake_embeddings
+):
+    """Test that a new conversation with a near-duplicate message skips retrieval and generation."""
+    semantic_client.post(
+        "/api/v1/chat/",
+        json={"message": "how does vector similarity search work"},
+        headers=auth_headers,
+    )
+    calls = fake_embeddings.calls
+    response = semantic_client.post(
+        "/api/v1/chat/",
+        json={"message": "how does vector similarity search work?"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["context_used"] is True
+    assert fake_embeddings.calls == calls + 1
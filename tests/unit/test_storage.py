@@ -0,0 +1,160 @@
+"""
+Unit tests for streaming document uploads to S3.
+"""
+
+import hashlib
+import io
+import subprocess
+import sys
+
+import pytest
+
+from app.services.document.storage import (
+    DOCX,
+    HTML,
+    MIN_PART_SIZE,
+    PDF,
+    PPTX,
+    TEXT,
+    UploadRejected,
+    sniff_content_type,
+    stream_to_s3,
+)
+
+
+class TrickleStream:
+    """Async source that returns at most ``block`` bytes per read, like a network body."""
+
+    def __init__(self, data: bytes, block: int = 65536):
+        self._buffer = io.BytesIO(data)
+        self.block = block
+        self.largest_read = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.largest_read = max(self.largest_read, size)
+        return self._buffer.read(min(size, self.block))
+
+
+@pytest.mark.unit
+def test_sniff_content_type():
+    """Test that the type comes from the leading bytes rather than the client's claim."""
+    assert sniff_content_type(b"%PDF-1.7\n...", TEXT) == PDF
+    assert sniff_content_type(b"PK\x03\x04rest", DOCX) == DOCX
+    assert sniff_content_type(b"PK\x03\x04rest", PDF) is None
+    assert sniff_content_type(b"PK\x03\x04rest", PPTX) == PPTX
+    assert sniff_content_type(b"<html><body>hi</body></html>", HTML) == HTML
+    assert sniff_content_type(b"# Notes", "application/json") == TEXT
+    assert sniff_content_type(b"\x7fELF\x02\x01\x01\x00", TEXT) is None
+    assert sniff_content_type("café".encode("utf-8")[:-1], TEXT) == TEXT
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_large_upload_streams_in_fixed_parts(fake_s3):
+    """Test that a multi-part upload is split into full parts and hashed on the fly."""
+    data = b"%PDF-1.7\n" + bytes(range(256)) * (MIN_PART_SIZE * 2 // 256 + 100)
+    source = TrickleStream(data)
+
+    stored = await stream_to_s3(
+        fake_s3, source, "bucket", "doc.pdf", declared_type=PDF, part_size=MIN_PART_SIZE
+    )
+
+    assert fake_s3.objects["doc.pdf"] == data
+    assert fake_s3.part_sizes[:-1] == [MIN_PART_SIZE, MIN_PART_SIZE]
+    assert source.largest_read <= MIN_PART_SIZE
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.content_type == PDF
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_upload_of_whole_parts_reads_one_part_at_a_time(fake_s3):
+    """Test that a file of exactly two parts is uploaded without reading ahead of the current part."""
+    data = b"text " * (2 * MIN_PART_SIZE // 5)
+    source = TrickleStream(data)
+    uploaded = []
+    upload_part = fake_s3.upload_part
+
+    async def track(**kwargs):
+        # Nothing beyond the part being uploaded may have been read yet
+        assert source._buffer.tell() == sum(uploaded) + len(kwargs["Body"])
+        uploaded.append(len(kwargs["Body"]))
+        return await upload_part(**kwargs)
+
+    fake_s3.upload_part = track
+    stored = await stream_to_s3(
+        fake_s3, source, "bucket", "even.txt", declared_type=TEXT, part_size=MIN_PART_SIZE
+    )
+
+    assert uploaded == [MIN_PART_SIZE, MIN_PART_SIZE]
+    assert fake_s3.objects["even.txt"] == data and stored.size == len(data)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_small_upload_uses_single_put_and_rejects_binary(fake_s3):
+    """Test that a file under one part skips multipart, and unsupported content is never written."""
+    stored = await stream_to_s3(
+        fake_s3, TrickleStream(b"plain notes"), "bucket", "notes", declared_type=TEXT
+    )
+    assert fake_s3.objects == {"notes": b"plain notes"} and not fake_s3.part_sizes
+    assert stored.size == 11
+
+    with pytest.raises(UploadRejected):
+        await stream_to_s3(
+            fake_s3, TrickleStream(b"\x00\x01\x02binary"), "bucket", "blob", declared_type=TEXT
+        )
+    assert "blob" not in fake_s3.objects
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_part_aborts_multipart_upload(fake_s3):
+    """Test that a failed part aborts the upload instead of leaving orphaned parts."""
+    data = b"text " * (MIN_PART_SIZE // 2)
+    fake_s3.fail_on_part = 2
+
+    with pytest.raises(ConnectionError):
+        await stream_to_s3(
+            fake_s3,
+            TrickleStream(data),
+            "bucket",
+            "big.txt",
+            declared_type=TEXT,
+            part_size=MIN_PART_SIZE,
+        )
+
+    assert fake_s3.aborted == ["upload-0"]
+    assert fake_s3.objects == {} and fake_s3.uploads == {}
+
+
+@pytest.mark.unit
+def test_upload_endpoint_streams_to_s3(client, auth_headers, fake_s3):
+    """Test that the upload endpoint stores the file and reports its size and hash."""
+    body = b"%PDF-1.4\nhello"
+    response = client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("report.pdf", body, PDF)},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 201
+    payload = response.json()
+    assert payload["size"] == len(body)
+    assert payload["sha256"] == hashlib.sha256(body).hexdigest()
+    assert fake_s3.objects[payload["s3_key"]] == body
+    assert payload["s3_key"].endswith(payload["document_id"])
+
+
+@pytest.mark.unit
+def test_storage_does_not_load_the_vector_stack():
+    """Test that formatting upload keys imports neither faiss nor the partition module."""
+    check = (
+        "import sys; import app.services.document.storage; "
+        "print(sorted({'faiss', 'app.services.rag.partitions'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,298 @@
+"""
+Unit tests for the local FAISS vector store.
+"""
+
+import faiss
+import numpy as np
+import pytest
+
+from app.services.vector import ChunkRecord, FaissVectorStore
+
+
+def make_records(count: int):
+    return [
+        ChunkRecord(
+            chunk_id=f"chunk-{i}",
+            document_id=f"doc-{i % 3}",
+            content=f"content {i}",
+            metadata={"position": i},
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    return rng.standard_normal((200, 16)).astype(np.float32)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+def test_search_returns_nearest_chunk(index_type, vectors, monkeypatch):
+    """Test that a stored vector is its own nearest neighbour."""
+    monkeypatch.setattr("app.core.config.settings.IVF_NLIST", 4)
+    store = FaissVectorStore(dimension=16, index_type=index_type)
+    store.add(make_records(len(vectors)), vectors)
+
+    hits = store.search(vectors[17], top_k=3)
+
+    assert hits[0].record.chunk_id == "chunk-17"
+    assert hits[0].score == pytest.approx(1.0, abs=1e-4)
+    assert [hit.score for hit in hits] == sorted((hit.score for hit in hits), reverse=True)
+
+
+@pytest.mark.unit
+def test_search_batch_matches_single_searches(vectors):
+    """Test that one matrix search returns the same hits as per-query searches."""
+    store = FaissVectorStore(dimension=16)
+    store.add(make_records(len(vectors)), vectors)
+
+    batched = store.search_batch(vectors[:5], top_k=4)
+
+    for row, query in zip(batched, vectors[:5], strict=True):
+        single = store.search(query, top_k=4)
+        assert [h.record.chunk_id for h in row] == [h.record.chunk_id for h in single]
+
+
+@pytest.mark.unit
+def test_similarity_threshold_filters_hits(vectors):
+    """Test that hits below the similarity threshold are dropped."""
+    store = FaissVectorStore(dimension=16)
+    store.add(make_records(len(vectors)), vectors)
+
+    hits = store.search(vectors[0], top_k=10, similarity_threshold=0.99)
+
+    assert [hit.record.chunk_id for hit in hits] == ["chunk-0"]
+
+
+@pytest.mark.unit
+def test_save_and_mmap_load_round_trip(tmp_path, vectors):
+    """Test that a saved store reloads memory-mapped and still accepts writes."""
+    store = FaissVectorStore(dimension=16)
+    store.add(make_records(100), vectors[:100])
+    store.save(str(tmp_path))
+
+    loaded = FaissVectorStore.load(str(tmp_path))
+    assert loaded.ntotal == 100
+    assert loaded.search(vectors[5], top_k=1)[0].record.metadata == {"position": 5}
+
+    loaded.add(make_records(101)[100:], vectors[100:101])
+    assert loaded.search(vectors[100], top_k=1)[0].record.chunk_id == "chunk-100"
+
+
+@pytest.mark.unit
+def test_dimension_mismatch_is_rejected():
+    """Test that vectors of the wrong dimension are rejected."""
+    store = FaissVectorStore(dimension=16)
+
+    with pytest.raises(ValueError):
+        store.add(make_records(1), np.ones((1, 8), dtype=np.float32))
+
+
+@pytest.fixture
+def clustered() -> np.ndarray:
+    """Vectors drawn around a few centres so quantization has structure to learn."""
+    rng = np.random.default_rng(11)
+    centres = rng.standard_normal((8, 16))
+    return (centres[rng.integers(0, 8, 600)] + 0.3 * rng.standard_normal((600, 16))).astype(
+        np.float32
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+@pytest.mark.parametrize("quantization", ["sq8", "pq"])
+def test_quantized_search_reranks_with_exact_scores(
+    monkeypatch, index_type, quantization, clustered
+):
+    """Test that quantized indexes return exact cosine scores and high recall."""
+    from app.services.vector.evaluation import recall_at_k
+
+    monkeypatch.setattr("app.core.config.settings.PQ_M", 4)
+    monkeypatch.setattr("app.core.config.settings.IVF_NLIST", 8)
+    monkeypatch.setattr("app.core.config.settings.IVF_NPROBE", 8)
+    store = FaissVectorStore(dimension=16, index_type=index_type, quantization=quantization)
+    store.add(make_records(len(clustered)), clustered)
+
+    hits = store.search(clustered[42], top_k=3)
+    assert hits[0].record.chunk_id == "chunk-42"
+    assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+    assert recall_at_k(store, clustered[:50], top_k=5) >= 0.9
+
+    usage = store.memory_usage()
+    flat = FaissVectorStore(dimension=16, index_type=index_type)
+    flat.add(make_records(len(clustered)), clustered)
+    assert usage["full_precision_bytes"] == len(clustered) * 16 * 4
+    assert usage["index_bytes"] < flat.memory_usage()["index_bytes"]
+
+
+@pytest.mark.unit
+def test_evaluation_cli_reports_a_tenant_partition(tmp_path, monkeypatch, clustered, capsys):
+    """Test that the evaluation CLI reports memory per segment and recall for a tenant."""
+    import json
+
+    from app.core.config import settings
+    from app.services.rag.partitions import PartitionManager
+    from app.services.vector.evaluation import main
+
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 16)
+    monkeypatch.setattr(settings, "TENANT_ANN_MIN_VECTORS", 500)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_TYPE", "hnsw")
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "sq8")
+    partition = PartitionManager(str(tmp_path), max_loaded=2).get("acme")
+    partition.add(make_records(500), clustered[:500])
+    partition.add(make_records(600)[500:], clustered[500:])
+    partition.remove_document("doc-0")
+    partition.save()
+
+    main(["--tenant", "acme", "--path", str(tmp_path), "--queries", "50", "--top-k", "5"])
+    report = json.loads(capsys.readouterr().out)
+
+    assert report["tenant"] == "acme" and report["version"] == partition.store.version
+    assert report["index_type"] == "hnsw" and report["quantization"] == "sq8"
+    assert report["vectors"] == 400 and report["recall_at_k"] >= 0.9
+    assert [s["index_type"] for s in report["segments"]] == ["hnsw", "flat"]
+    assert sum(s["vectors"] + s["deleted"] for s in report["segments"]) == 600
+    with pytest.raises(SystemExit):
+        main(["--tenant", "nobody", "--path", str(tmp_path)])
+
+
+@pytest.mark.unit
+def test_pq_defers_training_and_round_trips(tmp_path, monkeypatch, clustered):
+    """Test that PQ searches exactly before training and reloads its side file after."""
+    monkeypatch.setattr("app.core.config.settings.PQ_M", 4)
+    store = FaissVectorStore(dimension=16, quantization="pq")
+    store.add(make_records(100), clustered[:100])
+    assert store.search(clustered[7], top_k=1)[0].record.chunk_id == "chunk-7"
+
+    store.save(str(tmp_path))
+    loaded = FaissVectorStore.load(str(tmp_path))
+    assert loaded.quantization == "pq"
+
+    loaded.add(make_records(600)[100:], clustered[100:])
+    loaded.save(str(tmp_path))
+    reloaded = FaissVectorStore.load(str(tmp_path))
+    assert reloaded.ntotal == 600
+    assert reloaded.search(clustered[500], top_k=1)[0].record.chunk_id == "chunk-500"
+
+
+@pytest.mark.unit
+def test_mmap_ivf_store_accepts_writes(tmp_path, vectors, monkeypatch):
+    """Test that a memory-mapped IVF index is read into RAM on the first write."""
+    monkeypatch.setattr("app.core.config.settings.IVF_NLIST", 2)
+    store = FaissVectorStore(dimension=16, index_type="ivf_flat")
+    store.add(make_records(100), vectors[:100])
+    store.save(str(tmp_path))
+
+    loaded = FaissVectorStore.load(str(tmp_path))
+    loaded.add(make_records(101)[100:], vectors[100:101])
+    assert loaded.search(vectors[100], top_k=1)[0].record.chunk_id == "chunk-100"
+
+
+@pytest.mark.unit
+def test_ivf_waits_for_a_full_training_set(tmp_path, vectors, monkeypatch):
+    """Test that IVF searches exactly until 39 points per list arrive, then trains at full nlist."""
+    monkeypatch.setattr("app.core.config.settings.IVF_NLIST", 4)
+    store = FaissVectorStore(dimension=16, index_type="ivf_flat")
+    store.add(make_records(10), vectors[:10])
+    assert not store._index.is_trained
+    assert store.search(vectors[3], top_k=1)[0].record.chunk_id == "chunk-3"
+
+    # Vectors held back for training survive a save and reload
+    store.save(str(tmp_path))
+    loaded = FaissVectorStore.load(str(tmp_path))
+    records = make_records(200)
+    loaded.add(records[10:150], vectors[10:150])
+    assert not loaded._index.is_trained and loaded.ntotal == 150
+
+    loaded.add(records[150:], vectors[150:])
+    assert loaded._index.is_trained and loaded._index.ntotal == 200
+    assert loaded.memory_usage()["full_precision_bytes"] == 0
+    assert faiss.extract_index_ivf(loaded._index).nlist == 4
+    assert loaded.search(vectors[3], top_k=1)[0].record.chunk_id == "chunk-3"
+
+
+@pytest.mark.unit
+def test_save_publishes_versions_and_prunes(tmp_path, monkeypatch, vectors):
+    """Test that each save publishes a new snapshot and old ones are pruned."""
+    monkeypatch.setattr("app.core.config.settings.VECTOR_STORE_KEEP_VERSIONS", 2)
+    store = FaissVectorStore(dimension=16)
+    records = make_records(60)
+    published = []
+    for start in range(0, 60, 20):
+        store.add(records[start : start + 20], vectors[start : start + 20])
+        published.append(store.save(str(tmp_path)))
+
+    assert FaissVectorStore.current_version(str(tmp_path)) == published[-1]
+    assert sorted(p.name for p in (tmp_path / "versions").iterdir()) == published[-2:]
+
+    loaded = FaissVectorStore.load(str(tmp_path))
+    assert loaded.version == published[-1]
+    assert loaded.records[45].chunk_id == "chunk-45"
+    hits = loaded.search(
+        vectors[3], top_k=5, similarity_threshold=-1.0, filters={"document_id": "doc-0"}
+    )
+    assert {hit.record.document_id for hit in hits} == {"doc-0"}
+
+
+@pytest.mark.unit
+def test_loads_unversioned_store(tmp_path, vectors):
+    """Test that stores saved before versioning, without offsets or metadata files, still load."""
+    store = FaissVectorStore(dimension=16)
+    store.add(make_records(30), vectors[:30])
+    version = store.save(str(tmp_path))
+
+    snapshot = tmp_path / "versions" / version
+    for name in ("index.faiss", "chunks.jsonl"):
+        (snapshot / name).rename(tmp_path / name)
+    (tmp_path / "CURRENT").unlink()
+
+    loaded = FaissVectorStore.load(str(tmp_path))
+    assert loaded.version is None
+    assert loaded.records[29].metadata == {"position": 29}
+    assert (
+        loaded.search(vectors[12], top_k=1, filters={"position": 12})[0].record.chunk_id
+        == "chunk-12"
+    )
+
+
+@pytest.mark.unit
+def test_record_table_appends_across_saves(tmp_path):
+    """Test that saved records are copied verbatim and new ones appended with offsets."""
+    from app.services.vector.records import RecordTable
+
+    table = RecordTable()
+    for record in make_records(3):
+        table.append(record)
+    table = table.save(tmp_path / "a.jsonl")
+    table.append(ChunkRecord(chunk_id="extra", document_id="doc-x", content="line\nbreak"))
+    table = table.save(tmp_path / "b.jsonl")
+
+    assert len(table) == 4 and table.saved == 4
+    assert [r.chunk_id for r in table] == ["chunk-0", "chunk-1", "chunk-2", "extra"]
+    assert table[-1].content == "line\nbreak"
+
+
+@pytest.mark.unit
+def test_worker_reloads_published_snapshot(tmp_path, monkeypatch, vectors):
+    """Test that a worker reloads a snapshot another process published."""
+    from app.core.config import settings
+    from app.services.rag.partitions import PartitionManager
+
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 16)
+    monkeypatch.setattr(settings, "VECTOR_STORE_RELOAD_SECONDS", 0)
+    writer = PartitionManager(str(tmp_path), max_loaded=4)
+    reader = PartitionManager(str(tmp_path), max_loaded=4)
+
+    writer.get("acme").add(make_records(10), vectors[:10])
+    writer.get("acme").save()
+    loaded = reader.get("acme")
+    assert loaded.store.ntotal == 10
+    assert reader.get("acme") is loaded
+
+    writer.get("acme").add(make_records(25)[10:], vectors[10:25])
+    writer.get("acme").save()
+
+    assert reader.get("acme") is loaded
+    assert loaded.store.ntotal == 25 and loaded.keywords.ntotal == 25